@@ -0,0 +1,215 @@
+"""
+Grading of model responses against an expected answer.
+
+matcher_for() compiles one AnswerMatcher per expected answer and caches it, so
+grading a response costs a single scan of its text. Numeric answers are compared
+by value rather than by spelling: "12", "12.0", "\\boxed{12}", "12 cm" and
+"24/2" all match an expected "12", and "2,4", "2.40" and "\\frac{12}{5}" match
+"2.4". Thousands separators ("1,200") are recognised; units are ignored. Other
+answers are matched as whole words, case-insensitively.
+"""
+
+import logging
+import os
+import re
+from fractions import Fraction
+from functools import lru_cache
+from itertools import repeat
+
+logger = logging.getLogger(__name__)
+
+# Distinct expected answers whose compiled matchers are kept
+ANSWER_MATCHER_CACHE_SIZE = int(os.environ.get("ANSWER_MATCHER_CACHE_SIZE", "1024"))
+
+# A number as written in a response: optional sign, an integer part (optionally
+# with thousands separators), an optional decimal part after a point or comma,
+# and an optional "/ denominator". Digits glued to a word or to another number
+# ("x2", "1.2.3") do not start a number; trailing units ("12cm", "12%") are fine.
+NUMBER_RE = re.compile(r'''
+    (?<![\w.,/])
+    (?P<sign>-)?
+    (?P<integer>\d{1,3}(?:,\d{3})+(?![\d,])|\d+)
+    (?:[.,](?P<decimals>\d+))?
+    (?:\s*/\s*(?P<denominator>\d+))?
+''', re.VERBOSE)
+FRAC_RE = re.compile(r'\\d?frac\s*\{\s*(-?[\d.,]+)\s*\}\s*\{\s*(-?[\d.,]+)\s*\}')
+# A unit after a numeric expected answer ("12 cm", "45 degrees", "9 m^2", "50%"):
+# words of two or more letters, a common one-letter unit, "%" or "°". Anything
+# else ("2x+3", "3x^2", "2^3", "1e3") is not a number and is matched literally.
+UNIT_RE = re.compile(r'\s*(?:%|°[CF]?|(?:[^\W\d_]{2,}|[mgslhLVWAJNK])(?:\^?[23])?(?:\s+[^\W\d_]+)*\.?)')
+# Three digits completing a thousands group after a comma ("1,200")
+THOUSANDS_GROUP_RE = re.compile(r'\d{3}(?![\d])')
+
+
+def _normalize(text):
+    """Rewrite LaTeX fractions as a/b and typographic minus signs as "-"."""
+    if "frac" in text:
+        text = FRAC_RE.sub(r"\1/\2", text)
+    if "\u2212" in text:
+        text = text.replace("\u2212", "-")
+    return text
+
+
+def _number_value(match):
+    """The exact value of a NUMBER_RE match, or None for a zero denominator."""
+    integer = match.group("integer").replace(",", "")
+    decimals = match.group("decimals")
+    value = Fraction(f"{integer}.{decimals}") if decimals else Fraction(int(integer))
+    denominator = match.group("denominator")
+    if denominator is not None:
+        if int(denominator) == 0:
+            return None
+        value /= int(denominator)
+    return -value if match.group("sign") else value
+
+
+def _decimal_pattern(value):
+    """
+    Compile a regex for `value` written as a decimal number ("1200", "1,200.0",
+    "2,40"), or return None if it has no finite decimal expansion.
+    """
+    denominator = value.denominator
+    for factor in (2, 5):
+        while denominator % factor == 0:
+            denominator //= factor
+    if denominator != 1:
+        return None
+    integer, fraction = divmod(abs(value), 1)
+    decimals = ""
+    while fraction:
+        digit, fraction = divmod(fraction * 10, 1)
+        decimals += str(digit)
+    integer = str(integer)
+    spellings = [integer]
+    if len(integer) > 3:
+        head = len(integer) % 3 or 3
+        spellings.append(",".join([integer[:head]] + [integer[i:i + 3] for i in range(head, len(integer), 3)]))
+    # A comma followed by exactly three digits is a thousands separator, as in NUMBER_RE
+    comma = r',(?!\d{3}(?![\d,]))'
+    tail = rf'(?:\.|{comma}){decimals}0*' if decimals else rf'(?:(?:\.|{comma})0+)?'
+    # Starts with the digits so the search can skip ahead; the start boundary is
+    # checked by _starts_number()
+    sign = "-" if value < 0 else ""
+    return re.compile(rf'{sign}(?:{"|".join(spellings)}){tail}(?!\d|[.,]\d|\s*/\s*\d)')
+
+
+def _starts_number(text, start, negative=False):
+    """
+    True if a number found at `start` is not the tail of a word or of another
+    number, and (unless `negative`, when the match starts at its "-") is not
+    negated by a "-" directly before it: the start boundary of NUMBER_RE.
+    """
+    if start == 0:
+        return True
+    if text[start - 1] == "-" and not negative:
+        return start > 1 and _glued(text, start - 2)
+    return not _glued(text, start - 1)
+
+
+def _glued(text, index):
+    """
+    True if text[index] joins what follows it to the preceding word or number.
+    A comma only does as a thousands separator ("1,200"); in "3,12" it
+    separates two numbers.
+    """
+    char = text[index]
+    if char == ",":
+        return index > 0 and text[index - 1].isdigit() and THOUSANDS_GROUP_RE.match(text, index + 1) is not None
+    return char.isalnum() or char in "_./"
+
+
+def parse_number(text):
+    """
+    Return the exact value of `text` if it is a single number (optionally
+    wrapped in \\boxed{} or $...$ and followed by a unit), else None.
+    """
+    text = _normalize(text.strip())
+    if text.startswith("\\boxed{") and text.endswith("}"):
+        text = text[len("\\boxed{"):-1]
+    text = text.strip("$ ").lstrip("+")
+    match = NUMBER_RE.match(text)
+    if not match:
+        return None
+    rest = text[match.end():]
+    if rest and not UNIT_RE.fullmatch(rest):
+        return None
+    return _number_value(match)
+
+
+class AnswerMatcher:
+    """Compiled matcher for one expected answer."""
+
+    def __init__(self, expected_answer):
+        self.expected_answer = expected_answer
+        self.value = parse_number(expected_answer)
+        # Decimal spellings are found with one regex search; only responses that
+        # contain a fraction need a scan of every number in them
+        self.decimal = _decimal_pattern(self.value) if self.value is not None else None
+        self.pattern = re.compile(r'\b' + re.escape(expected_answer) + r'\b', re.IGNORECASE)
+
+    @property
+    def numeric(self):
+        return self.value is not None
+
+    def match(self, response_text):
+        """
+        Look for the expected answer in `response_text`.
+
+        Returns:
+            tuple: (is_correct, found_answer); found_answer is the matching text
+                as written in the response, or None.
+        """
+        if self.value is None:
+            match = self.pattern.search(response_text)
+            return (True, match.group(0)) if match else (False, None)
+
+        text = _normalize(response_text)
+        if self.decimal is not None:
+            for match in self.decimal.finditer(text):
+                if _starts_number(text, match.start(), negative=self.value < 0):
+                    return True, match.group(0)
+        if "/" not in text:
+            return False, None
+        for match in NUMBER_RE.finditer(text):
+            if match.group("denominator") is not None and _number_value(match) == self.value:
+                return True, match.group(0)
+        return False, None
+
+
+@lru_cache(maxsize=ANSWER_MATCHER_CACHE_SIZE)
+def matcher_for(expected_answer):
+    """Return the (cached) AnswerMatcher for `expected_answer`."""
+    return AnswerMatcher(expected_answer)
+
+
+def evaluate(response_text, expected_answer):
+    """
+    Grade one response.
+
+    Returns:
+        tuple: (is_correct, found_answer); (False, None) for non-string input.
+    """
+    if not isinstance(response_text, str):
+        logger.warning(f"evaluate received non-string response_text: {type(response_text)}")
+        return False, None
+    if not isinstance(expected_answer, str):
+        logger.warning(f"evaluate received non-string expected_answer: {type(expected_answer)}")
+        return False, None
+    return matcher_for(expected_answer).match(response_text)
+
+
+def evaluate_many(responses, expected):
+    """
+    Grade many responses in one pass.
+
+    Args:
+        responses (iterable): Response texts.
+        expected (str or iterable): One expected answer for every response, or
+            one per response. Each distinct answer is compiled once.
+
+    Returns:
+        list: (is_correct, found_answer) per response, in order.
+    """
+    if expected is None or isinstance(expected, str):
+        expected = repeat(expected)
+    return [evaluate(text, answer) for text, answer in zip(responses, expected)]
@@ -8,11 +8,30 @@ The application tests models on mathematical reasoning tasks and scores their pe
 
 import os
 import re
+import atexit
+import hashlib
 import time
 import json
+import queue
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 # import sqlite3 # Removed as database.py now handles DB choice
-from flask import Flask, render_template, jsonify, request, Response
+from flask import Flask, render_template, jsonify, request, Response, g
 from openrouter_client import OpenRouterClient
+from response_cache import ResponseCache
+from model_catalog import model_provider
+from circuit_breaker import CLOSED
+from scoring import calculate_score
+from sse import sse_event
+from export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, check_format, export_filename, stream_export
+from result_writer import ResultWriter
+from matrix import MATRIX_PER_MODEL_CONCURRENCY, MATRIX_WORKERS, run_matrix
+from trials import TRIALS_BATCH, TRIALS_MAX_SAMPLES, TRIALS_MIN_SAMPLES, TRIALS_PRECISION, TRIALS_WORKERS, run_trials
+from problem_cache import ProblemCache
+from retention import RESULTS_RETENTION_DAYS
+import metrics
 import database  # Import the database module
 
 # Initialize Flask app
@@ -21,45 +40,116 @@ app = Flask(__name__)
 # Get API key from environment variable
 API_KEY = os.environ.get("OPENROUTER_API_KEY", "")
 
-# Initialize OpenRouter client
-client = OpenRouterClient(API_KEY)
+# Cache identical model calls (same model, prompt and params) unless disabled;
+# location, TTL and sizes come from RESPONSE_CACHE_* env vars.
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+
+# Initialize OpenRouter client (pool sizes come from OPENROUTER_POOL_* env vars)
+client = OpenRouterClient(API_KEY, response_cache=ResponseCache() if RESPONSE_CACHE_ENABLED else None)
+
+# Revalidate the model catalog in the background: a snapshot from a previous run
+# is served meanwhile, and a cold start gets its first download under way early.
+client.refresh_models_async()
+
+# Keep-alive connections opened by start_background_jobs() (0 disables the warm-up)
+WARM_UP_CONNECTIONS = int(os.environ.get("OPENROUTER_WARM_UP_CONNECTIONS", "2"))
 
 # Initialize the database
 database.init_db()
 
+# Results are saved in batches by a background writer so sweeps never wait on the
+# database; RESULT_WRITER_ENABLED=0 saves each result synchronously instead.
+RESULT_WRITER_ENABLED = os.environ.get("RESULT_WRITER_ENABLED", "1") == "1"
+result_writer = ResultWriter(database.save_results_batch).start() if RESULT_WRITER_ENABLED else None
+if result_writer:
+    atexit.register(result_writer.close)
+
+# Number of models tested concurrently by /api/test-all and /api/test-subset,
+# and the default cap on models per sweep (0 tests the whole free catalog).
+SWEEP_WORKERS = int(os.environ.get("SWEEP_WORKERS", "8"))
+SWEEP_MAX_MODELS = int(os.environ.get("SWEEP_MAX_MODELS", "0"))
+
+# Longest /api/results waits for queued result writes before reading
+RESULTS_FLUSH_TIMEOUT = float(os.environ.get("RESULTS_FLUSH_TIMEOUT", "2"))
+# Default and maximum page sizes of /api/results
+RESULTS_PAGE_SIZE = 100
+RESULTS_MAX_PAGE_SIZE = 1000
+
 # --- Global Problem State ---
 DEFAULT_PROBLEM = "If x² + y² = 25 and x + y = 7, what is the value of xy?"
 DEFAULT_CORRECT_ANSWER = "12"
 
-current_problem = DEFAULT_PROBLEM
-current_correct_answer = DEFAULT_CORRECT_ANSWER
-
-def load_or_initialize_global_problem():
-    global current_problem, current_correct_answer
-    print("Attempting to load global problem from database...")
-    problem_data = database.get_global_problem()
-    if problem_data:
-        current_problem = problem_data["problem_text"]
-        current_correct_answer = problem_data["correct_answer"]
-        print(f"Loaded global problem: '{current_problem[:50]}...' Answer: '{current_correct_answer}'")
-    else:
-        print("No global problem found in database, saving default problem.")
-        current_problem = DEFAULT_PROBLEM
-        current_correct_answer = DEFAULT_CORRECT_ANSWER
-        database.save_global_problem(current_problem, current_correct_answer)
-        print(f"Saved default global problem: '{current_problem[:50]}...' Answer: '{current_correct_answer}'")
-
-load_or_initialize_global_problem()
+# Every worker serves the problem from memory and picks up changes saved by
+# other workers through the database's change feed.
+problem_cache = ProblemCache(DEFAULT_PROBLEM, DEFAULT_CORRECT_ANSWER).start()
+atexit.register(problem_cache.close)
 # --- End Global Problem State ---
 
 
+@app.before_request
+def _start_request_timer():
+    g.request_start_time = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    """Count every request and time it by route template (not raw path, to bound label cardinality)."""
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    if "request_start_time" in g:
+        metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - g.request_start_time,
+                                              method=request.method, route=route)
+    return response
+
+CONNECTIONS_OPENED = metrics.REGISTRY.gauge(
+    "openrouter_connections_opened", "TCP/TLS connections opened to OpenRouter by the pooled session.")
+CONNECTIONS_REUSED = metrics.REGISTRY.gauge(
+    "openrouter_connections_reused", "Requests served on an already open keep-alive connection.")
+RATE_LIMITED_RESPONSES = metrics.REGISTRY.gauge(
+    "openrouter_throttled_responses", "429 responses received from OpenRouter.")
+CONCURRENCY_LIMIT = metrics.REGISTRY.gauge(
+    "openrouter_concurrency_limit", "Current adaptive concurrency limit, by API key fingerprint.", ("key",))
+RESULT_WRITER_QUEUED = metrics.REGISTRY.gauge(
+    "result_writer_queued", "Results waiting in the write-behind queue.")
+DB_POOL_CONNECTIONS = metrics.REGISTRY.gauge(
+    "db_pool_connections", "Database connections held by the pool, by state (idle, in_use).", ("state",))
+DB_POOL_MAX_SIZE = metrics.REGISTRY.gauge("db_pool_max_size", "Maximum number of pooled database connections.")
+DB_POOL_CHECKOUTS = metrics.REGISTRY.gauge("db_pool_checkouts", "Connections checked out of the database pool.")
+DB_POOL_WAITS = metrics.REGISTRY.gauge("db_pool_waits", "Checkouts that had to wait for a free connection.")
+DB_POOL_WAIT_SECONDS = metrics.REGISTRY.gauge("db_pool_wait_seconds", "Total time spent waiting for a connection.")
+DB_POOL_TIMEOUTS = metrics.REGISTRY.gauge("db_pool_timeouts", "Checkouts that gave up waiting for a connection.")
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Expose counters and histograms in the Prometheus text exposition format."""
+    connection_stats = client.connection_stats()
+    CONNECTIONS_OPENED.set(connection_stats["connections_opened"])
+    CONNECTIONS_REUSED.set(connection_stats["connections_reused"])
+    limiter_stats = client.rate_limiter.stats()
+    RATE_LIMITED_RESPONSES.set(limiter_stats["throttled_responses"])
+    for key_id, key_stats in limiter_stats["keys"].items():
+        CONCURRENCY_LIMIT.set(key_stats["concurrency_limit"], key=key_id)
+    if result_writer:
+        RESULT_WRITER_QUEUED.set(result_writer.stats()["queued"])
+    pool_stats = database.pool_stats()
+    # Only the PostgreSQL backend pools connections
+    if "checkouts" in pool_stats:
+        DB_POOL_CONNECTIONS.set(pool_stats["idle"], state="idle")
+        DB_POOL_CONNECTIONS.set(pool_stats["in_use"], state="in_use")
+        DB_POOL_MAX_SIZE.set(pool_stats["max_size"])
+        DB_POOL_CHECKOUTS.set(pool_stats["checkouts"])
+        DB_POOL_WAITS.set(pool_stats["waits"])
+        DB_POOL_WAIT_SECONDS.set(pool_stats["wait_seconds"])
+        DB_POOL_TIMEOUTS.set(pool_stats["timeouts"])
+    return Response(metrics.REGISTRY.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+
 @app.route('/')
 def index():
     """Render the main testing interface."""
-    # current_problem and current_correct_answer are already global
+    problem = problem_cache.get()
     return render_template('index.html',
-                           current_problem=current_problem,
-                           current_correct_answer=current_correct_answer)
+                           current_problem=problem.text,
+                           current_correct_answer=problem.correct_answer)
 
 @app.route('/dashboard')
 def dashboard():
@@ -69,28 +159,167 @@ def dashboard():
 @app.route('/api/models')
 def get_models():
     """
-    Get a list of available free models.
+    Get a list of available models, filtered server-side.
+
+    Query parameters:
+        provider: Only models from this provider (e.g. "google").
+        min_context: Only models with at least this context length.
+        free_only: 1 (default) for free models only, 0 for the whole catalog.
+        limit: Maximum number of models to return.
+
+    Each model carries its circuit breaker state (closed, open or half_open). The
+    response has an ETag derived from the catalog version, the circuit states and the
+    filters; a request with a matching If-None-Match gets 304 Not Modified.
     
     Returns:
-        JSON: A list of free models with their details.
+        JSON: A list of models with their details.
     """
     try:
-        # Get free models from the client
-        free_models = client.get_free_models()
+        provider = request.args.get("provider") or None
+        min_context = request.args.get("min_context", type=int)
+        free_only = request.args.get("free_only", "1") not in ("0", "false")
+        limit = request.args.get("limit", type=int)
+
+        index = client.get_catalog_index()
+        filters = json.dumps([provider, min_context, free_only, limit])
+        # Circuit states are part of the payload, so their version is part of the ETag
+        etag = hashlib.sha1(f"{index.etag}:{client.circuit_breakers.version}:{filters}".encode("utf-8")).hexdigest()
+        if etag in request.if_none_match:
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag)
+            return not_modified
+
+        models = index.query(provider=provider, min_context=min_context, free_only=free_only, limit=limit)
         
         # Format the models for the frontend
         formatted_models = []
-        for model in free_models:
+        for model in models:
             formatted_models.append({
                 "id": model.get("id"),
                 "name": model.get("name", "Unknown Model"),
-                "provider": model.get("provider", "Unknown Provider")
+                "provider": model_provider(model),
+                "context_length": model.get("context_length"),
+                "free": model.get("id") in index.free_ids,
+                "circuit_state": client.circuit_breakers.state(model.get("id"))
             })
         
-        return jsonify({"models": formatted_models})
+        response = jsonify({"models": formatted_models})
+        response.set_etag(etag)
+        # Let clients cache the list but revalidate it on every use
+        response.headers["Cache-Control"] = "no-cache"
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def run_model_test(model_id, model_name, problem_text, correct_answer, raise_on_error=False, stream=False, on_delta=None,
+                   use_cache=True):
+    """
+    Send the problem to one model, evaluate and score the response and save it.
+
+    Args:
+        model_id (str): The ID of the model to test.
+        model_name (str): Display name stored with the result.
+        problem_text (str): The problem to send.
+        correct_answer (str): The expected answer used for evaluation.
+        raise_on_error (bool): Raise instead of saving a result when the client
+            reports an error (timeout, network error, ...).
+        stream (bool): Use a streamed completion and record time-to-first-token,
+            inter-token latency and tokens/sec.
+        on_delta (callable): Called with each streamed text fragment.
+        use_cache (bool): Set to False to force a fresh upstream call.
+
+    Returns:
+        tuple: (test_result, result) where test_result is the JSON-ready result for the
+            frontend and result is the raw dictionary from send_math_problem.
+    """
+    # Send the math problem to the model
+    with metrics.MODEL_TESTS_IN_FLIGHT.track_in_progress():
+        result = client.send_math_problem(model_id, problem_text, stream=stream, on_delta=on_delta, use_cache=use_cache)
+
+    # Check for errors from client.send_math_problem (e.g. timeout, network error)
+    if raise_on_error and result.get("error"):
+        raise Exception(result.get("response_text", "Unknown error during model test"))
+
+    return record_result(model_id, model_name, problem_text, correct_answer, result, stream=stream), result
+
+def record_result(model_id, model_name, problem_text, correct_answer, result, stream=False, trial_group_id=None):
+    """
+    Evaluate and score one response from the client and save it.
+
+    Args:
+        result (dict): The response, as from send_math_problem or one sample
+            of sample_math_problem.
+        stream (bool): Include the streaming metrics in the returned result.
+        trial_group_id (str): The repeated-trial run the response belongs to.
+
+    Returns:
+        dict: The JSON-ready result for the frontend.
+    """
+    # Log before evaluation
+    response_text_snippet = result.get('response_text', '')[:100]
+    app.logger.debug(f"Calling client.evaluate_response for model {model_id}. Expected answer: '{correct_answer}'. Model response (first 100 chars): '{response_text_snippet}'")
+
+    # Evaluate the response
+    is_correct, found_answer = client.evaluate_response(result.get("response_text", ""), correct_answer)
+
+    # Calculate score
+    score = calculate_score(is_correct, result.get("response_time_seconds", 0), result.get("total_tokens", 0),
+                            time_to_first_token=result.get("time_to_first_token"),
+                            tokens_per_second=result.get("tokens_per_second"))
+
+    # Format the result
+    test_result = {
+        "model_id": model_id,
+        "model_name": model_name,
+        "correct": is_correct,
+        "response_time": round(result["response_time_seconds"], 2),
+        "token_usage": {
+            "prompt": result["prompt_tokens"],
+            "completion": result["completion_tokens"],
+            "total": result.get("total_tokens", 0)
+        },
+        "answer": found_answer if is_correct else "Incorrect",
+        "score": score,
+        "cached": bool(result.get("cached"))
+    }
+    if stream:
+        test_result["time_to_first_token"] = _round_metric(result.get("time_to_first_token"), 3)
+        test_result["inter_token_latency"] = _round_metric(result.get("inter_token_latency"), 4)
+        test_result["tokens_per_second"] = _round_metric(result.get("tokens_per_second"), 1)
+
+    # Save the result to the database (batched by the background writer when enabled).
+    # The token columns are NOT NULL and summed by the aggregates, so unknown usage is
+    # stored as 0; regrade.py reads 0 on a streamed row as unknown again.
+    result_to_save = {
+        "model_id": model_id,
+        "model_name": model_name,
+        "prompt": problem_text,
+        "response_text": result.get("response_text", ""),
+        "is_correct": is_correct,
+        "answer_found": found_answer if is_correct else "Incorrect",
+        "response_time": result["response_time_seconds"],
+        "prompt_tokens": result["prompt_tokens"] or 0,
+        "completion_tokens": result["completion_tokens"] or 0,
+        "total_tokens": result.get("total_tokens") or 0,
+        "score": score,
+        "expected_answer": correct_answer,
+        "time_to_first_token": result.get("time_to_first_token"),
+        "inter_token_latency": result.get("inter_token_latency"),
+        "tokens_per_second": result.get("tokens_per_second"),
+        "cached": bool(result.get("cached")),
+        "trial_group_id": trial_group_id
+    }
+    if result_writer:
+        result_writer.submit(result_to_save)
+    else:
+        database.save_result(result_to_save)
+
+    return test_result
+
+def _round_metric(value, digits):
+    """Round an optional streaming metric, keeping None for non-streamed runs."""
+    return round(value, digits) if value is not None else None
+
 @app.route('/api/test', methods=['POST'])
 def test_model():
     """
@@ -98,6 +327,9 @@ def test_model():
     
     Request body:
         model_id: The ID of the model to test.
+        stream: Optional; use a streamed completion and report time-to-first-token,
+            inter-token latency and tokens/sec.
+        no_cache: Optional; skip the response cache and always call the model.
     
     Returns:
         JSON: The test results including correctness, response time, and score.
@@ -111,55 +343,20 @@ def test_model():
             return jsonify({"error": "Model ID is required"}), 400
         
         # Get model details to fetch the name
-        all_models = client.get_models() # Use cached if available
-        model_details = next((m for m in all_models if m.get("id") == model_id), None)
+        model_details = client.get_model(model_id) # Indexed lookup on the cached catalog
         model_name = model_details.get("name", model_id) if model_details else model_id # Use ID if name not found
 
-        # Send the math problem to the model
-        result = client.send_math_problem(model_id, current_problem)
-        # app.logger.debug(f"DEBUG: Result from send_math_problem for {model_id}: {result}") # Replaced by more specific log below
+        problem = problem_cache.get()
+        test_result, result = run_model_test(model_id, model_name, problem.text, problem.correct_answer,
+                                             stream=bool(data.get("stream")),
+                                             use_cache=not data.get("no_cache"))
 
-        # Log before evaluation
-        response_text_snippet = result.get('response_text', '')[:100]
-        app.logger.debug(f"Calling client.evaluate_response for model {model_id}. Expected answer: '{current_correct_answer}'. Model response (first 100 chars): '{response_text_snippet}'")
-        
-        # Evaluate the response
-        is_correct, found_answer = client.evaluate_response(result.get("response_text", ""), current_correct_answer)
-        
-        # Calculate score
-        score = calculate_score(is_correct, result.get("response_time_seconds", 0), result.get("total_tokens", 0))
-        
         # Format the response
-        response = {
-            "model_name": model_name, # Use the fetched model name
-            "correct": is_correct,
-            "response_time": round(result["response_time_seconds"], 2),
-            "token_usage": {
-                "prompt": result["prompt_tokens"],
-                "completion": result["completion_tokens"],
-                "total": result.get("total_tokens", 0)
-            },
-            "answer": found_answer if is_correct else "Incorrect",
-            "score": score,
-            "response_text": result.get("response_text", "N/A") # Add response text
-        }
-        
-        # Save the result to the database
-        result_to_save = {
-            "model_id": model_id,
-            "model_name": model_name,
-            "prompt": current_problem,
-            "response_text": result.get("response_text", ""),
-            "is_correct": is_correct,
-            "answer_found": found_answer if is_correct else "Incorrect",
-            "response_time": result["response_time_seconds"],
-            "prompt_tokens": result["prompt_tokens"],
-            "completion_tokens": result["completion_tokens"],
-            "total_tokens": result.get("total_tokens", 0),
-            "score": score,
-            "expected_answer": current_correct_answer
-        }
-        database.save_result(result_to_save)
+        response = dict(test_result)
+        del response["model_id"]
+        response["response_text"] = result.get("response_text", "N/A") # Add response text
+        if result.get("error_type"):
+            response["error_type"] = result["error_type"] # timeout, rate_limited, http_error, ...
         
         return jsonify(response)
     except Exception as e:
@@ -169,112 +366,211 @@ def test_model():
 def test_all_models():
     """
     Test all available free models and stream the results.
+
+    Models are dispatched to a pool of worker threads and `result`/`error` events are
+    sent in completion order, so a sweep takes about as long as its slowest model.
     
+    Query parameters:
+        workers: Number of models tested concurrently (default SWEEP_WORKERS).
+            workers=1 tests the models one after another.
+        limit: Maximum number of free models to test (default SWEEP_MAX_MODELS, 0 = all).
+        stream: 1 to use streamed completions; results then carry time-to-first-token
+            and tokens/sec, and parallel sweeps relay generated text as `partial` events.
+        no_cache: 1 to skip the response cache and call every model.
+
     Returns:
         Stream: Server-sent events with test results for each model.
     """
+    workers = request.args.get("workers", SWEEP_WORKERS, type=int)
+    limit = request.args.get("limit", SWEEP_MAX_MODELS, type=int)
+    stream = request.args.get("stream", "0") in ("1", "true")
+    use_cache = request.args.get("no_cache", "0") not in ("1", "true")
+    # Snapshot the problem so every model in this sweep gets the same one
+    problem_text, correct_answer, _ = problem_cache.get()
+
     def generate():
+        with metrics.SWEEPS_IN_FLIGHT.track_in_progress(route="/api/test-all"):
+            try:
+                # Get free models
+                free_models = client.get_free_models()
+                
+                models_to_test = free_models[:limit] if limit and limit > 0 else free_models
+                models_to_test = order_by_health(models_to_test)
+                total_models = len(models_to_test)
+                
+                # Send the total number of models to test
+                yield sse_event('total', {'total_models': total_models})
+                
+                if workers <= 1:
+                    yield from _generate_sequential(models_to_test, problem_text, correct_answer, stream, use_cache)
+                else:
+                    yield from _generate_parallel(models_to_test, problem_text, correct_answer, workers, stream, use_cache)
+
+                # Send completion message
+                completion_data = {"message": "All models tested successfully."}
+                yield sse_event('complete', completion_data)
+                
+            except Exception as e:
+                # Send overall error
+                overall_error_data = {"error_message": "Overall error: " + str(e)}
+                yield sse_event('error', overall_error_data)
+    
+    return Response(generate(), mimetype='text/event-stream')
+
+class CircuitOpenError(Exception):
+    """Raised when a model is skipped because its circuit breaker is open."""
+
+def order_by_health(models):
+    """
+    Order sweep models by circuit state.
+
+    Open circuits that are still cooling down come first (they are skipped without a
+    request), then healthy models, and models due for a recovery probe last.
+    """
+    cooling, healthy, recovering = [], [], []
+    for model in models:
+        model_id = model.get("id")
+        if client.circuit_breakers.state(model_id) == CLOSED:
+            healthy.append(model)
+        elif client.circuit_breakers.get(model_id).ready_for_probe():
+            recovering.append(model)
+        else:
+            cooling.append(model)
+    return cooling + healthy + recovering
+
+def check_circuit(model_id):
+    """
+    Make sure a sweep may test `model_id`.
+
+    Closed circuits pass. Open circuits raise CircuitOpenError until their cool-down
+    has elapsed; then a one-token probe decides whether the full test runs.
+    """
+    breaker = client.circuit_breakers.get(model_id)
+    if breaker.state == CLOSED:
+        return
+    if not client.circuit_breakers.allow_request(model_id):
+        raise CircuitOpenError(f"Circuit open, model skipped (next probe in {breaker.retry_in():.0f}s)")
+    if not client.probe_model(model_id):
+        raise CircuitOpenError("Circuit open, recovery probe failed")
+
+def _generate_sequential(models_to_test, problem_text, correct_answer, stream=False, use_cache=True):
+    """Test models one after another, announcing each model before it runs."""
+    total_models = len(models_to_test)
+    for i, model in enumerate(models_to_test):
+        model_id = model.get("id")
+        model_name = model.get("name", "Unknown Model")
+        
         try:
-            # Get free models
-            free_models = client.get_free_models()
+            # Send progress update
+            progress_data = {
+                "current_model_count": i + 1,
+                "total_models": total_models,
+                "testing_model_name": model_name
+            }
+            yield sse_event('progress', progress_data)
             
-            # Limit to first 5 models to prevent timeouts
-            models_to_test = free_models[:5] # For actual testing, consider removing or increasing this limit
-            total_models = len(models_to_test)
+            check_circuit(model_id)
+            test_result, _ = run_model_test(model_id, model_name, problem_text, correct_answer,
+                                            raise_on_error=True, stream=stream, use_cache=use_cache)
             
-            # Send the total number of models to test
-            yield f"data: {json.dumps({'type': 'total', 'data': {'total_models': total_models}})}\n\n"
-            
-            # Test each model
-            for i, model in enumerate(models_to_test):
-                model_id = model.get("id")
-                model_name = model.get("name", "Unknown Model")
-                
-                try:
-                    # Send progress update
-                    progress_data = {
-                        "current_model_count": i + 1,
-                        "total_models": total_models,
-                        "testing_model_name": model_name
-                    }
-                    yield f"data: {json.dumps({'type': 'progress', 'data': progress_data})}\n\n"
-                    
-                    # Test the model
-                    result = client.send_math_problem(model_id, current_problem)
-                    
-                    # Check for errors from client.send_math_problem (e.g. timeout, network error)
-                    if result.get("error"):
-                        raise Exception(result.get("response_text", "Unknown error during model test"))
-
-                    # Log before evaluation
-                    response_text_snippet_all = result.get('response_text', '')[:100]
-                    app.logger.debug(f"Calling client.evaluate_response in test_all_models for model {model_name}. Expected answer: '{current_correct_answer}'. Model response (first 100 chars): '{response_text_snippet_all}'")
-
-                    # Evaluate the response
-                    is_correct, found_answer = client.evaluate_response(result.get("response_text", ""), current_correct_answer)
-                    
-                    # Calculate score
-                    score = calculate_score(is_correct, result.get("response_time_seconds", 0), result.get("total_tokens", 0))
-                    
-                    # Format the result
-                    test_result = {
-                        "model_id": model_id,
-                        "model_name": model_name,
-                        "correct": is_correct,
-                        "response_time": round(result["response_time_seconds"], 2),
-                        "token_usage": {
-                            "prompt": result["prompt_tokens"],
-                            "completion": result["completion_tokens"],
-                            "total": result.get("total_tokens", 0)
-                        },
-                        "answer": found_answer if is_correct else "Incorrect",
-                        "score": score
-                    }
-                    
-                    # Send the result
-                    # Save the result to the database
-                    result_to_save = {
-                        "model_id": model_id,
-                        "model_name": model_name,
-                        "prompt": current_problem,
-                        "response_text": result.get("response_text", ""),
-                        "is_correct": is_correct,
-                        "answer_found": found_answer if is_correct else "Incorrect",
-                        "response_time": result["response_time_seconds"],
-                        "prompt_tokens": result["prompt_tokens"],
-                        "completion_tokens": result["completion_tokens"],
-                        "total_tokens": result.get("total_tokens", 0),
-                        "score": score,
-                        "expected_answer": current_correct_answer
-                    }
-                    database.save_result(result_to_save)
-                    
-                    # Send the result to the client
-                    yield f"data: {json.dumps({'type': 'result', 'data': test_result})}\n\n"
-                    
-                except Exception as e:
-                    # Send error for this model
-                    error_data = {
-                        "model_name": model_name,
-                        "error_message": str(e)
-                    }
-                    yield f"data: {json.dumps({'type': 'error', 'data': error_data})}\n\n"
-            
-            # Send completion message
-            completion_data = {"message": "All models tested successfully."}
-            yield f"data: {json.dumps({'type': 'complete', 'data': completion_data})}\n\n"
+            # Send the result to the client
+            yield sse_event('result', test_result)
+
+        except CircuitOpenError as e:
+            yield sse_event('skipped', {"model_id": model_id, "model_name": model_name, "reason": str(e)})
             
         except Exception as e:
-            # Send overall error
-            overall_error_data = {"error_message": "Overall error: " + str(e)}
-            yield f"data: {json.dumps({'type': 'error', 'data': overall_error_data})}\n\n"
-    
-    return Response(generate(), mimetype='text/event-stream')
+            # Send error for this model
+            error_data = {
+                "model_name": model_name,
+                "error_message": str(e)
+            }
+            yield sse_event('error', error_data)
+
+def _generate_parallel(models_to_test, problem_text, correct_answer, workers, stream=False, use_cache=True):
+    """
+    Test models on a thread pool and emit progress/result/error events as each one finishes.
+
+    Workers report back through a queue so that, in streaming mode, text fragments can be
+    relayed as `partial` events while the models are still generating.
+    """
+    total_models = len(models_to_test)
+    events = queue.Queue()
+
+    def _worker(model_id, model_name):
+        on_delta = None
+        if stream:
+            on_delta = lambda text: events.put(("partial", model_id, model_name, text))
+        try:
+            check_circuit(model_id)
+            test_result, _ = run_model_test(model_id, model_name, problem_text, correct_answer,
+                                            raise_on_error=True, stream=stream, on_delta=on_delta,
+                                            use_cache=use_cache)
+            events.put(("result", model_id, model_name, test_result))
+        except CircuitOpenError as e:
+            events.put(("skipped", model_id, model_name, str(e)))
+        except Exception as e:
+            events.put(("error", model_id, model_name, str(e)))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, total_models)), thread_name_prefix="sweep")
+    try:
+        for model in models_to_test:
+            executor.submit(_worker, model.get("id"), model.get("name", "Unknown Model"))
+
+        completed = 0
+        while completed < total_models:
+            kind, model_id, model_name, payload = events.get()
+
+            if kind == "partial":
+                # Coalesce fragments that queued up since the last event into one message per model
+                pending = [(kind, model_id, model_name, payload)]
+                while True:
+                    try:
+                        pending.append(events.get_nowait())
+                    except queue.Empty:
+                        break
+                merged = {}
+                for item in pending:
+                    if item[0] == "partial":
+                        key = (item[1], item[2])
+                        merged[key] = merged.get(key, "") + item[3]
+                    else:
+                        # Final events go back on the queue, behind the partial text
+                        events.put(item)
+                for (partial_model_id, partial_model_name), text in merged.items():
+                    yield sse_event('partial', {"model_id": partial_model_id, "model_name": partial_model_name, "text": text})
+                continue
+
+            completed += 1
+            progress_data = {
+                "current_model_count": completed,
+                "total_models": total_models,
+                "testing_model_name": model_name,
+                "completed_model_name": model_name
+            }
+            yield sse_event('progress', progress_data)
+
+            if kind == "result":
+                yield sse_event('result', payload)
+            elif kind == "skipped":
+                yield sse_event('skipped', {"model_id": model_id, "model_name": model_name, "reason": payload})
+            else:
+                error_data = {
+                    "model_name": model_name,
+                    "error_message": payload
+                }
+                yield sse_event('error', error_data)
+    finally:
+        # If the browser disconnects mid-sweep, drop the models that have not started yet
+        executor.shutdown(wait=False, cancel_futures=True)
 
 @app.route('/api/test-subset')
 def test_subset():
     """
     Test a subset of free models (first 3) for quick testing.
+
+    Query parameters:
+        no_cache: 1 to skip the response cache and call every model.
     
     Returns:
         JSON: The test results for each model.
@@ -283,123 +579,212 @@ def test_subset():
         # Get free models
         free_models = client.get_free_models()
         
-        # Take only the first 3 models
-        models_to_test = free_models[:3]
-        
-        results = []
-        for model in models_to_test:
+        # Take the first 3 models whose circuits are not open
+        models_to_test = [m for m in free_models if client.circuit_breakers.state(m.get("id")) == CLOSED][:3]
+        use_cache = request.args.get("no_cache", "0") not in ("1", "true")
+        problem = problem_cache.get()
+
+        def _test(model):
             model_id = model.get("id")
             model_name = model.get("name", "Unknown Model")
-            
             try:
-                # Test the model
-                result = client.send_math_problem(model_id, current_problem)
-
-                # Log before evaluation
-                response_text_snippet_subset = result.get('response_text', '')[:100]
-                app.logger.debug(f"Calling client.evaluate_response in test_subset for model {model_name}. Expected answer: '{current_correct_answer}'. Model response (first 100 chars): '{response_text_snippet_subset}'")
-                
-                # Evaluate the response
-                is_correct, found_answer = client.evaluate_response(result.get("response_text", ""), current_correct_answer)
-                
-                # Calculate score
-                score = calculate_score(is_correct, result.get("response_time_seconds", 0), result.get("total_tokens", 0))
-                
-                # Format the result
-                test_result = {
-                    "model_id": model_id,
-                    "model_name": model_name,
-                    "correct": is_correct,
-                    "response_time": round(result["response_time_seconds"], 2),
-                    "token_usage": {
-                        "prompt": result["prompt_tokens"],
-                        "completion": result["completion_tokens"],
-                        "total": result.get("total_tokens", 0)
-                    },
-                    "answer": found_answer if is_correct else "Incorrect",
-                    "score": score
-                }
-                
-                # Save the result to the database
-                result_to_save = {
-                    "model_id": model_id,
-                    "model_name": model_name,
-                    "prompt": current_problem,
-                    "response_text": result.get("response_text", ""),
-                    "is_correct": is_correct,
-                    "answer_found": found_answer if is_correct else "Incorrect",
-                    "response_time": result["response_time_seconds"],
-                    "prompt_tokens": result["prompt_tokens"],
-                    "completion_tokens": result["completion_tokens"],
-                    "total_tokens": result.get("total_tokens", 0),
-                        "score": score,
-                        "expected_answer": current_correct_answer
-                }
-                database.save_result(result_to_save)
-                
-                results.append(test_result)
-                
+                test_result, _ = run_model_test(model_id, model_name, problem.text, problem.correct_answer,
+                                                use_cache=use_cache)
+                return test_result
             except Exception as e:
                 # Add error result for this model
-                error_result = {
+                return {
                     "model_id": model_id,
                     "model_name": model_name,
                     "error": str(e)
                 }
-                results.append(error_result)
+
+        # Test the models concurrently, keeping the original order in the response
+        with metrics.SWEEPS_IN_FLIGHT.track_in_progress(route="/api/test-subset"), \
+                ThreadPoolExecutor(max_workers=max(1, min(SWEEP_WORKERS, len(models_to_test)))) as executor:
+            results = list(executor.map(_test, models_to_test))
         
         return jsonify({"results": results})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def calculate_score(is_correct, response_time, total_tokens):
+@app.route('/api/matrix')
+def test_matrix():
     """
-    Calculate the score for a model based on correctness, response time, and token usage.
-    
-    Args:
-        is_correct (bool): Whether the model provided the correct answer.
-        response_time (float): The response time in seconds.
-        total_tokens (int): The total number of tokens used.
-    
+    Test models against every problem of a suite and stream the results.
+
+    Every (model, problem) cell goes onto a shared work queue that interleaves
+    models, so a suite runs in about (cells / workers) test durations while each
+    model sees at most `per_model` concurrent calls.
+
+    Query parameters:
+        suite: Name of the problem suite (required, see /api/suites).
+        models: Comma-separated model IDs (default: the free catalog).
+        limit: Maximum number of free models when `models` is not given
+            (default SWEEP_MAX_MODELS, 0 = all).
+        workers: Cells tested concurrently (default MATRIX_WORKERS).
+        per_model: Cells of one model tested concurrently (default MATRIX_PER_MODEL_CONCURRENCY).
+        stream: 1 to use streamed completions.
+        no_cache: 1 to skip the response cache and call every model.
+
     Returns:
-        int: The calculated score (0-100).
+        Stream: Server-sent events: `total`, a `cell` event per finished cell, a
+            `model` rollup once all of a model's cells have finished, and
+            `complete` with every model's rollup.
     """
-    # Correctness score (70 points)
-    correctness_score = 70 if is_correct else 0
-    
-    # Response time score (20 points)
-    if response_time <= 1:
-        time_score = 20
-    elif response_time <= 2:
-        time_score = 15
-    elif response_time <= 3:
-        time_score = 10
-    elif response_time <= 4:
-        time_score = 5
-    else:
-        time_score = 0
-    
-    # Token efficiency score (10 points)
-    if total_tokens <= 100:
-        token_score = 10
-    elif total_tokens <= 200:
-        token_score = 8
-    elif total_tokens <= 300:
-        token_score = 6
-    elif total_tokens <= 400:
-        token_score = 4
-    elif total_tokens <= 500:
-        token_score = 2
+    suite_name = request.args.get("suite", "")
+    problems = database.get_suite(suite_name) if suite_name else None
+    if not problems:
+        return jsonify({"error": f"Unknown problem suite: {suite_name!r}"}), 404
+    model_ids = [m.strip() for m in request.args.get("models", "").split(",") if m.strip()]
+    limit = request.args.get("limit", SWEEP_MAX_MODELS, type=int)
+    workers = request.args.get("workers", MATRIX_WORKERS, type=int)
+    per_model = request.args.get("per_model", MATRIX_PER_MODEL_CONCURRENCY, type=int)
+    stream = request.args.get("stream", "0") in ("1", "true")
+    use_cache = request.args.get("no_cache", "0") not in ("1", "true")
+
+    def _run_cell(cell):
+        try:
+            check_circuit(cell.model_id)
+        except CircuitOpenError as e:
+            return "skipped", str(e)
+        test_result, _ = run_model_test(cell.model_id, cell.model_name, cell.problem["prompt"],
+                                        cell.problem["expected_answer"], raise_on_error=True,
+                                        stream=stream, use_cache=use_cache)
+        return "result", test_result
+
+    def generate():
+        with metrics.SWEEPS_IN_FLIGHT.track_in_progress(route="/api/matrix"):
+            try:
+                models = _selected_models(model_ids, limit)
+                yield sse_event('total', {'suite': suite_name, 'total_models': len(models),
+                                          'total_problems': len(problems), 'total_cells': len(models) * len(problems)})
+                for kind, data in run_matrix(models, problems, _run_cell, workers=workers, per_model=per_model):
+                    yield sse_event(kind, data)
+            except Exception as e:
+                yield sse_event('error', {"error_message": "Overall error: " + str(e)})
+
+    return Response(generate(), mimetype='text/event-stream')
+
+def _selected_models(model_ids, limit):
+    """
+    Return the (model_id, model_name) pairs to run, healthiest first: the given
+    model IDs, or the free catalog cut to `limit` models (0 = all).
+    """
+    if model_ids:
+        models = []
+        for model_id in model_ids:
+            details = client.get_model(model_id)
+            models.append({"id": model_id, "name": details.get("name", model_id) if details else model_id})
     else:
-        token_score = 0
-    
-    # Total score
-    return correctness_score + time_score + token_score
+        models = client.get_free_models()
+        models = models[:limit] if limit and limit > 0 else models
+    return [(m.get("id"), m.get("name", "Unknown Model")) for m in order_by_health(models)]
+
+@app.route('/api/trials')
+def test_trials():
+    """
+    Rank models by sampling each one repeatedly on the current problem and stream the results.
+
+    Models are sampled in rounds, using the API's `n` parameter so one request
+    returns several samples where the provider supports it. After each round a
+    model stops being sampled once its accuracy confidence interval settles its
+    rank (see trials.py), so clearly better or worse models cost few calls.
+    Every sample is saved as a result carrying the run's trial_group_id.
+
+    Query parameters:
+        models: Comma-separated model IDs (default: the free catalog).
+        limit: Maximum number of free models when `models` is not given
+            (default SWEEP_MAX_MODELS, 0 = all).
+        min_samples: Samples per model before any stopping rule applies (default TRIALS_MIN_SAMPLES).
+        max_samples: Samples per model at most (default TRIALS_MAX_SAMPLES).
+        batch: Samples per model and round after the first (default TRIALS_BATCH).
+        precision: Accuracy interval half-width at which a model counts as
+            measured (default TRIALS_PRECISION).
+        workers: Models sampled concurrently (default TRIALS_WORKERS).
+
+    Returns:
+        Stream: Server-sent events: `total` with the trial_group_id, a `round`
+            event per round, `settled` when a model stops being sampled, and
+            `complete` with every model's accuracy (with confidence interval),
+            mean/p50/p95 latency and the calls used, best model first.
+    """
+    model_ids = [m.strip() for m in request.args.get("models", "").split(",") if m.strip()]
+    limit = request.args.get("limit", SWEEP_MAX_MODELS, type=int)
+    min_samples = request.args.get("min_samples", TRIALS_MIN_SAMPLES, type=int)
+    max_samples = request.args.get("max_samples", TRIALS_MAX_SAMPLES, type=int)
+    batch = request.args.get("batch", TRIALS_BATCH, type=int)
+    precision = request.args.get("precision", TRIALS_PRECISION, type=float)
+    workers = request.args.get("workers", TRIALS_WORKERS, type=int)
+    if min_samples < 1 or batch < 1 or max_samples < min_samples:
+        return jsonify({"error": "Need 1 <= min_samples <= max_samples and batch >= 1"}), 400
+
+    problem = problem_cache.get()
+    trial_group_id = uuid.uuid4().hex
+
+    def _sample(model_id, model_name, n):
+        check_circuit(model_id)
+        with metrics.MODEL_TESTS_IN_FLIGHT.track_in_progress():
+            samples = client.sample_math_problem(model_id, problem.text, n)
+        if samples[0].get("error"):
+            raise Exception(samples[0].get("response_text", "Unknown error during model test"))
+        graded = []
+        for sample in samples:
+            test_result = record_result(model_id, model_name, problem.text, problem.correct_answer, sample,
+                                        trial_group_id=trial_group_id)
+            graded.append({"correct": test_result["correct"], "response_time": sample["response_time_seconds"]})
+        return graded
+
+    def generate():
+        with metrics.SWEEPS_IN_FLIGHT.track_in_progress(route="/api/trials"):
+            try:
+                models = _selected_models(model_ids, limit)
+                yield sse_event('total', {'trial_group_id': trial_group_id, 'total_models': len(models),
+                                          'min_samples': min_samples, 'max_samples': max_samples})
+                for kind, data in run_trials(models, _sample, min_samples=min_samples, max_samples=max_samples,
+                                             batch=batch, precision=precision, workers=workers):
+                    if kind == "complete":
+                        data["trial_group_id"] = trial_group_id
+                    yield sse_event(kind, data)
+            except Exception as e:
+                yield sse_event('error', {"error_message": "Overall error: " + str(e)})
+
+    return Response(generate(), mimetype='text/event-stream')
+
+@app.route('/api/suites', methods=['GET', 'POST'])
+def suites():
+    """
+    List problem suites, or create/replace one.
+
+    Request body (POST):
+        name: Suite name.
+        problems: List of {"problem_text", "correct_answer"} objects, in run order.
+
+    Returns:
+        JSON: {"suites": [{"name", "problems", "updated_at"}]} for GET, and the
+            suite name and problem count for POST.
+    """
+    if request.method == 'GET':
+        return jsonify({"suites": database.list_suites()})
+    data = request.get_json(silent=True) or {}
+    try:
+        problems = [(p["problem_text"], p["correct_answer"]) for p in data.get("problems") or []]
+        database.save_suite(data.get("name"), problems)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid suite: {e}"}), 400
+    return jsonify({"name": data["name"], "problems": len(problems)})
+
+@app.route('/api/suites/<name>')
+def get_suite(name):
+    """Get the problems of one suite in run order, or 404."""
+    problems = database.get_suite(name)
+    if problems is None:
+        return jsonify({"error": f"Unknown problem suite: {name!r}"}), 404
+    return jsonify({"name": name, "problems": problems})
 
 @app.route('/api/problem', methods=['POST'])
 def update_problem():
     """Update the current math problem and its correct answer."""
-    global current_problem, current_correct_answer
     data = request.json
     new_problem_text = data.get('problem_text')
     new_correct_answer = data.get('correct_answer')
@@ -407,30 +792,213 @@ def update_problem():
     if not new_problem_text or not new_correct_answer:
         return jsonify({"error": "Both problem_text and correct_answer are required"}), 400
     
-    # Save to database
-    database.save_global_problem(new_problem_text, new_correct_answer)
-    
-    # Update global variables
-    current_problem = new_problem_text
-    current_correct_answer = new_correct_answer
+    # Save to database; other workers pick the change up from the change feed
+    problem = problem_cache.set(new_problem_text, new_correct_answer)
 
     return jsonify({
         "message": "Problem and answer updated successfully",
-        "current_problem": current_problem,
-        "current_correct_answer": current_correct_answer
+        "current_problem": problem.text,
+        "current_correct_answer": problem.correct_answer,
+        "version": problem.version
     })
 
 @app.route('/api/results')
 def get_results():
-    """Get all saved test results from the database."""
+    """
+    Get saved test results, newest first, one page at a time.
+
+    Query parameters:
+        limit: Results per page (default RESULTS_PAGE_SIZE, at most RESULTS_MAX_PAGE_SIZE).
+        cursor: The next_cursor of the previous page.
+        model_id: Only results of this model.
+        since / until: ISO 8601 timestamps bounding the results (until is exclusive).
+        correct: 1 for correct results only.
+        trial_group_id: Only the samples of this /api/trials run.
+        granularity: "raw" for individual results, "day" for per-day, per-model
+            summaries, or "auto" (default): "day" when `since` reaches back past the
+            retention window, whose raw results have been rolled up.
+
+    Returns:
+        JSON: {"granularity": "raw", "results": [...], "next_cursor": str or null};
+            pass next_cursor back to get the following page, null means there are
+            no more results. With granularity "day", results holds every daily
+            summary in the range and next_cursor is null.
+    """
     try:
-        results_list = database.get_all_results()
-        return jsonify(results_list)
+        limit = min(max(request.args.get("limit", RESULTS_PAGE_SIZE, type=int), 1), RESULTS_MAX_PAGE_SIZE)
+        since = _parse_timestamp_arg("since")
+        until = _parse_timestamp_arg("until")
+        granularity = _results_granularity(request.args.get("granularity", "auto"), since)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if result_writer and not request.args.get("cursor"):
+            # Read-your-writes: give queued results a moment to land first
+            result_writer.flush(timeout=RESULTS_FLUSH_TIMEOUT)
+        if granularity == "day":
+            daily = database.get_daily_results(since=since, until=until,
+                                               model_id=request.args.get("model_id") or None)
+            return jsonify({"granularity": "day", "results": daily, "next_cursor": None})
+        results_list, next_cursor = database.get_results_page(
+            limit=limit,
+            cursor=request.args.get("cursor") or None,
+            model_id=request.args.get("model_id") or None,
+            since=since,
+            until=until,
+            correct_only=request.args.get("correct", "0") in ("1", "true"),
+            trial_group_id=request.args.get("trial_group_id") or None)
+        return jsonify({"granularity": "raw", "results": results_list, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Log the exception for more detailed debugging if needed
         app.logger.error(f"Error fetching results: {e}")
         return jsonify({"error": "An error occurred while fetching results."}), 500
 
+@app.route('/api/results/export')
+def export_results():
+    """
+    Stream every saved result matching the /api/results filters as a file download.
+
+    Rows are read from the database and written out EXPORT_CHUNK_SIZE at a time,
+    so the export never holds more than one chunk in memory. Rolled-up history
+    past the retention window is not included; use granularity=day on
+    /api/results for it.
+
+    Query parameters:
+        format: csv (default), jsonl, parquet or arrow (the last two need pyarrow).
+        model_id, since, until, correct, trial_group_id: As for /api/results.
+        response_text: 1 to include each result's full response text.
+
+    Returns:
+        The export as an attachment, newest result first.
+    """
+    fmt = request.args.get("format", "csv").lower()
+    try:
+        check_format(fmt)
+        since = _parse_timestamp_arg("since")
+        until = _parse_timestamp_arg("until")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if result_writer:
+        result_writer.flush(timeout=RESULTS_FLUSH_TIMEOUT)
+    include_response = request.args.get("response_text", "0") in ("1", "true")
+    chunks = database.iter_results(
+        model_id=request.args.get("model_id") or None,
+        since=since,
+        until=until,
+        correct_only=request.args.get("correct", "0") in ("1", "true"),
+        include_response=include_response,
+        chunk_size=EXPORT_CHUNK_SIZE,
+        trial_group_id=request.args.get("trial_group_id") or None)
+    response = Response(stream_export(chunks, fmt, include_response=include_response),
+                        mimetype=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{export_filename(fmt)}"'
+    return response
+
+@app.route('/api/results/<int:result_id>')
+def get_result(result_id):
+    """
+    Get one saved result, including the full response text that /api/results
+    leaves out.
+
+    Returns:
+        JSON: The result, or 404 if there is no result with that id.
+    """
+    try:
+        result = database.get_result(result_id)
+    except Exception as e:
+        app.logger.error(f"Error fetching result {result_id}: {e}")
+        return jsonify({"error": "An error occurred while fetching the result."}), 500
+    if result is None:
+        return jsonify({"error": f"Result {result_id} not found"}), 404
+    return jsonify(result)
+
+@app.route('/api/leaderboard')
+def get_leaderboard():
+    """
+    Get per-model summaries from the incrementally maintained leaderboard.
+
+    Query parameters:
+        problem: "current" (default) for runs on the current problem only, or "all"
+            to combine every problem.
+
+    Returns:
+        JSON: {"problem_key": str or null, "models": [...]} with each model's run
+            count, accuracy, mean/min/max response time, mean tokens, best and
+            average score and last test time, best average score first.
+    """
+    scope = request.args.get("problem", "current")
+    if scope not in ("current", "all"):
+        return jsonify({"error": "problem must be 'current' or 'all'"}), 400
+    try:
+        if result_writer:
+            result_writer.flush(timeout=RESULTS_FLUSH_TIMEOUT)
+        key = database.problem_key(*problem_cache.get()[:2]) if scope == "current" else None
+        return jsonify({"problem_key": key, "models": database.get_leaderboard(problem_key=key)})
+    except Exception as e:
+        app.logger.error(f"Error fetching leaderboard: {e}")
+        return jsonify({"error": "An error occurred while fetching the leaderboard."}), 500
+
+def _results_granularity(granularity, since):
+    """Resolve the granularity parameter of /api/results to "raw" or "day"."""
+    if granularity not in ("auto", "raw", "day"):
+        raise ValueError("granularity must be 'auto', 'raw' or 'day'")
+    if granularity == "auto":
+        # Raw results older than RESULTS_RETENTION_DAYS have been rolled up by
+        # retention.py (0 keeps everything). Timestamps are stored in UTC.
+        expired = (RESULTS_RETENTION_DAYS > 0 and since is not None
+                   and since < _utcnow() - timedelta(days=RESULTS_RETENTION_DAYS))
+        return "day" if expired else "raw"
+    return granularity
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _parse_timestamp_arg(name):
+    """
+    Parse an optional ISO 8601 query parameter into a naive UTC datetime, the
+    form timestamps are stored in. Timestamps without an offset are taken as UTC.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp, got {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def start_background_jobs():
+    """
+    Start the work that only a serving process needs.
+
+    Kept out of module import so tests and scripts importing the app do not
+    reach out to OpenRouter. Called below when run directly; WSGI servers
+    should call it once per worker (e.g. from gunicorn's post_worker_init).
+    """
+    # Open keep-alive connections in the background so the first test does not pay
+    # for DNS/TCP/TLS setup inside its measured response time.
+    if WARM_UP_CONNECTIONS > 0:
+        threading.Thread(target=client.warm_up, args=(WARM_UP_CONNECTIONS,), daemon=True).start()
+    # init_db() created the partitions for the coming days at startup; keep creating
+    # them while the app runs, whether or not retention is enabled
+    threading.Thread(target=_maintain_partitions, name="partition-maintenance", daemon=True).start()
+
+def _maintain_partitions():
+    while True:
+        time.sleep(database.PARTITION_MAINTENANCE_INTERVAL)
+        try:
+            database.maintain_partitions()
+        except Exception as e:
+            print(f"Partition maintenance failed: {e}")
+
+
 if __name__ == '__main__':
+    start_background_jobs()
     # Run the Flask app
     app.run(debug=True, host='0.0.0.0', port=5002)
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Asyncio counterpart of OpenRouterClient.
+
+Built on aiohttp so a single event loop can keep many model requests in flight
+without dedicating a thread to each one. Request payloads, response parsing and
+answer evaluation are shared with the synchronous client.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+import logging
+
+import aiohttp
+
+from openrouter_client import (
+    DEFAULT_BASE_URL,
+    DEFAULT_POOL_MAXSIZE,
+    REQUEST_TIMEOUT_SECONDS,
+    build_chat_payload,
+    parse_chat_response,
+    evaluate_response,
+)
+from model_catalog import is_free_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncOpenRouterClient:
+    """Asyncio client for interacting with the OpenRouter API"""
+
+    def __init__(self, api_key, pool_maxsize=None, timeout=REQUEST_TIMEOUT_SECONDS):
+        """
+        Initialize the client with the API key.
+
+        The underlying aiohttp session is created lazily on first use so the client
+        can be constructed outside of a running event loop.
+
+        Args:
+            api_key (str): The OpenRouter API key.
+            pool_maxsize (int): Maximum number of simultaneous connections per host.
+            timeout (int): Total timeout in seconds for a single request.
+        """
+        self.api_key = api_key
+        self.base_url = DEFAULT_BASE_URL
+        self.pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+        self.timeout = timeout
+        self.models_cache = None
+        self.models_cache_time = None
+        self.cache_duration = timedelta(minutes=30)  # Cache models for 30 minutes
+        self._session = None
+        self._models_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        """Return the shared aiohttp session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_maxsize)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the underlying aiohttp session and its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_models(self):
+        """Get all available models from OpenRouter"""
+        if self._models_lock is None:
+            self._models_lock = asyncio.Lock()
+
+        # Concurrent callers wait for a single in-flight download instead of each fetching
+        async with self._models_lock:
+            if self.models_cache and self.models_cache_time and datetime.now() - self.models_cache_time < self.cache_duration:
+                return self.models_cache
+
+            try:
+                async with self._get_session().get(f"{self.base_url}/models") as response:
+                    response.raise_for_status()
+                    models = (await response.json()).get("data", [])
+
+                self.models_cache = models
+                self.models_cache_time = datetime.now()
+                return models
+            except Exception as e:
+                print(f"Error fetching models: {e}")
+                # If we have a cache, return it even if expired
+                if self.models_cache:
+                    print("Returning expired cache due to error")
+                    return self.models_cache
+                raise
+
+    async def get_free_models(self):
+        """Get all free models from OpenRouter"""
+        return [model for model in await self.get_models() if is_free_model(model)]
+
+    async def send_math_problem(self, model_id, problem_text):
+        """
+        Send a math problem to a specific model and return the response.
+
+        Returns the same dictionary shape as OpenRouterClient.send_math_problem,
+        including the "error", "error_type" and (for HTTP errors) "status_code"
+        keys on failure, so results can be recorded in circuit breakers and metrics.
+        """
+        start_time = time.time()
+        try:
+            async with self._get_session().post(
+                f"{self.base_url}/chat/completions",
+                json=build_chat_payload(model_id, problem_text)
+            ) as response:
+                body = await response.text()
+                if response.status >= 400:
+                    print(f"Error Response Text: {body}", flush=True)
+                response.raise_for_status()
+                response_data = json.loads(body)
+            return parse_chat_response(response_data, time.time() - start_time)
+        except asyncio.TimeoutError:
+            print(f"Request Timed Out for model {model_id}", flush=True)
+            return {
+                "response_text": f"Request timed out after {self.timeout} seconds",
+                "response_time_seconds": self.timeout,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                "error": "timeout",
+                "error_type": "timeout"
+            }
+        except aiohttp.ClientResponseError as e:
+            print(f"Network/Request Error for model {model_id}: {e}", flush=True)
+            # No limiter retries 429s here, so they surface like the sync client's exhausted retries
+            if e.status == 429:
+                return {
+                    "response_text": f"Rate limited: {str(e)}",
+                    "response_time_seconds": time.time() - start_time,
+                    "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                    "error": "rate_limited",
+                    "error_type": "rate_limited"
+                }
+            return {
+                "response_text": f"Network/Request Error: {str(e)}",
+                "response_time_seconds": time.time() - start_time,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                "error": f"Network/Request Error: {str(e)}",
+                "error_type": "http_error",
+                "status_code": e.status
+            }
+        except aiohttp.ClientError as e:
+            print(f"Network/Request Error for model {model_id}: {e}", flush=True)
+            return {
+                "response_text": f"Network/Request Error: {str(e)}",
+                "response_time_seconds": time.time() - start_time,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                "error": f"Network/Request Error: {str(e)}",
+                "error_type": "network_error",
+                "status_code": None
+            }
+        except json.JSONDecodeError as e:
+            print(f"JSON Decode Error for model {model_id}: {e}", flush=True)
+            return {
+                "response_text": f"Invalid JSON Response: {body}",
+                "response_time_seconds": time.time() - start_time,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                "error": f"JSON Decode Error: {str(e)}",
+                "error_type": "json_error"
+            }
+
+    def evaluate_response(self, response_text, expected_answer):
+        """
+        Evaluate if the response contains the expected_answer.
+        Numeric answers are compared by value, others matched as a whole word.
+        """
+        return evaluate_response(response_text, expected_answer)
+
+    async def test_many(self, model_ids, problem, concurrency=DEFAULT_CONCURRENCY, expected_answer=None):
+        """
+        Send `problem` to every model in `model_ids` and yield results as they complete.
+
+        At most `concurrency` requests are in flight at once. Each yielded result is
+        the send_math_problem dictionary plus "model_id"; when `expected_answer` is
+        given it also carries "is_correct" and "found_answer".
+
+        Usage:
+            async for result in client.test_many(model_ids, problem, concurrency=20):
+                ...
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _run(model_id):
+            async with semaphore:
+                result = await self.send_math_problem(model_id, problem)
+            result["model_id"] = model_id
+            if expected_answer is not None:
+                result["is_correct"], result["found_answer"] = self.evaluate_response(
+                    result.get("response_text", ""), expected_answer)
+            return result
+
+        tasks = [asyncio.ensure_future(_run(model_id)) for model_id in model_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Cancel whatever is still pending if the consumer stops early
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the scoring, evaluation and persistence hot paths.
+
+Runs each benchmark with timeit (auto-ranged loops, several repeats), prints the
+per-call timings and optionally saves them as a baseline or compares them with
+one:
+
+    python benchmark.py run --save baseline.json
+    python benchmark.py run --compare baseline.json
+    python benchmark.py compare baseline.json current.json
+
+Database benchmarks (save_result / get_all_results at 10k to 1M rows) only run
+with --db-rows, against the database configured through the DB_* environment
+variables. They add rows tagged with the "bench/" model prefix and remove them
+afterwards unless --keep-rows is given; use a scratch database.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+from answer_matcher import evaluate_many
+from openrouter_client import OpenRouterClient, evaluate_response
+from scoring import calculate_score
+from sse import sse_event
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10  # Relative slowdown reported as a regression
+BENCH_MODEL_PREFIX = "bench/"
+
+REASONING_STEP = (
+    "We are given x² + y² = 25 and x + y = 7. Squaring the second equation gives "
+    "(x + y)² = x² + 2xy + y² = 49. Substituting the first equation, 25 + 2xy = 49, "
+    "so 2xy = 24. Checking with x = 3 and y = 4: 3 + 4 = 7 and 9 + 16 = 25, which "
+    "matches. Alternatively x = 4, y = 3 gives the same product. Note 13, 21, 112 and "
+    "1.2 are intermediate values that must not be confused with the result. "
+)
+
+
+def long_response(answer, steps=40):
+    """A realistic ~10k character chain-of-thought response ending with `answer`."""
+    return REASONING_STEP * steps + f"\n\nTherefore, the value of xy is **{answer}**."
+
+
+def synthetic_catalog(size=400, free_every=3):
+    """A catalog shaped like OpenRouter's /models data, with every `free_every`-th model free."""
+    providers = ["google", "meta-llama", "mistralai", "qwen", "deepseek", "openai", "anthropic", "nousresearch"]
+    models = []
+    for i in range(size):
+        free = i % free_every == 0
+        models.append({
+            "id": f"{providers[i % len(providers)]}/model-{i}{':free' if free else ''}",
+            "name": f"Model {i}",
+            "description": "A general purpose language model. " * 10,
+            "context_length": 4096 * (1 + i % 32),
+            "pricing": {"prompt": "0" if free else "0.000001", "completion": "0" if free else "0.000002",
+                        "request": "0", "image": "0"},
+            "architecture": {"modality": "text->text", "tokenizer": "Other"},
+            "top_provider": {"context_length": 4096 * (1 + i % 32), "is_moderated": False}
+        })
+    return models
+
+
+def _offline_client(catalog):
+    """An OpenRouterClient with `catalog` as its fresh in-memory catalog (no network)."""
+    client = OpenRouterClient("bench", response_cache=None,
+                              catalog_path=os.path.join(tempfile.gettempdir(), "bench_model_catalog.json"))
+    client.models_cache = catalog
+    client.models_cache_time = datetime.now()
+    return client
+
+
+def core_benchmarks():
+    """Return {name: callable} for the benchmarks that need no external services."""
+    correct_text = long_response("12")
+    incorrect_text = long_response("10")
+    result_event = {
+        "model_id": "google/gemma-3-27b-it:free", "model_name": "Google: Gemma 3 27B (free)",
+        "correct": True, "response_time": 3.42,
+        "token_usage": {"prompt": 61, "completion": 412, "total": 473},
+        "answer": "12", "score": 80, "cached": False,
+        "time_to_first_token": 0.812, "inter_token_latency": 0.0123, "tokens_per_second": 81.4
+    }
+    partial_event = {"model_id": "google/gemma-3-27b-it:free", "model_name": "Google: Gemma 3 27B (free)",
+                     "text": REASONING_STEP}
+    graded_batch = [correct_text, incorrect_text] * 500
+    client = _offline_client(synthetic_catalog())
+    client.get_free_models()  # Build the index outside the timed loop
+
+    return {
+        "evaluate_response/long_correct": lambda: evaluate_response(correct_text, "12"),
+        "evaluate_response/long_incorrect": lambda: evaluate_response(incorrect_text, "12"),
+        "evaluate_response/client_method": lambda: client.evaluate_response(correct_text, "12"),
+        "evaluate_many/1000_long": lambda: evaluate_many(graded_batch, "12"),
+        "calculate_score/plain": lambda: calculate_score(True, 3.42, 473),
+        "calculate_score/streamed": lambda: calculate_score(True, 3.42, 473, time_to_first_token=0.81,
+                                                            tokens_per_second=81.4),
+        "sse_event/result": lambda: sse_event("result", result_event),
+        "sse_event/partial": lambda: sse_event("partial", partial_event),
+        "get_free_models/cached_index": client.get_free_models,
+        "get_free_models/new_catalog": lambda: _offline_client_free_models(client),
+    }
+
+
+def _offline_client_free_models(client):
+    # Replacing the catalog list forces the index to be rebuilt, as after a refresh
+    client.models_cache = list(client.models_cache)
+    return client.get_free_models()
+
+
+def _bench_row(i):
+    return {
+        "model_id": f"{BENCH_MODEL_PREFIX}model-{i % 50}",
+        "model_name": f"Bench Model {i % 50}",
+        "prompt": "If x² + y² = 25 and x + y = 7, what is the value of xy?",
+        "response_text": long_response("12" if i % 3 else "10", steps=4),
+        "is_correct": bool(i % 3),
+        "answer_found": "12" if i % 3 else "Incorrect",
+        "response_time": 1.5 + (i % 40) / 10,
+        "prompt_tokens": 61,
+        "completion_tokens": 300 + i % 200,
+        "total_tokens": 361 + i % 200,
+        "score": 80 if i % 3 else 10,
+        "expected_answer": "12",
+        "cached": False
+    }
+
+
+def seed_database(rows):
+    """Top up the results table with bench rows so it holds at least `rows` rows."""
+    import database
+
+    missing = rows - database.count_results()
+    for start in range(0, max(0, missing), 10000):
+        database.save_results_batch([_bench_row(i) for i in range(start, min(missing, start + 10000))])
+
+
+def remove_bench_rows():
+    """Delete every row added by the database benchmarks."""
+    import database
+
+    database.delete_results(BENCH_MODEL_PREFIX)
+
+
+def database_benchmarks(rows):
+    """Seed the database to `rows` rows and return {name: callable} for the DB benchmarks."""
+    import database
+
+    database.init_db()
+    seed_database(rows)
+    row = _bench_row(0)
+    return {
+        f"database.save_result/{rows}": lambda: database.save_result(row),
+        f"database.get_all_results/{rows}": database.get_all_results,
+    }
+
+
+def measure(func, repeat=DEFAULT_REPEAT, min_time=0.2):
+    """
+    Time `func` and return per-call statistics in seconds.
+
+    The loop count is auto-ranged so each repeat takes at least `min_time`; slow
+    calls (like fetching a million rows) run once per repeat.
+    """
+    timer = timeit.Timer(func)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(loops, int(loops * min_time / max(elapsed, 1e-9)))
+    timings = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings)
+    }
+
+
+def run(names=None, db_rows=(), repeat=DEFAULT_REPEAT, keep_rows=False):
+    """Run the selected benchmarks and return the report dictionary."""
+    benchmarks = core_benchmarks()
+    results = {}
+    try:
+        for rows in db_rows:
+            benchmarks.update(database_benchmarks(rows))
+            for name in [n for n in benchmarks if n.endswith(f"/{rows}")]:
+                if not names or any(name.startswith(prefix) for prefix in names):
+                    results[name] = measure(benchmarks.pop(name), repeat=repeat)
+                    print(format_result(name, results[name]), flush=True)
+    finally:
+        if db_rows and not keep_rows:
+            remove_bench_rows()
+
+    for name, func in benchmarks.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        results[name] = measure(func, repeat=repeat)
+        print(format_result(name, results[name]), flush=True)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "db_backend": os.environ.get("DB_BACKEND", "postgres") if db_rows else None,
+        "results": results
+    }
+
+
+def _format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def format_result(name, stats):
+    return f"{name:<45} median={_format_time(stats['median']):>10} min={_format_time(stats['min']):>10} loops={stats['loops']}"
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two reports by median time per call.
+
+    Returns:
+        list: (name, baseline_median, current_median, ratio, verdict) per benchmark
+            present in both reports; verdict is "slower", "faster" or "same".
+    """
+    rows = []
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = stats["median"] / base["median"] if base["median"] else float("inf")
+        if ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append((name, base["median"], stats["median"], ratio, verdict))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':<45} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for name, base, current, ratio, verdict in rows:
+        marker = {"slower": "  REGRESSION", "faster": "  improved"}.get(verdict, "")
+        lines.append(f"{name:<45} {_format_time(base):>10} {_format_time(current):>10} "
+                     f"{(ratio - 1) * 100:>+7.1f}%{marker}")
+    return "\n".join(lines)
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scoring, evaluation and persistence hot paths.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--only", action="append", help="Only run benchmarks whose name starts with this")
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--db-rows", default="",
+                            help="Comma-separated table sizes for the database benchmarks, e.g. 10000,100000,1000000")
+    run_parser.add_argument("--keep-rows", action="store_true", help="Keep the seeded bench rows")
+    run_parser.add_argument("--save", help="Write the report to this JSON file")
+    run_parser.add_argument("--compare", help="Compare with this baseline report")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare_parser = sub.add_parser("compare", help="Compare two saved reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        db_rows = [int(rows) for rows in args.db_rows.split(",") if rows.strip()]
+        report = run(names=args.only, db_rows=db_rows, repeat=args.repeat, keep_rows=args.keep_rows)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Saved {len(report['results'])} results to {args.save}")
+        baseline = _load(args.compare) if args.compare else None
+    else:
+        baseline, report = _load(args.baseline), _load(args.current)
+
+    if baseline is not None:
+        rows = compare(baseline, report, threshold=args.threshold)
+        print()
+        print(format_comparison(rows))
+        # Non-zero exit when anything regressed, for use in CI
+        return 1 if any(verdict == "slower" for *_, verdict in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
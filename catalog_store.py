@@ -0,0 +1,50 @@
+"""
+On-disk snapshot of the OpenRouter model catalog.
+
+The snapshot stores the /models payload together with the time it was fetched
+and the HTTP validators (ETag / Last-Modified) needed for conditional refreshes,
+so a restarted worker can serve the catalog immediately instead of blocking on
+a full download.
+"""
+
+import json
+import os
+import tempfile
+
+DEFAULT_CATALOG_PATH = os.environ.get("MODEL_CATALOG_PATH", "model_catalog.json")
+
+
+def load_snapshot(path=DEFAULT_CATALOG_PATH):
+    """
+    Load a catalog snapshot.
+
+    Returns:
+        dict: {"models", "fetched_at" (Unix time), "etag", "last_modified"}, or None if
+            the file does not exist or cannot be read.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if not isinstance(snapshot.get("models"), list) or "fetched_at" not in snapshot:
+            print(f"Ignoring malformed model catalog snapshot at {path}")
+            return None
+        return snapshot
+    except (OSError, ValueError) as e:
+        print(f"Error loading model catalog snapshot from {path}: {e}")
+        return None
+
+
+def save_snapshot(snapshot, path=DEFAULT_CATALOG_PATH):
+    """Atomically write a catalog snapshot, so readers never see a partial file."""
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=".model_catalog.", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error saving model catalog snapshot to {path}: {e}")
@@ -0,0 +1,198 @@
+"""
+Per-model circuit breakers.
+
+Free models go down regularly. A breaker per model_id opens after repeated
+failures (timeouts, network errors, 5xx...), so sweeps skip the model instead
+of waiting up to the full request timeout on every run. After a cool-down the
+breaker goes half-open and a single cheap probe decides whether the model is
+tested again or stays open (with a longer cool-down).
+"""
+
+import os
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Defaults, overridable through the environment.
+DEFAULT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "3"))
+DEFAULT_RECOVERY_SECONDS = float(os.environ.get("CIRCUIT_RECOVERY_SECONDS", "300"))
+DEFAULT_MAX_RECOVERY_SECONDS = float(os.environ.get("CIRCUIT_MAX_RECOVERY_SECONDS", "3600"))
+
+# Outcomes that say something about the model's health. Rate limiting is handled by
+# the rate limiter and client-side problems (bad key, bad request) are not the
+# model's fault, so neither counts.
+FAILURE_ERROR_TYPES = {"timeout", "network_error", "json_error", "unexpected"}
+FAILURE_STATUS_CODES = {404, 408}
+
+
+def is_failure(result):
+    """Return True if a send_math_problem result counts as a model failure."""
+    error_type = result.get("error_type")
+    if error_type in FAILURE_ERROR_TYPES:
+        return True
+    if error_type == "http_error":
+        status_code = result.get("status_code") or 0
+        return status_code >= 500 or status_code in FAILURE_STATUS_CODES
+    return False
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for a single model."""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, recovery_seconds=DEFAULT_RECOVERY_SECONDS,
+                 max_recovery_seconds=DEFAULT_MAX_RECOVERY_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.base_recovery_seconds = recovery_seconds
+        self.max_recovery_seconds = max_recovery_seconds
+        self.recovery_seconds = recovery_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def ready_for_probe(self):
+        """True if the breaker is open and its cool-down has elapsed."""
+        with self.lock:
+            return self._ready_for_probe()
+
+    def _ready_for_probe(self):
+        return self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_seconds
+
+    def retry_in(self):
+        """Seconds until an open breaker may be probed (0 if not open)."""
+        with self.lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.recovery_seconds - (time.monotonic() - self.opened_at))
+
+    def allow_request(self):
+        """
+        Return True if a request may be sent now.
+
+        An open breaker whose cool-down has elapsed moves to half-open and lets exactly
+        one request (the probe) through until its outcome is recorded.
+        """
+        return self._allow_request()[0]
+
+    def _allow_request(self):
+        """allow_request(), also returning whether the state changed: (allowed, changed)."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True, False
+            changed = False
+            if self._ready_for_probe():
+                self.state = HALF_OPEN
+                changed = True
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True, changed
+            return False, changed
+
+    def record_success(self):
+        """Close the breaker. Returns True if the state changed."""
+        with self.lock:
+            changed = self.state != CLOSED
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            self.recovery_seconds = self.base_recovery_seconds
+            return changed
+
+    def record_failure(self):
+        """Count a failure, opening the breaker at the threshold. Returns True if the state changed."""
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                # Failed probe: stay away for twice as long, up to the maximum
+                self.recovery_seconds = min(self.recovery_seconds * 2, self.max_recovery_seconds)
+                self._open()
+                return True
+            if self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+                return True
+            return False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+
+class CircuitBreakerRegistry:
+    """Circuit breakers keyed by model_id, created on first use."""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, recovery_seconds=DEFAULT_RECOVERY_SECONDS,
+                 max_recovery_seconds=DEFAULT_MAX_RECOVERY_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.max_recovery_seconds = max_recovery_seconds
+        self.breakers = {}
+        # Incremented on every state change, so callers can cheaply tell if anything moved
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def get(self, model_id):
+        with self.lock:
+            breaker = self.breakers.get(model_id)
+            if breaker is None:
+                breaker = self.breakers[model_id] = CircuitBreaker(
+                    self.failure_threshold, self.recovery_seconds, self.max_recovery_seconds)
+            return breaker
+
+    def state(self, model_id):
+        """Return the breaker state for `model_id` without creating a breaker."""
+        with self.lock:
+            breaker = self.breakers.get(model_id)
+        return breaker.state if breaker else CLOSED
+
+    def allow_request(self, model_id):
+        """
+        Return True if a request to `model_id` may be sent now (see CircuitBreaker.allow_request).
+
+        Goes through the registry so an open breaker moving to half-open counts as a
+        state change in `version`.
+        """
+        breaker = self.get(model_id)
+        allowed, changed = breaker._allow_request()
+        if changed:
+            self._changed(model_id, breaker)
+        return allowed
+
+    def record(self, model_id, result):
+        """Feed a send_math_problem result into the model's breaker."""
+        breaker = self.get(model_id)
+        if is_failure(result):
+            changed = breaker.record_failure()
+        elif result.get("error_type"):
+            # Rate limiting and client-side errors (bad key, rejected request) say
+            # nothing about health: release a half-open probe slot, change nothing else
+            with breaker.lock:
+                breaker.probe_in_flight = False
+            changed = False
+        else:
+            changed = breaker.record_success()
+        if changed:
+            self._changed(model_id, breaker)
+
+    def _changed(self, model_id, breaker):
+        with self.lock:
+            self.version += 1
+        print(f"Circuit for model {model_id} is now {breaker.state}", flush=True)
+
+    def snapshot(self):
+        """Return {model_id: {"state", "consecutive_failures", "retry_in"}} for non-closed breakers."""
+        with self.lock:
+            breakers = dict(self.breakers)
+        return {
+            model_id: {
+                "state": breaker.state,
+                "consecutive_failures": breaker.consecutive_failures,
+                "retry_in": round(breaker.retry_in(), 1)
+            }
+            for model_id, breaker in breakers.items()
+            if breaker.state != CLOSED
+        }
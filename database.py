@@ -1,6 +1,22 @@
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool  # PoolError
+from psycopg2.extras import execute_values
 import os
-from datetime import datetime
+import functools
+import base64
+import hashlib
+import binascii
+import json
+import re
+import select
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from metrics import DB_OPERATION_DURATION
 
 # PostgreSQL connection parameters fetched from environment variables
 # Defaults are provided for local development or if variables are not set.
@@ -13,20 +29,583 @@ DB_PASSWORD = os.environ.get("DB_PASSWORD", "testpassword")
 # Construct a DSN (Data Source Name) using the fetched parameters
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-def init_db():
-    conn = None  # Initialize conn to None
-    c = None # Initialize cursor to None
+# Connection pool sizing. Connections are opened lazily up to DB_POOL_MAX; callers
+# beyond that wait up to DB_POOL_TIMEOUT seconds for one to be returned.
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Connections idle for longer than this are pinged with SELECT 1 before reuse
+DB_POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", "30"))
+
+# Channel of the NOTIFY sent when the global problem changes, and the delay before
+# a lost LISTEN connection is reopened
+PROBLEM_CHANNEL = "global_problem_changed"
+PROBLEM_LISTEN_RETRY = float(os.environ.get("PROBLEM_LISTEN_RETRY", "5"))
+
+# Daily partitions of results created ahead of time (PostgreSQL), and how often a
+# serving process makes sure they exist
+PARTITION_DAYS_AHEAD = int(os.environ.get("DB_PARTITION_DAYS_AHEAD", "7"))
+PARTITION_MAINTENANCE_INTERVAL = float(os.environ.get("DB_PARTITION_MAINTENANCE_INTERVAL", "3600"))
+# Advisory lock serializing partition creation between processes
+PARTITION_LOCK_ID = 7268101
+
+# Optional per-result metrics recorded for streamed completions (NULL otherwise)
+STREAMING_METRIC_COLUMNS = ("time_to_first_token", "inter_token_latency", "tokens_per_second")
+
+def _timed(operation):
+    """Record the latency of a database function in db_operation_duration_seconds."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with DB_OPERATION_DURATION.time(operation=operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections.
+
+    Keeps up to `maxconn` connections open and reuses the most recently returned
+    one first. `minconn` connections are opened on first use; more are opened on
+    demand, and callers beyond `maxconn` wait up to `timeout` seconds for a free
+    one. Connections are health-checked on checkout: closed ones are replaced and
+    ones idle for longer than `ping_after` seconds must answer SELECT 1.
+
+    (psycopg2.pool closes every returned connection beyond minconn and fails
+    instead of waiting when exhausted, so it is not used here.)
+    """
+
+    def __init__(self, dsn, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 ping_after=DB_POOL_PING_AFTER):
+        self.dsn = dsn
+        self.minconn = min(minconn, maxconn)
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle = []  # (connection, last returned at), most recent last
+        self._size = 0
+        self._filled = False
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.health_check_failures = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self.lock:
+            self._size += 1
+        return conn
+
+    def _discard(self, conn):
+        with self.lock:
+            self._size -= 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _fill(self):
+        # Open the minimum number of connections the first time the pool is used
+        with self.lock:
+            missing = self.minconn - self._size if not self._filled else 0
+            self._filled = True
+        for _ in range(max(0, missing)):
+            conn = self._connect()
+            with self.lock:
+                self._idle.append((conn, time.monotonic()))
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as c:
+                c.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        while True:
+            with self.lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect()
+            conn, last_used = entry
+            if self._is_healthy(conn, last_used):
+                return conn
+            # Stale connection (e.g. the server restarted): drop it and try the next one
+            with self.lock:
+                self.health_check_failures += 1
+            self._discard(conn)
+
+    def _checkin(self, conn):
+        if conn.closed:
+            self._discard(conn)
+            return
+        try:
+            # Never hand out a connection with a transaction left open
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+        with self.lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of the block.
+
+        Uncommitted work is rolled back when the connection is returned.
+
+        Raises:
+            psycopg2.pool.PoolError: If no connection frees up within `timeout` seconds.
+            psycopg2.OperationalError: If a new connection cannot be opened.
+        """
+        if not self._slots.acquire(blocking=False):
+            start = time.monotonic()
+            acquired = self._slots.acquire(timeout=self.timeout)
+            with self.lock:
+                self.waits += 1
+                self.wait_seconds += time.monotonic() - start
+                if not acquired:
+                    self.timeouts += 1
+            if not acquired:
+                raise psycopg2.pool.PoolError(f"timed out after {self.timeout}s waiting for a database connection")
+        try:
+            if not self._filled:
+                self._fill()
+            conn = self._checkout()
+            with self.lock:
+                self.checkouts += 1
+            try:
+                yield conn
+            finally:
+                self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """Return pool size, usage and wait counters."""
+        with self.lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.maxconn,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "timeouts": self.timeouts,
+                "health_check_failures": self.health_check_failures
+            }
+
+    def close(self):
+        """Close every idle connection."""
+        with self.lock:
+            idle, self._idle = self._idle, []
+            self._filled = False
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+# Columns written for each result, in insert order. The problem text and expected
+# answer live in the problems table and the response text in response_blobs.
+RESULT_COLUMNS = (
+    "model_id", "model_name", "problem_id", "response_hash",
+    "is_correct", "answer_found", "response_time",
+    "prompt_tokens", "completion_tokens", "total_tokens", "score",
+    "time_to_first_token", "inter_token_latency", "tokens_per_second", "cached", "trial_group_id"
+)
+# Optional keys, NULL (or their default) when missing from a result dictionary
+OPTIONAL_RESULT_COLUMNS = {column: None for column in STREAMING_METRIC_COLUMNS}
+OPTIONAL_RESULT_COLUMNS["cached"] = False
+OPTIONAL_RESULT_COLUMNS["trial_group_id"] = None
+
+# Columns of a listed result (without the response text), joined from
+# "results r JOIN problems p"
+RESULT_SELECT_COLUMNS = (
+    "r.id", "r.model_id", "r.model_name", "p.prompt", "r.is_correct", "r.answer_found", "r.response_time",
+    "r.prompt_tokens", "r.completion_tokens", "r.total_tokens", "r.score", "p.expected_answer", "r.timestamp",
+    "r.time_to_first_token", "r.inter_token_latency", "r.tokens_per_second", "r.cached", "r.problem_id",
+    "r.trial_group_id"
+)
+RESULT_FROM = "results r JOIN problems p ON p.id = r.problem_id"
+# Full results also carry the compressed response body
+FULL_RESULT_SELECT_COLUMNS = RESULT_SELECT_COLUMNS + ("b.body AS response_body",)
+FULL_RESULT_FROM = RESULT_FROM + " JOIN response_blobs b ON b.hash = r.response_hash"
+
+# Columns that moved out of results into problems and response_blobs
+LEGACY_RESULT_COLUMNS = ("prompt", "response_text", "expected_answer")
+
+# zlib level for stored response texts (1 = fastest, 9 = smallest)
+RESPONSE_COMPRESSION_LEVEL = int(os.environ.get("RESPONSE_COMPRESSION_LEVEL", "6"))
+
+LEADERBOARD_COLUMNS = (
+    "model_id", "problem_key", "model_name", "runs", "correct_runs",
+    "total_response_time", "min_response_time", "max_response_time",
+    "total_tokens", "best_score", "total_score", "last_tested"
+)
+
+def _result_row(result, problem_id, response_hash):
+    values = {"problem_id": problem_id, "response_hash": response_hash}
+    return tuple(values[column] if column in values
+                 else result[column] if column not in OPTIONAL_RESULT_COLUMNS
+                 else result.get(column, OPTIONAL_RESULT_COLUMNS[column])
+                 for column in RESULT_COLUMNS)
+
+def _result_problems(results):
+    """Return the distinct (prompt, expected_answer) pairs of `results`."""
+    return {(result["prompt"], result.get("expected_answer")) for result in results}
+
+def _result_rows(results, problem_ids):
+    """
+    Return (rows, blobs) to insert for `results`: the results table rows and the
+    distinct response blobs they reference. `problem_ids` maps problem keys to ids.
+    """
+    rows = []
+    blobs = {}
+    for result in results:
+        blob = response_blob(result["response_text"])
+        blobs[blob[0]] = blob
+        problem_id = problem_ids[problem_key(result["prompt"], result.get("expected_answer"))]
+        rows.append(_result_row(result, problem_id, blob[0]))
+    return rows, list(blobs.values())
+
+def response_blob(text):
+    """
+    Return (hash, compressed body, length) for storing a response text.
+
+    Blobs are content-addressed by the SHA-256 of the text, so identical
+    responses (cached replays, models that answer the same way) are stored once.
+    """
+    data = (text or "").encode("utf-8")
+    return hashlib.sha256(data).hexdigest(), zlib.compress(data, RESPONSE_COMPRESSION_LEVEL), len(data)
+
+def decompress_response(body):
+    """Inverse of response_blob(): the response text stored in a blob body."""
+    return zlib.decompress(bytes(body)).decode("utf-8")
+
+def _full_result(row):
+    row["response_text"] = decompress_response(row.pop("response_body"))
+    return row
+
+def problem_key(prompt, expected_answer):
+    """
+    Identify a problem by its text and expected answer.
+
+    Stored with each row of the problems table, and used by the leaderboard to
+    group runs by problem.
+    """
+    return hashlib.md5(f"{prompt}\x1f{expected_answer or ''}".encode("utf-8")).hexdigest()
+
+def _leaderboard_deltas(results):
+    """Fold results into one aggregate row per (model_id, problem_key)."""
+    deltas = {}
+    for result in results:
+        key = (result["model_id"], problem_key(result["prompt"], result.get("expected_answer")))
+        response_time = result["response_time"]
+        delta = deltas.get(key)
+        if delta is None:
+            deltas[key] = [result["model_name"], 1, int(bool(result["is_correct"])), response_time,
+                           response_time, response_time, result["total_tokens"], result["score"], result["score"]]
+        else:
+            delta[0] = result["model_name"]
+            delta[1] += 1
+            delta[2] += int(bool(result["is_correct"]))
+            delta[3] += response_time
+            delta[4] = min(delta[4], response_time)
+            delta[5] = max(delta[5], response_time)
+            delta[6] += result["total_tokens"]
+            delta[7] = max(delta[7], result["score"])
+            delta[8] += result["score"]
+    return [key + tuple(delta) for key, delta in deltas.items()]
+
+def _summary_entry(row):
+    """Turn a row of run sums (dictionary) into per-model summary statistics."""
+    # SUM() over integer columns comes back as Decimal from Postgres
+    runs = int(row["runs"] or 0)
+    correct_runs = int(row["correct_runs"] or 0)
+    return {
+        "model_id": row["model_id"],
+        "model_name": row["model_name"],
+        "runs": runs,
+        "correct_runs": correct_runs,
+        "accuracy": correct_runs / runs if runs else 0.0,
+        "mean_response_time": float(row["total_response_time"]) / runs if runs else None,
+        "min_response_time": row["min_response_time"],
+        "max_response_time": row["max_response_time"],
+        "mean_tokens": float(row["total_tokens"]) / runs if runs else None,
+        "best_score": row["best_score"],
+        "avg_score": float(row["total_score"]) / runs if runs else None,
+        "last_tested": row["last_tested"]
+    }
+
+def _leaderboard_entries(rows):
+    """Turn per-model sums (dictionaries) into leaderboard entries, best first."""
+    leaderboard = [_summary_entry(row) for row in rows]
+    leaderboard.sort(key=lambda entry: (-(entry["avg_score"] or 0), -entry["accuracy"], entry["model_id"]))
+    return leaderboard
+
+def _daily_entries(rows):
+    """Turn per-day, per-model sums into daily summaries."""
+    entries = []
+    for row in rows:
+        day = row["day"]
+        entries.append(dict(day=day if isinstance(day, str) else day.isoformat(), **_summary_entry(row)))
+    return entries
+
+def _day_bounds(since, until):
+    """Return the [first, last) days whose rollups overlap [since, until)."""
+    first_day = since.date() if since else None
+    last_day = (until - timedelta(microseconds=1)).date() + timedelta(days=1) if until else None
+    return first_day, last_day
+
+LEADERBOARD_SUMS = '''SUM(runs) AS runs, SUM(correct_runs) AS correct_runs,
+    SUM(total_response_time) AS total_response_time, MIN(min_response_time) AS min_response_time,
+    MAX(max_response_time) AS max_response_time, SUM(total_tokens) AS total_tokens,
+    MAX(best_score) AS best_score, SUM(total_score) AS total_score, MAX(last_tested) AS last_tested'''
+
+# Run sums over raw results, in the column layout of results_daily and model_leaderboard
+RAW_RUN_SUMS = '''MAX(model_name) AS model_name, COUNT(*) AS runs,
+    SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) AS correct_runs,
+    SUM(response_time) AS total_response_time, MIN(response_time) AS min_response_time,
+    MAX(response_time) AS max_response_time, SUM(total_tokens) AS total_tokens,
+    MAX(score) AS best_score, SUM(score) AS total_score, MAX(timestamp) AS last_tested'''
+ROLLUP_COLUMNS = ("model_name", "runs", "correct_runs", "total_response_time", "min_response_time",
+                  "max_response_time", "total_tokens", "best_score", "total_score", "last_tested")
+
+# Recomputes model_leaderboard from the raw results plus the daily rollups of
+# results that have passed the retention window
+LEADERBOARD_REBUILD_SQL = f'''INSERT INTO model_leaderboard ({", ".join(LEADERBOARD_COLUMNS)})
+    SELECT run_sums.model_id, p.problem_key, MAX(run_sums.model_name), {LEADERBOARD_SUMS}
+    FROM (
+        SELECT model_id, problem_id, {RAW_RUN_SUMS} FROM results GROUP BY model_id, problem_id
+        UNION ALL
+        SELECT model_id, problem_id, {", ".join(ROLLUP_COLUMNS)} FROM results_daily
+    ) AS run_sums JOIN problems p ON p.id = run_sums.problem_id
+    GROUP BY run_sums.model_id, p.problem_key'''
+
+# Problems of a suite in run order; {placeholder} is the backend's parameter marker
+SUITE_PROBLEMS_SQL = '''SELECT p.id AS problem_id, p.prompt, p.expected_answer
+    FROM suite_problems sp JOIN problems p ON p.id = sp.problem_id
+    WHERE sp.suite_id = {placeholder} ORDER BY sp.position'''
+SUITE_LIST_SQL = '''SELECT s.name, COUNT(sp.problem_id) AS problems, s.updated_at
+    FROM problem_suites s LEFT JOIN suite_problems sp ON sp.suite_id = s.id
+    GROUP BY s.id, s.name, s.updated_at ORDER BY s.name'''
+
+def _suite_rows(suite_id, problems, problem_ids):
+    return [(suite_id, position, problem_ids[problem_key(prompt, answer)])
+            for position, (prompt, answer) in enumerate(problems)]
+
+def _result_filters(model_id, since, until, correct_only, placeholder="%s", timestamp=lambda value: value,
+                    problem_id=None, trial_group_id=None):
+    """
+    Return (conditions, params) restricting "results r" to the results API filters.
+
+    `placeholder` is the backend's parameter marker and `timestamp` converts
+    datetimes to the backend's stored representation.
+    """
+    conditions = []
+    params = []
+    if model_id:
+        conditions.append(f"r.model_id = {placeholder}")
+        params.append(model_id)
+    if since:
+        conditions.append(f"r.timestamp >= {placeholder}")
+        params.append(timestamp(since))
+    if until:
+        conditions.append(f"r.timestamp < {placeholder}")
+        params.append(timestamp(until))
+    if correct_only:
+        conditions.append("r.is_correct")
+    if problem_id is not None:
+        conditions.append(f"r.problem_id = {placeholder}")
+        params.append(problem_id)
+    if trial_group_id:
+        conditions.append(f"r.trial_group_id = {placeholder}")
+        params.append(trial_group_id)
+    return conditions, params
+
+def _where(conditions):
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+def encode_cursor(timestamp, result_id):
+    """Encode the (timestamp, id) position of a result as an opaque page cursor."""
+    payload = json.dumps([timestamp.isoformat(), result_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def decode_cursor(cursor):
+    """Decode a page cursor into (timestamp, id). Raises ValueError if it is malformed."""
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        c = conn.cursor()
+        timestamp, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), int(result_id)
+    except (TypeError, ValueError, UnicodeError, binascii.Error) as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+class PostgresBackend:
+    """Results storage in PostgreSQL, through a ConnectionPool."""
+
+    name = "postgres"
+
+    LEADERBOARD_UPSERT = '''INSERT INTO model_leaderboard (
+            model_id, problem_key, model_name, runs, correct_runs,
+            total_response_time, min_response_time, max_response_time,
+            total_tokens, best_score, total_score, last_tested
+        ) VALUES %s
+        ON CONFLICT (model_id, problem_key) DO UPDATE SET
+            model_name = EXCLUDED.model_name,
+            runs = model_leaderboard.runs + EXCLUDED.runs,
+            correct_runs = model_leaderboard.correct_runs + EXCLUDED.correct_runs,
+            total_response_time = model_leaderboard.total_response_time + EXCLUDED.total_response_time,
+            min_response_time = LEAST(model_leaderboard.min_response_time, EXCLUDED.min_response_time),
+            max_response_time = GREATEST(model_leaderboard.max_response_time, EXCLUDED.max_response_time),
+            total_tokens = model_leaderboard.total_tokens + EXCLUDED.total_tokens,
+            best_score = GREATEST(model_leaderboard.best_score, EXCLUDED.best_score),
+            total_score = model_leaderboard.total_score + EXCLUDED.total_score,
+            last_tested = GREATEST(model_leaderboard.last_tested, EXCLUDED.last_tested)'''
+
+    def __init__(self, dsn=DATABASE_URL):
+        self.pool = ConnectionPool(dsn)
+        # problem_key -> problems.id, only for committed problems
+        self.problem_ids = {}
+
+    def init_db(self):
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                # Problems (prompt and expected answer) shared by many results
+                c.execute('''CREATE TABLE IF NOT EXISTS problems (
+                    id SERIAL PRIMARY KEY,
+                    problem_key TEXT NOT NULL UNIQUE,
+                    prompt TEXT NOT NULL,
+                    expected_answer TEXT
+                )''')
+                # zlib-compressed response texts, content-addressed so repeats are stored once
+                c.execute('''CREATE TABLE IF NOT EXISTS response_blobs (
+                    hash TEXT PRIMARY KEY,
+                    body BYTEA NOT NULL,
+                    length INTEGER NOT NULL
+                )''')
+
+                # results is partitioned by day (see _ensure_partitions); tables created
+                # before that are converted once their columns are up to date
+                c.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('results')")
+                row = c.fetchone()
+                if row is None:
+                    self._create_results_table(c)
+                else:
+                    # Streaming metrics were added after the table was first created
+                    for column in STREAMING_METRIC_COLUMNS:
+                        c.execute(f"ALTER TABLE results ADD COLUMN IF NOT EXISTS {column} REAL")
+                    c.execute("ALTER TABLE results ADD COLUMN IF NOT EXISTS cached BOOLEAN DEFAULT FALSE")
+                    c.execute("ALTER TABLE results ADD COLUMN IF NOT EXISTS trial_group_id TEXT")
+
+                    # Results stored before problems and response_blobs existed
+                    c.execute("ALTER TABLE results ADD COLUMN IF NOT EXISTS problem_id INTEGER REFERENCES problems (id)")
+                    c.execute("ALTER TABLE results ADD COLUMN IF NOT EXISTS response_hash TEXT "
+                              "REFERENCES response_blobs (hash)")
+                    c.execute("SELECT column_name FROM information_schema.columns "
+                              "WHERE table_schema = current_schema() AND table_name = 'results'")
+                    legacy_columns = [column for (column,) in c.fetchall() if column in LEGACY_RESULT_COLUMNS]
+                    if legacy_columns:
+                        self._migrate_legacy_results(c, legacy_columns)
+                    if row[0] != "p":
+                        self._partition_results(c)
+                self._ensure_partitions(c)
 
-        # Create results table
-        c.execute('''CREATE TABLE IF NOT EXISTS results (
-            id SERIAL PRIMARY KEY,
+                # Newest-first listing (keyset pagination on (timestamp, id)), per-model
+                # history, lookups by problem and pruning of unreferenced response blobs
+                c.execute("CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp DESC, id DESC)")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_results_model_timestamp "
+                          "ON results (model_id, timestamp DESC, id DESC)")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_results_problem ON results (problem_id)")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_results_trial_group ON results (trial_group_id) "
+                          "WHERE trial_group_id IS NOT NULL")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_results_response_hash ON results (response_hash)")
+
+                # Daily per-model, per-problem rollups of results past the retention window
+                c.execute('''CREATE TABLE IF NOT EXISTS results_daily (
+                    day DATE NOT NULL,
+                    model_id TEXT NOT NULL,
+                    problem_id INTEGER NOT NULL REFERENCES problems (id),
+                    model_name TEXT NOT NULL,
+                    runs INTEGER NOT NULL,
+                    correct_runs INTEGER NOT NULL,
+                    total_response_time DOUBLE PRECISION NOT NULL,
+                    min_response_time REAL NOT NULL,
+                    max_response_time REAL NOT NULL,
+                    total_tokens BIGINT NOT NULL,
+                    best_score INTEGER NOT NULL,
+                    total_score BIGINT NOT NULL,
+                    last_tested TIMESTAMP NOT NULL,
+                    PRIMARY KEY (day, model_id, problem_id)
+                )''')
+
+                # Per-model, per-problem aggregates kept up to date by every result write
+                c.execute('''CREATE TABLE IF NOT EXISTS model_leaderboard (
+                    model_id TEXT NOT NULL,
+                    problem_key TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    runs INTEGER NOT NULL,
+                    correct_runs INTEGER NOT NULL,
+                    total_response_time DOUBLE PRECISION NOT NULL,
+                    min_response_time REAL NOT NULL,
+                    max_response_time REAL NOT NULL,
+                    total_tokens BIGINT NOT NULL,
+                    best_score INTEGER NOT NULL,
+                    total_score BIGINT NOT NULL,
+                    last_tested TIMESTAMP NOT NULL,
+                    PRIMARY KEY (model_id, problem_key)
+                )''')
+                # Backfill once from the results recorded before the table existed
+                c.execute("SELECT EXISTS (SELECT 1 FROM model_leaderboard)")
+                if not c.fetchone()[0]:
+                    self._rebuild_leaderboard(c)
+
+                # Create global_problem table
+                c.execute('''CREATE TABLE IF NOT EXISTS global_problem (
+                    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                    problem_text TEXT NOT NULL,
+                    correct_answer TEXT NOT NULL,
+                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    version BIGINT NOT NULL DEFAULT 1
+                )''')
+                # Bumped by every save so workers can tell whether their copy is current
+                c.execute("ALTER TABLE global_problem ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1")
+
+                # Named, ordered problem lists for matrix runs
+                c.execute('''CREATE TABLE IF NOT EXISTS problem_suites (
+                    id SERIAL PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )''')
+                c.execute('''CREATE TABLE IF NOT EXISTS suite_problems (
+                    suite_id INTEGER NOT NULL REFERENCES problem_suites (id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    problem_id INTEGER NOT NULL REFERENCES problems (id),
+                    PRIMARY KEY (suite_id, position)
+                )''')
+
+                conn.commit()
+        except psycopg2.Error as e:
+            print(f"Error initializing database: {e}")
+
+    def _create_results_table(self, c):
+        c.execute('''CREATE TABLE results (
+            id SERIAL,
             model_id TEXT NOT NULL,
             model_name TEXT NOT NULL,
-            prompt TEXT NOT NULL,
-            response_text TEXT NOT NULL,
+            problem_id INTEGER NOT NULL REFERENCES problems (id),
+            response_hash TEXT NOT NULL REFERENCES response_blobs (hash),
             is_correct BOOLEAN NOT NULL,
             answer_found TEXT,
             response_time REAL NOT NULL,
@@ -34,139 +613,738 @@ def init_db():
             completion_tokens INTEGER NOT NULL,
             total_tokens INTEGER NOT NULL,
             score INTEGER NOT NULL,
-            expected_answer TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''')
-
-        # Create global_problem table
-        c.execute('''CREATE TABLE IF NOT EXISTS global_problem (
-            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
-            problem_text TEXT NOT NULL,
-            correct_answer TEXT NOT NULL,
-            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''')
-
-        conn.commit()
-    except psycopg2.Error as e:
-        print(f"Error initializing database: {e}")
-    finally:
-        if c:
-            c.close()
-        if conn:
-            conn.close()
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            time_to_first_token REAL,
+            inter_token_latency REAL,
+            tokens_per_second REAL,
+            cached BOOLEAN DEFAULT FALSE,
+            trial_group_id TEXT,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)''')
+        # Catches rows outside the daily partitions, e.g. if maintenance falls behind
+        c.execute("CREATE TABLE results_default PARTITION OF results DEFAULT")
+
+    def _partition_results(self, c):
+        """Copy an unpartitioned results table into a new partitioned one."""
+        c.execute("ALTER TABLE results RENAME TO results_unpartitioned")
+        self._create_results_table(c)
+        columns = ", ".join(("id",) + RESULT_COLUMNS)
+        c.execute(f'''INSERT INTO results ({columns}, timestamp)
+            SELECT {columns}, COALESCE(timestamp, CURRENT_TIMESTAMP) FROM results_unpartitioned''')
+        copied = c.rowcount
+        c.execute("SELECT setval(pg_get_serial_sequence('results', 'id'), "
+                  "COALESCE((SELECT MAX(id) FROM results), 0) + 1, false)")
+        c.execute("DROP TABLE results_unpartitioned")
+        print(f"Moved {copied} results into the partitioned results table")
+
+    def _ensure_partitions(self, c, days_ahead=PARTITION_DAYS_AHEAD):
+        """
+        Create the daily partitions of results from today to `days_ahead` days ahead.
+
+        Returns:
+            list: The names of the partitions created.
+        """
+        # Workers run this concurrently; the lock (held until commit) makes the
+        # others wait and then find the partitions already there
+        c.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_ID,))
+        c.execute("SELECT CURRENT_DATE")
+        today = c.fetchone()[0]
+        created = []
+        for offset in range(days_ahead + 1):
+            day = today + timedelta(days=offset)
+            name = f"results_p{day:%Y%m%d}"
+            c.execute("SELECT to_regclass(%s)", (name,))
+            if c.fetchone()[0] is not None:
+                continue
+            bounds = (day, day + timedelta(days=1))
+            # Rows of that day may have landed in the default partition; attaching
+            # fails unless they are moved into the new partition first
+            c.execute(f"CREATE TABLE {name} (LIKE results INCLUDING DEFAULTS)")
+            c.execute(f'''WITH moved AS (
+                    DELETE FROM results_default WHERE timestamp >= %s AND timestamp < %s RETURNING *
+                ) INSERT INTO {name} SELECT * FROM moved''', bounds)
+            c.execute(f"ALTER TABLE results ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+            created.append(name)
+        return created
+
+    def maintain_partitions(self):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            created = self._ensure_partitions(c)
+            conn.commit()
+        if created:
+            print(f"Created results partitions {', '.join(created)}")
+        return created
+
+    def _migrate_legacy_results(self, c, legacy_columns, batch_size=1000):
+        """Move prompts into problems and response texts into response_blobs, then drop the old columns."""
+        expected = "expected_answer" if "expected_answer" in legacy_columns else "NULL"
+        migrated = 0
+        while True:
+            c.execute(f'''SELECT id, prompt, {expected}, response_text FROM results
+                WHERE problem_id IS NULL ORDER BY id LIMIT %s''', (batch_size,))
+            rows = c.fetchall()
+            if not rows:
+                break
+            problem_ids = self._problem_ids(c, {(prompt, answer) for _, prompt, answer, _ in rows})
+            blobs = {}
+            updates = []
+            for result_id, prompt, answer, text in rows:
+                blob = response_blob(text)
+                blobs[blob[0]] = blob
+                updates.append((result_id, problem_ids[problem_key(prompt, answer)], blob[0]))
+            self._store_blobs(c, blobs.values())
+            execute_values(c, '''UPDATE results SET problem_id = v.problem_id, response_hash = v.response_hash
+                FROM (VALUES %s) AS v (id, problem_id, response_hash) WHERE results.id = v.id''', updates)
+            migrated += len(rows)
+        c.execute("DROP INDEX IF EXISTS idx_results_expected_answer")
+        c.execute(f"ALTER TABLE results {', '.join(f'DROP COLUMN {column}' for column in legacy_columns)}")
+        c.execute("ALTER TABLE results ALTER COLUMN problem_id SET NOT NULL, ALTER COLUMN response_hash SET NOT NULL")
+        print(f"Moved prompts and responses of {migrated} results into problems and response_blobs "
+              f"(run VACUUM FULL results to return the freed space)")
+
+    def _problem_ids(self, c, problems):
+        """Return {problem_key: id} for (prompt, expected_answer) pairs, inserting new problems."""
+        wanted = {problem_key(prompt, answer): (prompt, answer) for prompt, answer in problems}
+        ids = {key: self.problem_ids[key] for key in wanted if key in self.problem_ids}
+        missing = [(key,) + wanted[key] for key in wanted if key not in ids]
+        if missing:
+            execute_values(c, '''INSERT INTO problems (problem_key, prompt, expected_answer) VALUES %s
+                ON CONFLICT (problem_key) DO NOTHING''', missing)
+            c.execute("SELECT problem_key, id FROM problems WHERE problem_key = ANY(%s)", ([m[0] for m in missing],))
+            ids.update(c.fetchall())
+        return ids
+
+    def _store_blobs(self, c, blobs):
+        execute_values(c, "INSERT INTO response_blobs (hash, body, length) VALUES %s ON CONFLICT (hash) DO NOTHING",
+                       [(digest, psycopg2.Binary(body), length) for digest, body, length in blobs])
+
+    def _update_leaderboard(self, c, results):
+        # One row per key: a single INSERT ... ON CONFLICT may not touch a row twice
+        execute_values(c, self.LEADERBOARD_UPSERT, _leaderboard_deltas(results),
+                       template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)")
+
+    def _rebuild_leaderboard(self, c):
+        c.execute("DELETE FROM model_leaderboard")
+        c.execute(LEADERBOARD_REBUILD_SQL)
+
+    def rebuild_leaderboard(self):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            self._rebuild_leaderboard(c)
+            conn.commit()
+
+    def _insert_results(self, c, results, page_size=500):
+        problem_ids = self._problem_ids(c, _result_problems(results))
+        rows, blobs = _result_rows(results, problem_ids)
+        self._store_blobs(c, blobs)
+        execute_values(c, f"INSERT INTO results ({', '.join(RESULT_COLUMNS)}) VALUES %s", rows, page_size=page_size)
+        self._update_leaderboard(c, results)
+        return problem_ids
+
+    def save_result(self, result):
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                problem_ids = self._insert_results(c, [result])
+                conn.commit()
+            self.problem_ids.update(problem_ids)
+        except psycopg2.Error as e:
+            print(f"Error saving result: {e}")
 
+    def save_results_batch(self, results, page_size=500):
+        if not results:
+            return
+        with self.pool.connection() as conn, conn.cursor() as c:
+            problem_ids = self._insert_results(c, results, page_size=page_size)
+            conn.commit()
+        self.problem_ids.update(problem_ids)
+
+    def get_all_results(self):
+        results_list = []
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                c.execute(f'''SELECT {", ".join(FULL_RESULT_SELECT_COLUMNS)}
+                    FROM {FULL_RESULT_FROM} ORDER BY r.timestamp DESC;''')
+
+                rows = c.fetchall()
+                columns = [desc[0] for desc in c.description]
+                for row in rows:
+                    results_list.append(_full_result(dict(zip(columns, row))))
+
+        except psycopg2.Error as e:
+            print(f"Error fetching results: {e}")
+        return results_list
+
+    def get_result(self, result_id):
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                c.execute(f'''SELECT {", ".join(FULL_RESULT_SELECT_COLUMNS)}
+                    FROM {FULL_RESULT_FROM} WHERE r.id = %s''', (result_id,))
+                row = c.fetchone()
+                if row is None:
+                    return None
+                columns = [desc[0] for desc in c.description]
+                return _full_result(dict(zip(columns, row)))
+        except psycopg2.Error as e:
+            print(f"Error fetching result {result_id}: {e}")
+            return None
+
+    def get_results_page(self, limit, cursor_position, model_id, since, until, correct_only, trial_group_id=None):
+        conditions, params = _result_filters(model_id, since, until, correct_only, trial_group_id=trial_group_id)
+        if cursor_position:
+            conditions.append("(r.timestamp, r.id) < (%s, %s)")
+            params.extend(cursor_position)
+        where = _where(conditions)
+
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                c.execute(f'''SELECT {", ".join(RESULT_SELECT_COLUMNS)}
+                    FROM {RESULT_FROM} {where}
+                    ORDER BY r.timestamp DESC, r.id DESC
+                    LIMIT %s''', params + [limit])
+                columns = [desc[0] for desc in c.description]
+                return [dict(zip(columns, row)) for row in c.fetchall()]
+        except psycopg2.Error as e:
+            print(f"Error fetching results page: {e}")
+            return []
+
+    def iter_results(self, model_id, since, until, correct_only, include_response, chunk_size, problem_id=None,
+                     trial_group_id=None):
+        conditions, params = _result_filters(model_id, since, until, correct_only, problem_id=problem_id,
+                                             trial_group_id=trial_group_id)
+        columns = FULL_RESULT_SELECT_COLUMNS if include_response else RESULT_SELECT_COLUMNS
+        source = FULL_RESULT_FROM if include_response else RESULT_FROM
+        with self.pool.connection() as conn:
+            # A named cursor keeps the result set on the server; each fetchmany pulls
+            # one chunk over the wire. Returning the connection rolls back and closes it.
+            with conn.cursor(name=f"results_export_{threading.get_ident()}_{time.monotonic_ns()}") as c:
+                c.itersize = chunk_size
+                c.execute(f'''SELECT {", ".join(columns)}
+                    FROM {source} {_where(conditions)}
+                    ORDER BY r.timestamp DESC, r.id DESC''', params)
+                while True:
+                    rows = c.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    names = [desc[0] for desc in c.description]
+                    chunk = [dict(zip(names, row)) for row in rows]
+                    yield [_full_result(row) for row in chunk] if include_response else chunk
+
+    def update_grades(self, grades, page_size=500):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            # The timestamp lets each update go straight to the row's daily partition
+            execute_values(c, '''UPDATE results r SET is_correct = v.is_correct, answer_found = v.answer_found,
+                    score = v.score, problem_id = v.problem_id
+                FROM (VALUES %s) AS v (id, timestamp, is_correct, answer_found, score, problem_id)
+                WHERE r.id = v.id AND r.timestamp = v.timestamp''',
+                [(g["id"], g["timestamp"], g["is_correct"], g["answer_found"], g["score"], g["problem_id"])
+                 for g in grades],
+                template="(%s, %s::timestamp, %s::boolean, %s, %s::integer, %s::integer)", page_size=page_size)
+            conn.commit()
+
+    def problem_id(self, prompt, expected_answer):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            problem_ids = self._problem_ids(c, [(prompt, expected_answer)])
+            conn.commit()
+        self.problem_ids.update(problem_ids)
+        return problem_ids[problem_key(prompt, expected_answer)]
+
+    def get_leaderboard(self, problem_key=None):
+        where = "WHERE problem_key = %s" if problem_key else ""
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                c.execute(f'''SELECT model_id, MAX(model_name) AS model_name, {LEADERBOARD_SUMS}
+                    FROM model_leaderboard {where}
+                    GROUP BY model_id''', [problem_key] if problem_key else [])
+                columns = [desc[0] for desc in c.description]
+                return _leaderboard_entries(dict(zip(columns, row)) for row in c.fetchall())
+        except psycopg2.Error as e:
+            print(f"Error fetching leaderboard: {e}")
+            return []
+
+    def count_results(self):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            c.execute("SELECT COUNT(*) FROM results")
+            return c.fetchone()[0]
+
+    def delete_results(self, model_id_prefix):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            c.execute("DELETE FROM results WHERE model_id LIKE %s", (model_id_prefix + "%",))
+            deleted = c.rowcount
+            c.execute("DELETE FROM results_daily WHERE model_id LIKE %s", (model_id_prefix + "%",))
+            c.execute("DELETE FROM response_blobs b WHERE NOT EXISTS "
+                      "(SELECT 1 FROM results r WHERE r.response_hash = b.hash)")
+            self._rebuild_leaderboard(c)
+            conn.commit()
+            return deleted
+
+    ROLLUP_UPSERT = f'''INSERT INTO results_daily (day, model_id, problem_id, {", ".join(ROLLUP_COLUMNS)})
+        SELECT CAST(timestamp AS DATE), model_id, problem_id, {RAW_RUN_SUMS}
+        FROM {{source}} {{where}}
+        GROUP BY CAST(timestamp AS DATE), model_id, problem_id
+        ON CONFLICT (day, model_id, problem_id) DO UPDATE SET
+            model_name = EXCLUDED.model_name,
+            runs = results_daily.runs + EXCLUDED.runs,
+            correct_runs = results_daily.correct_runs + EXCLUDED.correct_runs,
+            total_response_time = results_daily.total_response_time + EXCLUDED.total_response_time,
+            min_response_time = LEAST(results_daily.min_response_time, EXCLUDED.min_response_time),
+            max_response_time = GREATEST(results_daily.max_response_time, EXCLUDED.max_response_time),
+            total_tokens = results_daily.total_tokens + EXCLUDED.total_tokens,
+            best_score = GREATEST(results_daily.best_score, EXCLUDED.best_score),
+            total_score = results_daily.total_score + EXCLUDED.total_score,
+            last_tested = GREATEST(results_daily.last_tested, EXCLUDED.last_tested)'''
+
+    def apply_retention(self, days):
+        summary = {"rolled_up": 0, "deleted": 0, "dropped_partitions": [], "pruned_blobs": 0}
+        with self.pool.connection() as conn, conn.cursor() as c:
+            c.execute("SELECT CURRENT_DATE - %s", (days,))
+            cutoff = c.fetchone()[0]
+            # Whole days past the window: roll each partition up, then drop it
+            c.execute("SELECT child.relname FROM pg_inherits "
+                      "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                      "WHERE pg_inherits.inhparent = 'results'::regclass ORDER BY child.relname")
+            for (name,) in c.fetchall():
+                if not re.fullmatch(r"results_p\d{8}", name):
+                    continue
+                if datetime.strptime(name[len("results_p"):], "%Y%m%d").date() >= cutoff:
+                    continue
+                c.execute(f"SELECT COUNT(*) FROM {name}")
+                rows = c.fetchone()[0]
+                c.execute(self.ROLLUP_UPSERT.format(source=name, where=""))
+                c.execute(f"DROP TABLE {name}")
+                summary["rolled_up"] += rows
+                summary["deleted"] += rows
+                summary["dropped_partitions"].append(name)
+            # Expired rows that landed in the default partition
+            c.execute(self.ROLLUP_UPSERT.format(source="results_default", where="WHERE timestamp < %s"), (cutoff,))
+            c.execute("DELETE FROM results_default WHERE timestamp < %s", (cutoff,))
+            summary["rolled_up"] += c.rowcount
+            summary["deleted"] += c.rowcount
+            # The response texts of expired results are no longer needed
+            c.execute("DELETE FROM response_blobs b WHERE NOT EXISTS "
+                      "(SELECT 1 FROM results r WHERE r.response_hash = b.hash)")
+            summary["pruned_blobs"] = c.rowcount
+            self._ensure_partitions(c)
+            conn.commit()
+        return summary
+
+    def get_daily_results(self, since, until, model_id):
+        raw_conditions, daily_conditions, raw_params, daily_params = [], [], [], []
+        first_day, last_day = _day_bounds(since, until)
+        if since:
+            raw_conditions.append("timestamp >= %s")
+            raw_params.append(since)
+            daily_conditions.append("day >= %s")
+            daily_params.append(first_day)
+        if until:
+            raw_conditions.append("timestamp < %s")
+            raw_params.append(until)
+            daily_conditions.append("day < %s")
+            daily_params.append(last_day)
+        if model_id:
+            raw_conditions.append("model_id = %s")
+            raw_params.append(model_id)
+            daily_conditions.append("model_id = %s")
+            daily_params.append(model_id)
+        raw_where = f"WHERE {' AND '.join(raw_conditions)}" if raw_conditions else ""
+        daily_where = f"WHERE {' AND '.join(daily_conditions)}" if daily_conditions else ""
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                c.execute(f'''SELECT day, model_id, MAX(model_name) AS model_name, {LEADERBOARD_SUMS}
+                    FROM (
+                        SELECT CAST(timestamp AS DATE) AS day, model_id, {RAW_RUN_SUMS}
+                        FROM results {raw_where} GROUP BY CAST(timestamp AS DATE), model_id
+                        UNION ALL
+                        SELECT day, model_id, {", ".join(ROLLUP_COLUMNS)} FROM results_daily {daily_where}
+                    ) AS daily
+                    GROUP BY day, model_id
+                    ORDER BY day DESC, model_id''', raw_params + daily_params)
+                columns = [desc[0] for desc in c.description]
+                return _daily_entries(dict(zip(columns, row)) for row in c.fetchall())
+        except psycopg2.Error as e:
+            print(f"Error fetching daily results: {e}")
+            return []
+
+    def save_global_problem(self, problem_text, correct_answer):
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                upsert_sql = """
+                INSERT INTO global_problem (id, problem_text, correct_answer, last_updated)
+                VALUES (1, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE
+                SET problem_text = EXCLUDED.problem_text,
+                    correct_answer = EXCLUDED.correct_answer,
+                    last_updated = EXCLUDED.last_updated,
+                    version = global_problem.version + 1
+                RETURNING version;
+                """
+                c.execute(upsert_sql, (problem_text, correct_answer))
+                version = c.fetchone()[0]
+                # Delivered to every listener when the transaction commits
+                c.execute("SELECT pg_notify(%s, %s)", (PROBLEM_CHANNEL, str(version)))
+                conn.commit()
+                print(f"Global problem saved: {problem_text[:50]}... Answer: {correct_answer}")
+                return version
+        except psycopg2.Error as e:
+            print(f"Error saving global problem: {e}")
+            return None
+
+    def save_suite(self, name, problems):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            problem_ids = self._problem_ids(c, problems)
+            c.execute('''INSERT INTO problem_suites (name) VALUES (%s)
+                ON CONFLICT (name) DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+                RETURNING id''', (name,))
+            suite_id = c.fetchone()[0]
+            c.execute("DELETE FROM suite_problems WHERE suite_id = %s", (suite_id,))
+            execute_values(c, "INSERT INTO suite_problems (suite_id, position, problem_id) VALUES %s",
+                           _suite_rows(suite_id, problems, problem_ids))
+            conn.commit()
+        self.problem_ids.update(problem_ids)
+
+    def get_suite(self, name):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            c.execute("SELECT id FROM problem_suites WHERE name = %s", (name,))
+            row = c.fetchone()
+            if row is None:
+                return None
+            c.execute(SUITE_PROBLEMS_SQL.format(placeholder="%s"), (row[0],))
+            columns = [desc[0] for desc in c.description]
+            return [dict(zip(columns, problem)) for problem in c.fetchall()]
+
+    def list_suites(self):
+        with self.pool.connection() as conn, conn.cursor() as c:
+            c.execute(SUITE_LIST_SQL)
+            columns = [desc[0] for desc in c.description]
+            return [dict(zip(columns, row)) for row in c.fetchall()]
+
+    def get_global_problem(self):
+        problem_data = None
+        try:
+            with self.pool.connection() as conn, conn.cursor() as c:
+                c.execute("SELECT problem_text, correct_answer, version FROM global_problem WHERE id = 1;")
+                row = c.fetchone()
+
+                if row:
+                    problem_data = {
+                        "problem_text": row[0],
+                        "correct_answer": row[1],
+                        "version": row[2]
+                    }
+                    print(f"Global problem retrieved: {problem_data['problem_text'][:50]}...")
+        except psycopg2.Error as e:
+            print(f"Error fetching global problem: {e}")
+        return problem_data
+
+    def watch_global_problem(self, on_change, stop):
+        # LISTEN needs a connection of its own for as long as the watch lasts
+        while not stop.is_set():
+            try:
+                conn = psycopg2.connect(self.pool.dsn)
+            except psycopg2.Error as e:
+                print(f"Error listening for global problem changes: {e}")
+                stop.wait(PROBLEM_LISTEN_RETRY)
+                continue
+            try:
+                conn.autocommit = True
+                with conn.cursor() as c:
+                    c.execute(f"LISTEN {PROBLEM_CHANNEL}")
+                # Changes made while not listening were missed
+                on_change(None)
+                while not stop.is_set():
+                    # Wake up regularly to notice `stop`
+                    if not select.select([conn], [], [], 1.0)[0]:
+                        continue
+                    conn.poll()
+                    versions = [int(notify.payload) for notify in conn.notifies]
+                    conn.notifies.clear()
+                    if versions:
+                        on_change(max(versions))
+            except (psycopg2.Error, OSError) as e:
+                print(f"Lost global problem notifications, reconnecting: {e}")
+                stop.wait(PROBLEM_LISTEN_RETRY)
+            finally:
+                conn.close()
+
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.close()
+
+
+# --- Backend selection ---
+# DB_BACKEND=postgres (default) uses the PostgreSQL server configured above;
+# DB_BACKEND=sqlite stores everything in a local SQLite file (SQLITE_PATH).
+DB_BACKEND = os.environ.get("DB_BACKEND", "postgres").lower()
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(name=None):
+    """Create the storage backend called `name` (default DB_BACKEND)."""
+    name = (name or DB_BACKEND).lower()
+    if name in ("postgres", "postgresql"):
+        return PostgresBackend()
+    if name == "sqlite":
+        from sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    raise ValueError(f"Unknown DB_BACKEND: {name!r} (expected 'postgres' or 'sqlite')")
+
+def get_backend():
+    """Return the process-wide storage backend, creating it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+def set_backend(backend):
+    """Replace the process-wide storage backend (closing the previous one). Returns it."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    if previous is not None and previous is not backend:
+        previous.close()
+    return backend
+
+# --- Module-level API used by the app; every call goes to the selected backend ---
+
+def get_connection():
+    """Context manager that checks a connection out of the PostgreSQL pool."""
+    return get_backend().pool.connection()
+
+def pool_stats():
+    """Return the backend's connection usage counters."""
+    return get_backend().pool_stats()
+
+def close_pool():
+    """Close the backend's connections (e.g. at shutdown or in tests)."""
+    get_backend().close()
+
+def init_db():
+    get_backend().init_db()
+
+@_timed("rebuild_leaderboard")
+def rebuild_leaderboard():
+    """Recompute every leaderboard aggregate from the results table."""
+    get_backend().rebuild_leaderboard()
+
+@_timed("save_result")
 def save_result(result):
-    conn = None  # Initialize conn to None
-    c = None # Initialize cursor to None
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        c = conn.cursor()
-
-        c.execute('''INSERT INTO results (
-            model_id, model_name, prompt, response_text,
-            is_correct, answer_found, response_time,
-            prompt_tokens, completion_tokens, total_tokens, score, expected_answer
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''', (
-            result['model_id'],
-            result['model_name'],
-            result['prompt'],
-            result['response_text'],
-            result['is_correct'],
-            result['answer_found'],
-            result['response_time'],
-            result['prompt_tokens'],
-            result['completion_tokens'],
-            result['total_tokens'],
-            result['score'],
-            result['expected_answer']
-        ))
-
-        conn.commit()
-    except psycopg2.Error as e:
-        print(f"Error saving result: {e}")
-    finally:
-        if c:
-            c.close()
-        if conn:
-            conn.close()
+    get_backend().save_result(result)
+
+@_timed("save_results_batch")
+def save_results_batch(results, page_size=500):
+    """
+    Insert many results with multi-row INSERTs in a single transaction, together
+    with their leaderboard updates.
+
+    Unlike save_result, database errors are raised so the caller can retry or
+    report the batch.
+    """
+    get_backend().save_results_batch(results, page_size=page_size)
 
+@_timed("get_all_results")
 def get_all_results():
-    conn = None  # Initialize conn to None
-    c = None # Initialize cursor to None
-    results_list = []
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        c = conn.cursor()
-
-        c.execute('''SELECT
-            id, model_id, model_name, prompt, response_text,
-            is_correct, answer_found, response_time,
-            prompt_tokens, completion_tokens, total_tokens,
-            score, expected_answer, timestamp
-            FROM results ORDER BY timestamp DESC;''')
-
-        rows = c.fetchall()
-        columns = [desc[0] for desc in c.description]
-        for row in rows:
-            results_list.append(dict(zip(columns, row)))
-
-    except psycopg2.Error as e:
-        print(f"Error fetching results: {e}")
-    finally:
-        if c:
-            c.close()
-        if conn:
-            conn.close()
-    return results_list
+    return get_backend().get_all_results()
+
+@_timed("get_result")
+def get_result(result_id):
+    """
+    Return one result with its prompt, expected answer and full response text,
+    or None if there is no result with that id.
+
+    Listings (get_results_page) leave the response text out; this is the only
+    read that decompresses it.
+    """
+    return get_backend().get_result(result_id)
+
+@_timed("get_results_page")
+def get_results_page(limit=100, cursor=None, model_id=None, since=None, until=None, correct_only=False,
+                     trial_group_id=None):
+    """
+    Return one page of results, newest first, using keyset pagination.
+
+    Pages are positioned by (timestamp, id) rather than OFFSET, so each page is an
+    index range scan no matter how deep into the history it is. Results carry
+    their problem's prompt and expected answer but not the response text; fetch
+    that with get_result().
+
+    Args:
+        limit (int): Maximum results on the page.
+        cursor (str): next_cursor of the previous page, or None for the first page.
+        model_id (str): Only results of this model.
+        since (datetime): Only results at or after this time.
+        until (datetime): Only results before this time.
+        correct_only (bool): Only correct results.
+        trial_group_id (str): Only the samples of this repeated-trial run.
+
+    Returns:
+        tuple: (results, next_cursor); next_cursor is None on the last page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page
+    results_list = get_backend().get_results_page(limit + 1, position, model_id, since, until, correct_only,
+                                                  trial_group_id=trial_group_id)
+
+    next_cursor = None
+    if len(results_list) > limit:
+        results_list = results_list[:limit]
+        last = results_list[-1]
+        next_cursor = encode_cursor(last["timestamp"], last["id"])
+    return results_list, next_cursor
+
+@_timed("get_leaderboard")
+def get_leaderboard(problem_key=None):
+    """
+    Return per-model summaries from the leaderboard table, best first.
+
+    Reads only the aggregates (one row per model and problem), so the cost does not
+    grow with the number of stored results.
+
+    Args:
+        problem_key (str): Only count runs on this problem (see problem_key()); all
+            problems are combined when None.
+
+    Returns:
+        list: Dictionaries with model_id, model_name, runs, correct_runs, accuracy,
+            mean/min/max_response_time, mean_tokens, best_score, avg_score and last_tested.
+    """
+    return get_backend().get_leaderboard(problem_key=problem_key)
+
+@_timed("get_daily_results")
+def get_daily_results(since=None, until=None, model_id=None):
+    """
+    Return per-day, per-model summaries for [since, until), newest day first.
+
+    Combines the daily rollups of results past the retention window with an
+    aggregate of the raw results still kept, so the cost depends on the number
+    of days and models rather than the number of stored results.
+
+    Returns:
+        list: Dictionaries with day (YYYY-MM-DD) and the same statistics as
+            get_leaderboard() entries.
+    """
+    return get_backend().get_daily_results(since, until, model_id)
+
+def maintain_partitions():
+    """
+    Create the upcoming daily partitions of results, so new rows do not pile up
+    in the default partition. Independent of retention and safe to run from
+    every worker. A no-op on SQLite.
+
+    Returns:
+        list: The names of the partitions created.
+    """
+    return get_backend().maintain_partitions()
+
+@_timed("apply_retention")
+def apply_retention(days):
+    """
+    Roll results older than `days` days up into results_daily and remove them,
+    along with the response texts only they referenced.
+
+    PostgreSQL drops whole daily partitions (and creates the upcoming ones);
+    SQLite deletes the expired rows. Leaderboard aggregates are unaffected.
 
+    Returns:
+        dict: rolled_up, deleted, dropped_partitions and pruned_blobs.
+    """
+    return get_backend().apply_retention(days)
+
+def iter_results(model_id=None, since=None, until=None, correct_only=False, include_response=False,
+                 chunk_size=1000, problem_id=None, trial_group_id=None):
+    """
+    Yield every result matching the results API filters, newest first, as lists
+    of at most `chunk_size` result dictionaries.
+
+    Only one chunk is held in memory at a time: PostgreSQL reads through a
+    server-side (named) cursor, SQLite through successive keyset queries. The
+    PostgreSQL connection stays checked out until the generator is exhausted or
+    closed.
+
+    Args:
+        include_response (bool): Also decompress and include each response_text.
+        problem_id (int): Only results of this problem.
+        trial_group_id (str): Only the samples of this repeated-trial run.
+    """
+    return get_backend().iter_results(model_id, since, until, correct_only, include_response, chunk_size,
+                                      problem_id=problem_id, trial_group_id=trial_group_id)
+
+@_timed("update_grades")
+def update_grades(grades):
+    """
+    Overwrite the grading columns of existing results in one transaction.
+
+    Args:
+        grades (list): Dictionaries with the result's id and timestamp and the new
+            is_correct, answer_found, score and problem_id.
+
+    The leaderboard is not updated; call rebuild_leaderboard() once all grades
+    are written. Database errors are raised.
+    """
+    if grades:
+        get_backend().update_grades(grades)
+
+def problem_id(prompt, expected_answer):
+    """Return the id of the (prompt, expected_answer) problem, storing it if it is new."""
+    return get_backend().problem_id(prompt, expected_answer)
+
+def count_results():
+    """Return the number of stored results."""
+    return get_backend().count_results()
+
+def delete_results(model_id_prefix):
+    """Delete the results of every model whose id starts with `model_id_prefix`. Returns the count."""
+    return get_backend().delete_results(model_id_prefix)
+
+@_timed("save_global_problem")
 def save_global_problem(problem_text, correct_answer):
-    conn = None
-    c = None
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        c = conn.cursor()
-
-        upsert_sql = """
-        INSERT INTO global_problem (id, problem_text, correct_answer, last_updated)
-        VALUES (1, %s, %s, CURRENT_TIMESTAMP)
-        ON CONFLICT (id) DO UPDATE
-        SET problem_text = EXCLUDED.problem_text,
-            correct_answer = EXCLUDED.correct_answer,
-            last_updated = EXCLUDED.last_updated;
-        """
-        c.execute(upsert_sql, (problem_text, correct_answer))
-        conn.commit()
-        print(f"Global problem saved: {problem_text[:50]}... Answer: {correct_answer}")
-    except psycopg2.Error as e:
-        print(f"Error saving global problem: {e}")
-    finally:
-        if c:
-            c.close()
-        if conn:
-            conn.close()
+    """Save the global problem. Returns its new version number, or None on error."""
+    return get_backend().save_global_problem(problem_text, correct_answer)
+
+@_timed("save_suite")
+def save_suite(name, problems):
+    """
+    Create or replace the problem suite `name`.
+
+    Args:
+        name (str): Suite name.
+        problems (list): (prompt, expected_answer) pairs, in run order. Problems
+            are shared with results through the problems table.
+
+    Raises:
+        ValueError: If the name or the problem list is empty.
+    """
+    if not name or not problems:
+        raise ValueError("a suite needs a name and at least one problem")
+    get_backend().save_suite(name, [(prompt, answer) for prompt, answer in problems])
 
+@_timed("get_suite")
+def get_suite(name):
+    """
+    Return the problems of suite `name` in run order, as dictionaries with
+    problem_id, prompt and expected_answer, or None if there is no such suite.
+    """
+    return get_backend().get_suite(name)
+
+def list_suites():
+    """Return every suite's name, problem count and updated_at, by name."""
+    return get_backend().list_suites()
+
+@_timed("get_global_problem")
 def get_global_problem():
-    conn = None
-    c = None
-    problem_data = None
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        c = conn.cursor()
+    return get_backend().get_global_problem()
 
-        c.execute("SELECT problem_text, correct_answer FROM global_problem WHERE id = 1;")
-        row = c.fetchone()
+def watch_global_problem(on_change, stop):
+    """
+    Block, calling on_change(version) whenever the global problem may have
+    changed, until `stop` (a threading.Event) is set.
 
-        if row:
-            problem_data = {
-                "problem_text": row[0],
-                "correct_answer": row[1]
-            }
-            print(f"Global problem retrieved: {problem_data['problem_text'][:50]}...")
-    except psycopg2.Error as e:
-        print(f"Error fetching global problem: {e}")
-    finally:
-        if c:
-            c.close()
-        if conn:
-            conn.close()
-    return problem_data
\ No newline at end of file
+    PostgreSQL pushes changes with LISTEN/NOTIFY; SQLite polls the version.
+    `version` is None when changes may have been missed (e.g. after a
+    reconnect), in which case the caller should reload the problem.
+    """
+    get_backend().watch_global_problem(on_change, stop)
@@ -0,0 +1,167 @@
+"""
+Streaming serialization of saved results for /api/results/export.
+
+Results arrive from database.iter_results() one chunk at a time and leave as
+encoded bytes one chunk at a time, so an export of any size only ever holds a
+single chunk. CSV and JSONL need nothing beyond the standard library; Parquet
+and Arrow (IPC stream) output need the optional pyarrow package.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+# Rows fetched from the database and encoded per chunk
+EXPORT_CHUNK_SIZE = int(os.environ.get("RESULTS_EXPORT_CHUNK_SIZE", "1000"))
+
+# Format -> MIME type
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+# Exported columns and their Arrow types, in output order
+EXPORT_COLUMNS = (
+    ("id", "int64"), ("model_id", "string"), ("model_name", "string"), ("problem_id", "int64"),
+    ("prompt", "string"), ("expected_answer", "string"), ("is_correct", "bool"), ("answer_found", "string"),
+    ("response_time", "float64"), ("prompt_tokens", "int64"), ("completion_tokens", "int64"),
+    ("total_tokens", "int64"), ("score", "int64"), ("timestamp", "timestamp"),
+    ("time_to_first_token", "float64"), ("inter_token_latency", "float64"), ("tokens_per_second", "float64"),
+    ("cached", "bool"), ("trial_group_id", "string")
+)
+RESPONSE_COLUMN = ("response_text", "string")
+
+
+def export_columns(include_response=False):
+    """Return the (name, type) pairs exported, with response_text last if included."""
+    return EXPORT_COLUMNS + (RESPONSE_COLUMN,) if include_response else EXPORT_COLUMNS
+
+
+def check_format(fmt):
+    """
+    Raise ValueError unless `fmt` can be exported here.
+
+    Called before the response starts, since a streamed body can no longer turn
+    into an error status.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt in COLUMNAR_FORMATS:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError(f"{fmt} export requires the pyarrow package") from None
+
+
+def export_filename(fmt, now=None):
+    return f"results-{(now or datetime.now()).strftime('%Y%m%d-%H%M%S')}.{fmt}"
+
+
+def stream_export(chunks, fmt, include_response=False):
+    """
+    Encode result chunks (lists of result dictionaries) as `fmt`.
+
+    Yields:
+        bytes: The encoded output, one piece per chunk (plus header and footer).
+    """
+    columns = [name for name, _ in export_columns(include_response)]
+    if fmt == "csv":
+        return _csv(chunks, columns)
+    if fmt == "jsonl":
+        return _jsonl(chunks, columns)
+    return _columnar(chunks, fmt, include_response)
+
+
+def _csv(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows([_text_value(row.get(column)) for column in columns] for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl(chunks, columns):
+    for chunk in chunks:
+        yield "".join(json.dumps({column: _text_value(row.get(column)) for column in columns}) + "\n"
+                      for row in chunk).encode("utf-8")
+
+
+def _text_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _ChunkSink:
+    """Write-only file object collecting what pyarrow writes until it is drained."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_schema(include_response):
+    import pyarrow as pa
+
+    types = {"int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_(), "string": pa.string(),
+             "timestamp": pa.timestamp("ms")}
+    return pa.schema([(name, types[kind]) for name, kind in export_columns(include_response)])
+
+
+def _columnar(chunks, fmt, include_response):
+    import pyarrow as pa
+
+    schema = _arrow_schema(include_response)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        # One row group per chunk, written out as soon as the chunk is encoded
+        writer = pq.ParquetWriter(sink, schema)
+        write = writer.write_table
+        wrap = pa.Table.from_pylist
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        wrap = pa.RecordBatch.from_pylist
+    try:
+        for chunk in chunks:
+            write(wrap(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
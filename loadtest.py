@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the app's HTTP API.
+
+Drives /api/test, /api/test-all and /api/results at a target concurrency and
+reports throughput, p50/p95/p99 latency and error rate per scenario. Meant to
+run against the app pointed at mock_openrouter.py:
+
+    python mock_openrouter.py --port 5050 &
+    OPENROUTER_BASE_URL=http://127.0.0.1:5050/api/v1 OPENROUTER_API_KEY=mock python app.py &
+    python loadtest.py --base-url http://127.0.0.1:5002 --scenario test --concurrency 16 --requests 200
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from metrics import percentile
+
+SCENARIOS = ("test", "test-all", "results")
+
+
+class ScenarioStats:
+    """Thread-safe latency and outcome collector for one scenario."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, latency, status, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses[str(status)] += 1
+            if not ok:
+                self.errors += 1
+
+    def summary(self, elapsed):
+        with self.lock:
+            latencies = list(self.latencies)
+            statuses = dict(self.statuses)
+            errors = self.errors
+        count = len(latencies)
+        return {
+            "scenario": self.name,
+            "requests": count,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else None,
+            "p50_seconds": _round(percentile(latencies, 50)),
+            "p95_seconds": _round(percentile(latencies, 95)),
+            "p99_seconds": _round(percentile(latencies, 99)),
+            "max_seconds": _round(max(latencies) if latencies else None),
+            "error_rate": round(errors / count, 4) if count else None,
+            "statuses": statuses
+        }
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+def _fetch_model_ids(session, base_url):
+    response = session.get(f"{base_url}/api/models", timeout=30)
+    response.raise_for_status()
+    return [model["id"] for model in response.json()["models"]]
+
+
+def run_test(session, base_url, model_ids, args):
+    """POST /api/test for a random model. Returns (status, ok)."""
+    body = {"model_id": random.choice(model_ids), "stream": args.stream, "no_cache": not args.use_cache}
+    response = session.post(f"{base_url}/api/test", json=body, timeout=args.timeout)
+    # Upstream failures are still saved as (incorrect) results; error_type marks them
+    ok = response.status_code == 200 and "error_type" not in response.json()
+    return response.status_code, ok
+
+
+def run_test_all(session, base_url, model_ids, args):
+    """GET /api/test-all and read the SSE stream until the complete event. Returns (status, ok)."""
+    params = {"limit": args.limit} if args.limit else {}
+    if args.workers:
+        params["workers"] = args.workers
+    if args.stream:
+        params["stream"] = 1
+    if not args.use_cache:
+        params["no_cache"] = 1
+    with session.get(f"{base_url}/api/test-all", params=params, stream=True, timeout=args.timeout) as response:
+        if response.status_code != 200:
+            return response.status_code, False
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            # Per-model failures are part of a normal sweep; only an overall error fails it
+            if event.get("type") == "error" and "model_name" not in event.get("data", {}):
+                return response.status_code, False
+            if event.get("type") == "complete":
+                return response.status_code, True
+    # Stream ended without a complete event
+    return response.status_code, False
+
+
+def run_results(session, base_url, model_ids, args):
+    """GET /api/results. Returns (status, ok)."""
+    response = session.get(f"{base_url}/api/results", timeout=args.timeout)
+    return response.status_code, response.status_code == 200
+
+
+RUNNERS = {"test": run_test, "test-all": run_test_all, "results": run_results}
+
+
+def run_scenario(name, base_url, concurrency, total_requests=None, duration=None, args=None):
+    """
+    Run one scenario with `concurrency` workers until `total_requests` have been sent
+    or `duration` seconds have passed, and return its summary dictionary.
+    """
+    runner = RUNNERS[name]
+    stats = ScenarioStats(name)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    model_ids = _fetch_model_ids(session, base_url) if name == "test" else []
+
+    remaining = [total_requests]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+
+    def _next_ticket():
+        with lock:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+            return True
+
+    def _worker():
+        while _next_ticket():
+            start = time.perf_counter()
+            try:
+                status, ok = runner(session, base_url, model_ids, args)
+            except requests.RequestException as e:
+                status, ok = type(e).__name__, False
+            stats.record(time.perf_counter() - start, status, ok)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(_worker)
+    elapsed = time.perf_counter() - started
+    session.close()
+    return stats.summary(elapsed)
+
+
+def format_summary(summary):
+    """Render a scenario summary as a single human-readable line."""
+    def ms(value):
+        return f"{value * 1000:.0f}ms" if value is not None else "-"
+    error_rate = summary["error_rate"]
+    return (f"{summary['scenario']:<9} requests={summary['requests']} "
+            f"throughput={summary['throughput_rps']}/s p50={ms(summary['p50_seconds'])} "
+            f"p95={ms(summary['p95_seconds'])} p99={ms(summary['p99_seconds'])} "
+            f"errors={error_rate * 100 if error_rate is not None else 0:.1f}% statuses={summary['statuses']}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load-test the OpenRouter model tester API.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5002", help="Base URL of the running app")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=None, help="Requests per scenario")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds per scenario")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--stream", action="store_true", help="Request streamed completions")
+    parser.add_argument("--use-cache", action="store_true", help="Allow the app's response cache")
+    parser.add_argument("--limit", type=int, default=None, help="/api/test-all: models per sweep")
+    parser.add_argument("--workers", type=int, default=None, help="/api/test-all: parallel workers")
+    parser.add_argument("--json", action="store_true", help="Print summaries as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 100
+    summaries = []
+    for name in args.scenario or SCENARIOS:
+        summary = run_scenario(name, args.base_url.rstrip("/"), args.concurrency,
+                               total_requests=args.requests, duration=args.duration, args=args)
+        summaries.append(summary)
+        if not args.json:
+            print(format_summary(summary), flush=True)
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    return summaries
+
+
+if __name__ == "__main__":
+    main()
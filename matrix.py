@@ -0,0 +1,199 @@
+"""
+Models × problems evaluation matrix.
+
+A matrix run tests every model against every problem of a suite. All
+(model, problem) cells go onto one shared work queue drained by a pool of
+worker threads. The queue is ordered round-robin across models, and a worker
+passes over cells of models that already have `per_model` calls in flight, so
+consecutive requests go to different models and each model's rate limit is
+spread over the whole run instead of being hit in a burst.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Defaults, overridable through the environment.
+MATRIX_WORKERS = int(os.environ.get("MATRIX_WORKERS", "16"))
+MATRIX_PER_MODEL_CONCURRENCY = int(os.environ.get("MATRIX_PER_MODEL_CONCURRENCY", "2"))
+
+Cell = namedtuple("Cell", ["model_id", "model_name", "problem_index", "problem"])
+
+
+def interleave(models, problems):
+    """
+    Return the cells of `models` × `problems`, round-robin across models.
+
+    Round r holds every model's r-th problem; the model order rotates by one each
+    round so no model is always first in line.
+
+    Args:
+        models (list): (model_id, model_name) pairs.
+        problems (list): Problems in suite order (passed through to the cells).
+    """
+    cells = []
+    for index, problem in enumerate(problems):
+        offset = index % len(models) if models else 0
+        for model_id, model_name in models[offset:] + models[:offset]:
+            cells.append(Cell(model_id, model_name, index, problem))
+    return cells
+
+
+class MatrixScheduler:
+    """Shared work queue of cells that caps the calls in flight per model."""
+
+    def __init__(self, cells, per_model=MATRIX_PER_MODEL_CONCURRENCY):
+        self.pending = deque(cells)
+        self.per_model = max(1, per_model)
+        self.in_flight = Counter()
+        self.cond = threading.Condition()
+
+    def take(self):
+        """
+        Return the first queued cell whose model is below its in-flight cap,
+        waiting while every remaining cell belongs to a saturated model.
+
+        Returns:
+            Cell: The next cell, or None once the queue is empty (or cancelled).
+        """
+        with self.cond:
+            while self.pending:
+                for index, cell in enumerate(self.pending):
+                    if self.in_flight[cell.model_id] < self.per_model:
+                        del self.pending[index]
+                        self.in_flight[cell.model_id] += 1
+                        return cell
+                self.cond.wait()
+            return None
+
+    def done(self, cell):
+        with self.cond:
+            self.in_flight[cell.model_id] -= 1
+            self.cond.notify_all()
+
+    def cancel(self):
+        """Drop the cells that have not started; workers finish their current cell."""
+        with self.cond:
+            self.pending.clear()
+            self.cond.notify_all()
+
+
+class ModelRollup:
+    """Running per-model summary of a matrix run."""
+
+    def __init__(self, model_id, model_name, cells):
+        self.model_id = model_id
+        self.model_name = model_name
+        self.cells = cells
+        self.completed = 0
+        self.correct = 0
+        self.errors = 0
+        self.skipped = 0
+        self.total_response_time = 0.0
+        self.total_score = 0
+
+    def add(self, status, payload):
+        self.completed += 1
+        if status == "result":
+            self.correct += bool(payload.get("correct"))
+            self.total_response_time += payload.get("response_time", 0)
+            self.total_score += payload.get("score", 0)
+        elif status == "skipped":
+            self.skipped += 1
+        else:
+            self.errors += 1
+
+    @property
+    def finished(self):
+        return self.completed >= self.cells
+
+    def entry(self):
+        answered = self.completed - self.errors - self.skipped
+        return {
+            "model_id": self.model_id,
+            "model_name": self.model_name,
+            "cells": self.cells,
+            "completed": self.completed,
+            "correct": self.correct,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "accuracy": round(self.correct / answered, 4) if answered else None,
+            "mean_response_time": round(self.total_response_time / answered, 2) if answered else None,
+            "avg_score": round(self.total_score / answered, 1) if answered else None
+        }
+
+
+def run_matrix(models, problems, run_cell, workers=MATRIX_WORKERS, per_model=MATRIX_PER_MODEL_CONCURRENCY):
+    """
+    Run every (model, problem) cell and yield events in completion order.
+
+    Args:
+        models (list): (model_id, model_name) pairs.
+        problems (list): The suite's problems.
+        run_cell (callable): Tests one Cell and returns (status, payload): status
+            "result" with the test result, or "skipped"/"error" with a message.
+            Exceptions count as errors.
+        workers (int): Cells run concurrently.
+        per_model (int): Cells of one model run concurrently.
+
+    Yields:
+        tuple: ("cell", data) for each finished cell, ("model", rollup) once all
+            of a model's cells have finished, and a final ("complete", summary)
+            with every model's rollup, best average score first.
+    """
+    cells = interleave(models, problems)
+    rollups = {model_id: ModelRollup(model_id, model_name, len(problems)) for model_id, model_name in models}
+    scheduler = MatrixScheduler(cells, per_model)
+    events = queue.Queue()
+    started = time.monotonic()
+
+    def _worker():
+        while True:
+            cell = scheduler.take()
+            if cell is None:
+                return
+            try:
+                status, payload = run_cell(cell)
+            except Exception as e:
+                status, payload = "error", str(e)
+            finally:
+                scheduler.done(cell)
+            events.put((cell, status, payload))
+
+    workers = max(1, min(workers, len(cells)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="matrix")
+    try:
+        for _ in range(workers):
+            executor.submit(_worker)
+        for completed in range(1, len(cells) + 1):
+            cell, status, payload = events.get()
+            data = {
+                "model_id": cell.model_id,
+                "model_name": cell.model_name,
+                "problem_index": cell.problem_index,
+                "status": status,
+                "completed_cells": completed,
+                "total_cells": len(cells)
+            }
+            data["result" if status == "result" else "message"] = payload
+            yield "cell", data
+
+            rollup = rollups[cell.model_id]
+            rollup.add(status, payload)
+            if rollup.finished:
+                yield "model", rollup.entry()
+    finally:
+        # If the client disconnects mid-run, drop the cells that have not started yet
+        scheduler.cancel()
+        executor.shutdown(wait=False)
+
+    entries = sorted((rollup.entry() for rollup in rollups.values()),
+                     key=lambda entry: entry["avg_score"] if entry["avg_score"] is not None else -1, reverse=True)
+    yield "complete", {
+        "models": entries,
+        "total_cells": len(cells),
+        "elapsed_seconds": round(time.monotonic() - started, 2)
+    }
@@ -0,0 +1,216 @@
+"""
+Minimal Prometheus-style metrics registry.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format (version 0.0.4) by the /metrics route. Kept dependency-free;
+all metric objects are thread-safe.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond DB/evaluation work up to the
+# 60 s upstream request timeout.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 20, 30, 60)
+
+
+def percentile(values, p):
+    """Return the p-th percentile (0-100) of `values`, linearly interpolated. None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        """Increment the gauge for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self.lock:
+            items = sorted((key, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]})
+                           for key, s in self.values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing  # Re-imports return the metric already registered
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Metrics shared across modules ---
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled, by route and status.", ("method", "route", "status"))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to produce the HTTP response (for SSE routes: until the stream starts).", ("method", "route"))
+UPSTREAM_REQUEST_DURATION = REGISTRY.histogram(
+    "openrouter_request_duration_seconds",
+    "Latency of OpenRouter /chat/completions calls, by model and outcome.", ("model", "outcome"))
+DB_OPERATION_DURATION = REGISTRY.histogram(
+    "db_operation_duration_seconds", "Latency of database operations.", ("operation",))
+EVALUATE_DURATION = REGISTRY.histogram(
+    "evaluate_response_duration_seconds", "Time spent grading a model response.")
+CATALOG_CACHE_REQUESTS = REGISTRY.counter(
+    "model_catalog_cache_requests_total",
+    "Model catalog lookups by result (hit, stale, miss).", ("result",))
+RESPONSE_CACHE_REQUESTS = REGISTRY.counter(
+    "response_cache_requests_total", "Response cache lookups by result (hit, miss).", ("result",))
+SWEEPS_IN_FLIGHT = REGISTRY.gauge(
+    "sweeps_in_flight", "Model sweeps currently running, by route.", ("route",))
+MODEL_TESTS_IN_FLIGHT = REGISTRY.gauge(
+    "model_tests_in_flight", "Model tests currently waiting on OpenRouter (single tests and sweeps).")
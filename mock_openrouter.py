@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenRouter API.
+
+Serves /api/v1/models and /api/v1/chat/completions (plain and streamed) with
+configurable latency distributions and error, 429 and timeout injection, so the
+app can be exercised and load-tested without an API key:
+
+    python mock_openrouter.py --port 5050 --latency lognormal:-0.5,0.6 --rate-limit-rate 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:5050/api/v1 python app.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+DEFAULT_ANSWER = "Squaring x + y = 7 gives x² + 2xy + y² = 49, so 2xy = 49 - 25 = 24 and xy = 12."
+WRONG_ANSWER = "Squaring both sides we get xy = 10."
+
+
+class MockConfig:
+    """Behaviour of the mock server. All rates are probabilities per request."""
+
+    def __init__(self, models=20, dead_models=0, latency="uniform:0.2,1.0", error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=1, timeout_rate=0.0, timeout_seconds=65,
+                 correct_rate=0.8, chunk_delay=0.02, tokens_per_chunk=3, multi_sample=True, model_latency=None,
+                 seed=None):
+        self.models = models
+        self.dead_models = dead_models
+        self.latency = latency
+        # {model_id: distribution} overriding `latency` for single models
+        self.model_latency = model_latency or {}
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.correct_rate = correct_rate
+        self.chunk_delay = chunk_delay
+        self.tokens_per_chunk = tokens_per_chunk
+        # Honour the `n` parameter (several choices per request) like most providers
+        self.multi_sample = multi_sample
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self, probability):
+        with self.lock:
+            return self.random.random() < probability
+
+    def sample_latency(self, model_id=None):
+        """
+        Draw a latency in seconds from the distribution configured for `model_id`.
+
+        Formats: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+        "lognormal:MU,SIGMA" (parameters of the underlying normal distribution).
+        """
+        latency = self.model_latency.get(model_id, self.latency)
+        kind, _, params = latency.partition(":")
+        values = [float(v) for v in params.split(",")] if params else []
+        with self.lock:
+            if kind == "fixed":
+                return values[0]
+            if kind == "uniform":
+                return self.random.uniform(values[0], values[1])
+            if kind == "normal":
+                return max(0.0, self.random.gauss(values[0], values[1]))
+            if kind == "lognormal":
+                return self.random.lognormvariate(values[0], values[1])
+        raise ValueError(f"Unknown latency distribution: {latency}")
+
+
+def build_models(config):
+    """Return the mock /models catalog: free models, dead free models and one paid model."""
+    free = {"prompt": "0", "completion": "0"}
+    models = [{
+        "id": f"mock/model-{i}:free",
+        "name": f"Mock Model {i}",
+        "context_length": 8192 * (1 + i % 4),
+        "pricing": free
+    } for i in range(config.models)]
+    models += [{
+        "id": f"mock/dead-{i}:free",
+        "name": f"Mock Dead Model {i}",
+        "context_length": 4096,
+        "pricing": free
+    } for i in range(config.dead_models)]
+    models.append({
+        "id": "mock/paid-model",
+        "name": "Mock Paid Model",
+        "context_length": 128000,
+        "pricing": {"prompt": "0.000001", "completion": "0.000002"}
+    })
+    return models
+
+
+def _count_tokens(text):
+    return max(1, len(text.split()))
+
+
+def create_mock_app(config=None):
+    """Create the Flask app implementing the mocked endpoints."""
+    config = config or MockConfig()
+    app = Flask("mock_openrouter")
+    models = build_models(config)
+    models_body = json.dumps({"data": models})
+    models_etag = hashlib.sha1(models_body.encode("utf-8")).hexdigest()
+    app.config["MOCK_CONFIG"] = config
+
+    @app.route("/api/v1", methods=["GET", "HEAD"])
+    def root():
+        # Target of OpenRouterClient.warm_up()
+        return ""
+
+    @app.route("/api/v1/models")
+    def list_models():
+        if models_etag in request.if_none_match:
+            return Response(status=304, headers={"ETag": f'"{models_etag}"'})
+        return Response(models_body, mimetype="application/json", headers={"ETag": f'"{models_etag}"'})
+
+    @app.route("/api/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        body = request.get_json(force=True)
+        model_id = body.get("model", "")
+        messages = body.get("messages", [])
+        prompt_tokens = sum(_count_tokens(m.get("content", "")) for m in messages)
+
+        if config.roll(config.rate_limit_rate):
+            return jsonify({"error": {"code": 429, "message": "Rate limit exceeded"}}), 429, {
+                "Retry-After": str(config.retry_after)}
+        if model_id.startswith("mock/dead-") or config.roll(config.error_rate):
+            return jsonify({"error": {"code": 502, "message": "Upstream provider error"}}), 502
+        if config.roll(config.timeout_rate):
+            time.sleep(config.timeout_seconds)
+
+        n = max(1, int(body.get("n") or 1)) if config.multi_sample else 1
+        # Each choice is an independent answer
+        texts = [DEFAULT_ANSWER if config.roll(config.correct_rate) else WRONG_ANSWER for _ in range(n)]
+        if body.get("max_tokens"):
+            texts = [" ".join(text.split()[:body["max_tokens"]]) for text in texts]
+        text = texts[0]
+        completion_tokens = _count_tokens(text)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"gen-{uuid.uuid4().hex[:16]}"
+        latency = config.sample_latency(model_id)
+
+        if not body.get("stream"):
+            time.sleep(latency)
+            completion_tokens = sum(_count_tokens(choice) for choice in texts)
+            return jsonify({
+                "id": completion_id,
+                "model": model_id,
+                "choices": [{"index": i, "message": {"role": "assistant", "content": choice}, "finish_reason": "stop"}
+                            for i, choice in enumerate(texts)],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens}
+            })
+
+        def generate():
+            yield ": OPENROUTER PROCESSING\n\n"
+            # The sampled latency is spent before the first token
+            time.sleep(latency)
+            words = text.split(" ")
+            for i in range(0, len(words), config.tokens_per_chunk):
+                piece = " ".join(words[i:i + config.tokens_per_chunk])
+                if i + config.tokens_per_chunk < len(words):
+                    piece += " "
+                chunk = {"id": completion_id, "model": model_id,
+                         "choices": [{"index": 0, "delta": {"content": piece}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                time.sleep(config.chunk_delay)
+            final = {"id": completion_id, "model": model_id,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            # Like the OpenAI API, streams only report usage when asked to
+            if (body.get("stream_options") or {}).get("include_usage"):
+                final["usage"] = usage
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return Response(generate(), mimetype="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenRouter stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--models", type=int, default=20, help="Number of healthy free models")
+    parser.add_argument("--dead-models", type=int, default=0, help="Free models that always return 502")
+    parser.add_argument("--latency", default="uniform:0.2,1.0",
+                        help="fixed:S | uniform:LOW,HIGH | normal:MEAN,SD | lognormal:MU,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 502 response")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of a 429 response")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Probability of hanging past the client timeout")
+    parser.add_argument("--timeout-seconds", type=float, default=65)
+    parser.add_argument("--correct-rate", type=float, default=0.8, help="Probability of answering correctly")
+    parser.add_argument("--single-sample", action="store_true",
+                        help="Ignore the n parameter and always return one choice")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(models=args.models, dead_models=args.dead_models, latency=args.latency,
+                        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                        retry_after=args.retry_after, timeout_rate=args.timeout_rate,
+                        timeout_seconds=args.timeout_seconds, correct_rate=args.correct_rate,
+                        chunk_delay=args.chunk_delay, multi_sample=not args.single_sample, seed=args.seed)
+    print(f"Mock OpenRouter listening on http://{args.host}:{args.port}/api/v1")
+    create_mock_app(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Indexed view of the OpenRouter model catalog.
+
+CatalogIndex is built once per catalog version and answers the lookups the app
+does on every request (model by id, free models, filtering by provider and
+context length) without scanning or re-filtering the whole catalog.
+"""
+
+import bisect
+import hashlib
+import json
+from collections import defaultdict
+
+
+def is_free_model(model):
+    """Return True if both prompt and completion pricing of a catalog entry are 0."""
+    pricing = model.get("pricing", {})
+    return pricing.get("prompt") == "0" and pricing.get("completion") == "0"
+
+
+def model_provider(model):
+    """Return the provider of a catalog entry, derived from the "provider/model" id if not given."""
+    provider = model.get("provider")
+    if provider:
+        return provider
+    model_id = model.get("id") or ""
+    return model_id.split("/", 1)[0] if "/" in model_id else "unknown"
+
+
+class CatalogIndex:
+    """Immutable indexes over one version of the model catalog."""
+
+    def __init__(self, models):
+        self.models = models
+        self.by_id = {}
+        self.by_provider = defaultdict(list)
+        free_positions = []
+        by_context = []
+
+        for position, model in enumerate(models):
+            model_id = model.get("id")
+            if model_id:
+                self.by_id[model_id] = model
+            self.by_provider[model_provider(model).lower()].append(position)
+            if is_free_model(model):
+                free_positions.append(position)
+            by_context.append((model.get("context_length") or 0, position))
+
+        self.free_positions = free_positions
+        self.free_models = [models[position] for position in free_positions]
+        self.free_ids = frozenset(model.get("id") for model in self.free_models)
+        by_context.sort()
+        self.context_lengths = [context for context, _ in by_context]
+        self.context_positions = [position for _, position in by_context]
+        # Content hash of the catalog, used as the version for ETags
+        self.etag = hashlib.sha1(json.dumps(models, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, model_id):
+        """Return the catalog entry for `model_id`, or None."""
+        return self.by_id.get(model_id)
+
+    def providers(self):
+        """Return the known provider names."""
+        return sorted(self.by_provider)
+
+    def query(self, provider=None, min_context=None, free_only=True, limit=None):
+        """
+        Return the models matching every given filter, in catalog order.
+
+        Args:
+            provider (str): Provider name (case-insensitive), e.g. "google".
+            min_context (int): Minimum context length in tokens.
+            free_only (bool): Only return free models.
+            limit (int): Maximum number of models to return.
+        """
+        candidates = []
+        if free_only:
+            candidates.append(self.free_positions)
+        if provider:
+            candidates.append(self.by_provider.get(provider.lower(), []))
+        if min_context:
+            start = bisect.bisect_left(self.context_lengths, min_context)
+            candidates.append(self.context_positions[start:])
+
+        if not candidates:
+            positions = range(len(self.models))
+        else:
+            # Intersect starting from the most selective index
+            candidates.sort(key=len)
+            selected = set(candidates[0])
+            for other in candidates[1:]:
+                selected.intersection_update(other)
+            positions = sorted(selected)
+
+        result = [self.models[position] for position in positions]
+        return result[:limit] if limit else result
@@ -1,100 +1,495 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
-import re
 import os
 import json
+import threading
 from datetime import datetime, timedelta
 import logging
 
+from answer_matcher import evaluate
+from rate_limiter import RateLimiter
+from response_cache import make_cache_key
+from catalog_store import DEFAULT_CATALOG_PATH, load_snapshot, save_snapshot
+from model_catalog import CatalogIndex
+from circuit_breaker import CircuitBreakerRegistry
+from metrics import CATALOG_CACHE_REQUESTS, EVALUATE_DURATION, RESPONSE_CACHE_REQUESTS, UPSTREAM_REQUEST_DURATION
+
 # Set up a basic logger
 logger = logging.getLogger(__name__)
 # You might want to configure the logger further (e.g., level, handler)
 # in a central place in your application if needed. For now, this is basic.
 
+# Point OPENROUTER_BASE_URL at mock_openrouter.py to run without a live API key
+DEFAULT_BASE_URL = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+REQUEST_TIMEOUT_SECONDS = 60
+SYSTEM_PROMPT = "You are a helpful math assistant. Solve the given problem step by step and provide the final answer clearly."
+
+# Connection pool defaults, overridable through the environment.
+# pool_connections is the number of per-host pools kept around, pool_maxsize is
+# the number of keep-alive connections kept open to a single host.
+DEFAULT_POOL_CONNECTIONS = int(os.environ.get("OPENROUTER_POOL_CONNECTIONS", "4"))
+DEFAULT_POOL_MAXSIZE = int(os.environ.get("OPENROUTER_POOL_MAXSIZE", "16"))
+DEFAULT_POOL_BLOCK = os.environ.get("OPENROUTER_POOL_BLOCK", "0") == "1"
+
+# How many times a request answered with 429 is retried after honouring Retry-After
+MAX_RATE_LIMIT_RETRIES = int(os.environ.get("OPENROUTER_RATE_LIMIT_RETRIES", "2"))
+
+# Timeout for the one-token health probes sent to models with an open circuit
+PROBE_TIMEOUT_SECONDS = 15
+
+
+def build_chat_payload(model_id, problem_text):
+    """Build the /chat/completions request body for a math problem."""
+    return {
+        "model": model_id,
+        "messages": [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": problem_text
+            }
+        ]
+    }
+
+
+def parse_chat_response(response_data, response_time):
+    """Extract the response text and token usage from a /chat/completions body."""
+    response_text = response_data.get("choices", [{}])[0].get("message", {}).get("content", "")
+    usage = response_data.get("usage", {})
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    completion_tokens = usage.get("completion_tokens", 0)
+    total_tokens = usage.get("total_tokens", prompt_tokens + completion_tokens) # Calculate if not provided
+
+    return {
+        "response_text": response_text,
+        "response_time_seconds": response_time,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens
+    }
+
+
+def parse_chat_samples(response_data, response_time):
+    """
+    Split a /chat/completions body requested with n > 1 into one result per choice.
+
+    All choices share the request's latency and prompt tokens; the completion
+    tokens are divided evenly between them, so each sample reports about what a
+    single call would have.
+    """
+    choices = response_data.get("choices") or [{}]
+    result = parse_chat_response(response_data, response_time)
+    completion_tokens = result["completion_tokens"] // len(choices)
+    return [{
+        "response_text": choice.get("message", {}).get("content", ""),
+        "response_time_seconds": response_time,
+        "prompt_tokens": result["prompt_tokens"],
+        "completion_tokens": completion_tokens,
+        "total_tokens": result["prompt_tokens"] + completion_tokens
+    } for choice in choices]
+
+
+def evaluate_response(response_text, expected_answer):
+    """
+    Evaluate if the response contains the expected_answer.
+    Numeric answers are compared by value (see answer_matcher), others are
+    searched for as a whole word, case-insensitively.
+
+    Shared by OpenRouterClient and AsyncOpenRouterClient.
+    """
+    with EVALUATE_DURATION.time():
+        is_correct, found_answer = evaluate(response_text, expected_answer)
+    if is_correct:
+        logger.info(f"Found expected answer '{expected_answer}' in response: '{found_answer}'")
+    else:
+        logger.info(f"Expected answer '{expected_answer}' not found in response.")
+    return is_correct, found_answer
+
+
+def _release_on_close(response, release):
+    """Call release() once, when `response` is closed."""
+    close = response.close
+    released = False
+
+    def _close():
+        nonlocal released
+        try:
+            close()
+        finally:
+            if not released:
+                released = True
+                release()
+
+    response.close = _close
+
+
+class RateLimitedError(Exception):
+    """Raised when a request cannot be sent within the rate limits."""
+
+
 class OpenRouterClient:
     """Client for interacting with the OpenRouter API"""
     
-    def __init__(self, api_key):
-        """Initialize the client with the API key"""
+    def __init__(self, api_key, pool_connections=None, pool_maxsize=None, pool_block=None, rate_limiter=None,
+                 response_cache=None, catalog_path=DEFAULT_CATALOG_PATH):
+        """
+        Initialize the client with the API key.
+
+        All requests go through a single requests.Session so TCP/TLS connections to
+        openrouter.ai are kept alive and reused instead of being set up per call.
+
+        Args:
+            api_key (str): The OpenRouter API key.
+            pool_connections (int): Number of per-host connection pools to cache.
+            pool_maxsize (int): Maximum number of keep-alive connections per host.
+            pool_block (bool): Block when the per-host pool is exhausted instead of
+                opening extra (non-pooled) connections.
+            rate_limiter (RateLimiter): Limiter applied to send_math_problem. Pass a
+                shared instance to coordinate several clients; defaults to a new one.
+            response_cache (ResponseCache): Cache for send_math_problem results, or None
+                to always call the API.
+            catalog_path (str): File holding the persisted model catalog snapshot, or
+                None to keep the catalog in memory only.
+        """
         self.api_key = api_key
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = DEFAULT_BASE_URL
         self.models_cache = None
         self.models_cache_time = None
         self.cache_duration = timedelta(minutes=30)  # Cache models for 30 minutes
+        self.catalog_etag = None
+        self.catalog_last_modified = None
+        self.catalog_path = catalog_path
+        self._refresh_lock = threading.Lock()
+        self._catalog_index = CatalogIndex([])
+
+        self.pool_connections = pool_connections or DEFAULT_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+        self.pool_block = DEFAULT_POOL_BLOCK if pool_block is None else pool_block
+        self.session = self._create_session()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_rate_limit_retries = MAX_RATE_LIMIT_RETRIES
+        self.response_cache = response_cache
+        self.circuit_breakers = CircuitBreakerRegistry()
+        # Models whose provider ignores or rejects the `n` parameter (see sample_math_problem)
+        self.single_sample_models = set()
+        self._load_catalog_snapshot()
+
+    def _create_session(self):
+        """Create the pooled keep-alive session shared by all API calls."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Connection": "keep-alive"
+        })
+        return session
+
+    def warm_up(self, connections=1, timeout=10):
+        """
+        Open connections to the API host ahead of the first real request.
+
+        Issues lightweight HEAD requests in parallel so up to `connections` sockets
+        (capped at the pool size) have completed DNS, TCP and TLS setup and sit idle
+        in the pool. Failures are logged and ignored.
+
+        Returns:
+            int: The number of warm-up requests that reached the server.
+        """
+        connections = max(1, min(connections, self.pool_maxsize))
+        succeeded = []
+        lock = threading.Lock()
+
+        def _open():
+            try:
+                self.session.head(self.base_url, timeout=timeout)
+                with lock:
+                    succeeded.append(True)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Connection warm-up failed: {e}")
+
+        threads = [threading.Thread(target=_open, daemon=True) for _ in range(connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(f"Warmed up {len(succeeded)}/{connections} connections to {self.base_url}", flush=True)
+        return len(succeeded)
+
+    def connection_stats(self):
+        """
+        Return connection pool counters summed over all mounted adapters.
+
+        Returns:
+            dict: connections_opened (new TCP/TLS connections), requests (requests sent
+                through the pools), connections_reused (requests served on an existing
+                keep-alive connection) and the configured pool sizes.
+        """
+        opened = 0
+        sent = 0
+        seen = set()
+        for adapter in self.session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened += getattr(pool, "num_connections", 0)
+                sent += getattr(pool, "num_requests", 0)
+        return {
+            "connections_opened": opened,
+            "connections_reused": max(sent - opened, 0),
+            "requests": sent,
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "pool_block": self.pool_block
+        }
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
     
     def get_models(self):
-        """Get all available models from OpenRouter"""
+        """
+        Get all available models from OpenRouter.
+
+        Serves the catalog stale-while-revalidate: once any copy exists (in memory or
+        loaded from the on-disk snapshot) it is returned immediately, and an expired
+        copy triggers a conditional refresh in a background thread. Only a cold start
+        with no snapshot at all waits for the download.
+        """
         # Check if we have a valid cache
         if self.models_cache and self.models_cache_time and datetime.now() - self.models_cache_time < self.cache_duration:
-            print("Using cached models list")
+            CATALOG_CACHE_REQUESTS.inc(result="hit")
             return self.models_cache
-            
-        try:
-            response = requests.get(
-                f"{self.base_url}/models",
-                headers={"Authorization": f"Bearer {self.api_key}"}
-            )
-            response.raise_for_status()
-            models = response.json().get("data", [])
-            
-            # Update cache
-            self.models_cache = models
-            self.models_cache_time = datetime.now()
-            
-            return models
-        except Exception as e:
-            print(f"Error fetching models: {e}")
-            # If we have a cache, return it even if expired
+
+        if self.models_cache:
+            CATALOG_CACHE_REQUESTS.inc(result="stale")
+            print("Using stale models list while refreshing in the background")
+            self.refresh_models_async()
+            return self.models_cache
+
+        CATALOG_CACHE_REQUESTS.inc(result="miss")
+        self.refresh_models(if_missing=True)
+        return self.models_cache
+
+    def refresh_models(self, if_missing=False):
+        """
+        Download the catalog, revalidating with ETag / Last-Modified when known.
+
+        A 304 only bumps the fetch time. New data replaces the in-memory catalog and
+        the on-disk snapshot. Errors keep the existing copy, and are raised only when
+        there is no copy to fall back to.
+
+        Args:
+            if_missing (bool): Skip the download if another thread loaded the catalog
+                while this one waited for the refresh lock.
+
+        Returns:
+            bool: True if the catalog content changed.
+        """
+        with self._refresh_lock:
+            if if_missing and self.models_cache:
+                return False
+            headers = {}
             if self.models_cache:
-                print("Returning expired cache due to error")
-                return self.models_cache
-            raise
-    
+                if self.catalog_etag:
+                    headers["If-None-Match"] = self.catalog_etag
+                if self.catalog_last_modified:
+                    headers["If-Modified-Since"] = self.catalog_last_modified
+            try:
+                response = self.session.get(f"{self.base_url}/models", headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
+                if response.status_code == 304 and self.models_cache:
+                    print("Models list not modified")
+                    self.models_cache_time = datetime.now()
+                    self._save_catalog_snapshot()
+                    return False
+                response.raise_for_status()
+                models = response.json().get("data", [])
+
+                # Update cache; an identical payload keeps the existing list (and its index)
+                changed = self.models_cache != models
+                if changed:
+                    self.models_cache = models
+                self.models_cache_time = datetime.now()
+                self.catalog_etag = response.headers.get("ETag")
+                self.catalog_last_modified = response.headers.get("Last-Modified")
+                self._save_catalog_snapshot()
+                return changed
+            except Exception as e:
+                print(f"Error fetching models: {e}")
+                # If we have a cache, return it even if expired
+                if self.models_cache:
+                    print("Returning expired cache due to error")
+                    return False
+                raise
+
+    def refresh_models_async(self):
+        """Start refresh_models in a background thread unless one is already running."""
+        if self._refresh_lock.locked():
+            return False
+
+        def _refresh():
+            try:
+                self.refresh_models()
+            except Exception as e:
+                logger.warning(f"Background model catalog refresh failed: {e}")
+
+        threading.Thread(target=_refresh, name="catalog-refresh", daemon=True).start()
+        return True
+
+    def _load_catalog_snapshot(self):
+        snapshot = load_snapshot(self.catalog_path)
+        if snapshot:
+            self.models_cache = snapshot["models"]
+            self.models_cache_time = datetime.fromtimestamp(snapshot["fetched_at"])
+            self.catalog_etag = snapshot.get("etag")
+            self.catalog_last_modified = snapshot.get("last_modified")
+            print(f"Loaded {len(self.models_cache)} models from catalog snapshot fetched at {self.models_cache_time}")
+
+    def _save_catalog_snapshot(self):
+        save_snapshot({
+            "models": self.models_cache,
+            "fetched_at": self.models_cache_time.timestamp(),
+            "etag": self.catalog_etag,
+            "last_modified": self.catalog_last_modified
+        }, self.catalog_path)
+
+    def get_catalog_index(self):
+        """
+        Return the CatalogIndex for the current catalog.
+
+        The index is rebuilt only when the catalog list itself has been replaced.
+        """
+        models = self.get_models()
+        index = self._catalog_index
+        if index.models is not models:
+            index = CatalogIndex(models)
+            self._catalog_index = index
+        return index
+
+    def get_model(self, model_id):
+        """Return the catalog entry for `model_id`, or None if it is unknown."""
+        return self.get_catalog_index().get(model_id)
+
     def get_free_models(self):
         """Get all free models from OpenRouter"""
-        all_models = self.get_models()
-        
-        # Filter for models that are free (prompt and completion costs are 0)
-        free_models = []
-        for model in all_models:
-            pricing = model.get("pricing", {})
-            if (pricing.get("prompt") == "0" and pricing.get("completion") == "0"):
-                free_models.append(model)
-        
-        return free_models
+        # Filtered once per catalog version by the index (prompt and completion costs are 0)
+        return list(self.get_catalog_index().free_models)
     
-    def send_math_problem(self, model_id, problem_text):
-        """Send a math problem to a specific model and return the response"""
+    def send_math_problem(self, model_id, problem_text, stream=False, on_delta=None, use_cache=True):
+        """
+        Send a math problem to a specific model and return the response.
+
+        Identical requests are answered from the response cache when one is configured;
+        the returned dictionary then has "cached": True and carries the latency and
+        token usage of the original call. Failed calls are never cached.
+
+        Args:
+            model_id (str): The ID of the model to test.
+            problem_text (str): The problem to send.
+            stream (bool): Request a streamed completion and measure time-to-first-token,
+                inter-token latency and output tokens/sec while the chunks arrive.
+            on_delta (callable): Optional callback invoked with each text fragment as it
+                is received (streaming mode only).
+            use_cache (bool): Set to False to bypass the cache for this request.
+        """
+        cache_key = None
+        if self.response_cache is not None and use_cache:
+            cache_key = make_cache_key(model_id, SYSTEM_PROMPT, problem_text, {"stream": stream})
+            cached = self.response_cache.get(cache_key)
+            RESPONSE_CACHE_REQUESTS.inc(result="hit" if cached is not None else "miss")
+            if cached is not None:
+                print(f"Using cached response for model: {model_id}", flush=True)
+                if stream and on_delta and cached.get("response_text"):
+                    on_delta(cached["response_text"])
+                cached["cached"] = True
+                return cached
+
+        call_start = time.perf_counter()
+        result = self._request_math_problem(model_id, problem_text, stream, on_delta)
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - call_start,
+                                          model=model_id, outcome=result.get("error_type", "ok"))
+        self.circuit_breakers.record(model_id, result)
+        result["cached"] = False
+        if cache_key is not None and not result.get("error"):
+            self.response_cache.set(cache_key, result)
+        return result
+
+    def sample_math_problem(self, model_id, problem_text, n):
+        """
+        Ask a model for `n` independent answers to a problem in one request.
+
+        Sets the API's `n` parameter. A provider that ignores it answers with a
+        single choice, and one that rejects it with HTTP 400 is asked again
+        without it; either way the model is remembered in single_sample_models
+        and later calls ask it for one answer at a time. Callers therefore have
+        to repeat the call until they have enough samples. Samples are never
+        served from or stored in the response cache, since repeated trials need
+        fresh answers.
+
+        Returns:
+            list: One result per sample, as from send_math_problem (all sharing
+                the request's latency), or a single error result.
+        """
+        if model_id in self.single_sample_models:
+            n = 1
+        call_start = time.perf_counter()
+        result = self._request_math_problem(model_id, problem_text, n=n)
+        if n > 1 and result.get("error_type") == "http_error" and result.get("status_code") == 400:
+            print(f"Model {model_id} rejected n={n}; sampling one answer per request", flush=True)
+            self.single_sample_models.add(model_id)
+            n = 1
+            result = self._request_math_problem(model_id, problem_text)
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - call_start,
+                                          model=model_id, outcome=result.get("error_type", "ok"))
+        self.circuit_breakers.record(model_id, result)
+
+        samples = [result] if result.get("error") else result.pop("samples", [result])
+        if n > 1 and not result.get("error") and len(samples) == 1:
+            self.single_sample_models.add(model_id)
+        for sample in samples:
+            sample["cached"] = False
+        return samples
+
+    def _request_math_problem(self, model_id, problem_text, stream=False, on_delta=None, n=1):
+        """Send the problem upstream; see send_math_problem and sample_math_problem."""
         try:
             print(f"Attempting to send problem to model: {model_id}", flush=True) # Log start with flush
-            start_time = time.time()
-            
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": model_id,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a helpful math assistant. Solve the given problem step by step and provide the final answer clearly."
-                        },
-                        {
-                            "role": "user",
-                            "content": problem_text
-                        }
-                    ]
-                },
-                timeout=60  # Add a timeout to prevent hanging requests
-            )
+
+            payload = build_chat_payload(model_id, problem_text)
+            if stream:
+                payload["stream"] = True
+                # Streams only report token usage (in a final chunk) when asked to
+                payload["stream_options"] = {"include_usage": True}
+            if n > 1:
+                payload["n"] = n
+
+            # start_time is taken after any rate-limit wait so it is not part of response_time
+            response, start_time = self._post_with_rate_limit(model_id, payload, stream)
             
             print(f"Received response status code: {response.status_code} for model: {model_id}", flush=True) # Log status code with flush
             if not response.ok:
                  print(f"Error Response Text: {response.text}", flush=True) # Log error text if status not OK with flush
+                 response.close() # Frees a streamed request's concurrency slot
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+
+            if stream:
+                return self._read_stream(model_id, response, start_time, on_delta)
+
             response_data = response.json()
             print(f"Successfully received and parsed JSON response for model: {model_id}", flush=True) # Log success with flush
             print(f"Raw response data for model {model_id}: {json.dumps(response_data, indent=2)}", flush=True)
@@ -102,19 +497,10 @@ class OpenRouterClient:
             response_time = end_time - start_time
             
             # Extract the response text and token usage
-            response_text = response_data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            usage = response_data.get("usage", {})
-            prompt_tokens = usage.get("prompt_tokens", 0)
-            completion_tokens = usage.get("completion_tokens", 0)
-            total_tokens = usage.get("total_tokens", prompt_tokens + completion_tokens) # Calculate if not provided
-
-            return {
-                "response_text": response_text,
-                "response_time_seconds": response_time,
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "total_tokens": total_tokens # Add total_tokens
-            }
+            result = parse_chat_response(response_data, response_time)
+            if n > 1:
+                result["samples"] = parse_chat_samples(response_data, response_time)
+            return result
         except requests.exceptions.Timeout:
             return {
                 "response_text": "Request timed out after 60 seconds",
@@ -122,7 +508,8 @@ class OpenRouterClient:
                 "prompt_tokens": 0,
                 "completion_tokens": 0,
                 "total_tokens": 0, # Add total_tokens
-                "error": "timeout"
+                "error": "timeout",
+                "error_type": "timeout"
             }
         except requests.exceptions.Timeout as e: # Catch specific timeout errors first
              print(f"Request Timed Out for model {model_id}: {e}", flush=True)
@@ -131,15 +518,28 @@ class OpenRouterClient:
                  "response_text": "Request timed out after 60 seconds",
                  "response_time_seconds": 60,
                  "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
-                 "error": "timeout"
+                 "error": "timeout",
+                 "error_type": "timeout"
              }
+        except RateLimitedError as e:
+            print(f"Rate limited for model {model_id}: {e}", flush=True)
+            return {
+                "response_text": f"Rate limited: {str(e)}",
+                "response_time_seconds": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                "error": "rate_limited",
+                "error_type": "rate_limited"
+            }
         except requests.exceptions.RequestException as e: # Catch other request errors
             print(f"Network/Request Error for model {model_id}: {e}", flush=True)
+            is_http_error = isinstance(e, requests.exceptions.HTTPError)
             return {
                 "response_text": f"Network/Request Error: {str(e)}",
                 "response_time_seconds": time.time() - start_time if 'start_time' in locals() else 0,
                 "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
-                "error": f"Network/Request Error: {str(e)}"
+                "error": f"Network/Request Error: {str(e)}",
+                "error_type": "http_error" if is_http_error else "network_error",
+                "status_code": e.response.status_code if is_http_error and e.response is not None else None
             }
         except json.JSONDecodeError as e: # Catch JSON parsing errors
              print(f"JSON Decode Error for model {model_id}: {e}. Response text: {response.text if 'response' in locals() else 'N/A'}", flush=True)
@@ -147,7 +547,8 @@ class OpenRouterClient:
                 "response_text": f"Invalid JSON Response: {response.text if 'response' in locals() else 'N/A'}",
                 "response_time_seconds": time.time() - start_time if 'start_time' in locals() else 0,
                 "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
-                "error": f"JSON Decode Error: {str(e)}"
+                "error": f"JSON Decode Error: {str(e)}",
+                "error_type": "json_error"
              }
         except Exception as e: # Catch any other errors
             print(f"Generic Error testing model {model_id}: {type(e).__name__} - {e}", flush=True)
@@ -158,42 +559,162 @@ class OpenRouterClient:
                 "response_text": f"Unexpected Error: {str(e)}",
                 "response_time_seconds": time.time() - start_time if 'start_time' in locals() else 0,
                 "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
-                "error": f"Unexpected Error: {str(e)}"
+                "error": f"Unexpected Error: {str(e)}",
+                "error_type": "unexpected"
             }
     
+    def probe_model(self, model_id):
+        """
+        Check whether a model answers at all with a minimal one-token request.
+
+        Used for open circuits instead of a full test. The outcome is recorded in the
+        model's circuit breaker.
+
+        Returns:
+            bool: True if the model answered successfully.
+        """
+        payload = {
+            "model": model_id,
+            "messages": [{"role": "user", "content": "ping"}],
+            "max_tokens": 1
+        }
+        result = {}
+        try:
+            response, _ = self._post_with_rate_limit(model_id, payload, False, timeout=PROBE_TIMEOUT_SECONDS)
+            if not response.ok:
+                result = {"error": f"HTTP {response.status_code}", "error_type": "http_error",
+                          "status_code": response.status_code}
+        except RateLimitedError:
+            result = {"error": "rate_limited", "error_type": "rate_limited"}
+        except requests.exceptions.Timeout:
+            result = {"error": "timeout", "error_type": "timeout"}
+        except requests.exceptions.RequestException as e:
+            result = {"error": str(e), "error_type": "network_error"}
+        print(f"Probe for model {model_id}: {'ok' if not result else result['error']}", flush=True)
+        self.circuit_breakers.record(model_id, result)
+        return not result
+
+    def _post_with_rate_limit(self, model_id, payload, stream, timeout=REQUEST_TIMEOUT_SECONDS):
+        """
+        POST to /chat/completions through the rate limiter.
+
+        Waits for the key/model buckets before sending and retries 429 responses up to
+        max_rate_limit_retries times (the limiter blocks the bucket for Retry-After).
+
+        Returns:
+            tuple: (response, start_time) for the attempt that was not throttled.
+
+        Raises:
+            RateLimitedError: If the limiter would wait too long or retries run out.
+        """
+        for attempt in range(self.max_rate_limit_retries + 1):
+            if not self.rate_limiter.acquire(self.api_key, model_id):
+                raise RateLimitedError(f"no request slot for {model_id} within {self.rate_limiter.max_wait}s")
+
+            status_code = None
+            headers = None
+            held = False
+            try:
+                start_time = time.time()
+                response = self.session.post(
+                    f"{self.base_url}/chat/completions",
+                    headers={"Content-Type": "application/json"},
+                    json=payload,
+                    timeout=timeout,  # Add a timeout to prevent hanging requests
+                    stream=stream
+                )
+                status_code = response.status_code
+                headers = response.headers
+                if stream and status_code != 429:
+                    # A streamed body is generated while it is read, so the concurrency
+                    # slot stays taken until the response is closed
+                    _release_on_close(response, lambda: self.rate_limiter.release(
+                        self.api_key, model_id, status_code, headers))
+                    held = True
+            finally:
+                if not held:
+                    self.rate_limiter.release(self.api_key, model_id, status_code, headers)
+
+            if status_code != 429:
+                return response, start_time
+
+            print(f"429 from OpenRouter for model {model_id} (attempt {attempt + 1}), Retry-After: {headers.get('Retry-After')}", flush=True)
+            response.close()
+
+        raise RateLimitedError(f"still throttled after {self.max_rate_limit_retries + 1} attempts")
+
+    def _read_stream(self, model_id, response, start_time, on_delta=None):
+        """
+        Consume a streamed (SSE) /chat/completions response chunk by chunk.
+
+        Returns the usual send_math_problem dictionary with "time_to_first_token",
+        "inter_token_latency" (mean gap between content chunks) and "tokens_per_second"
+        (completion tokens over the generation phase) filled in.
+        """
+        parts = []
+        usage = {}
+        first_token_time = None
+        last_token_time = None
+        gaps = []
+        content_chunks = 0
+
+        try:
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                # Blank keep-alive lines and ": OPENROUTER PROCESSING" comments carry no data
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed stream chunk for model {model_id}: {data[:100]}")
+                    continue
+
+                if chunk.get("error"):
+                    raise requests.exceptions.HTTPError(f"Stream error: {chunk['error'].get('message', chunk['error'])}")
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    now = time.time()
+                    if first_token_time is None:
+                        first_token_time = now
+                    else:
+                        gaps.append(now - last_token_time)
+                    last_token_time = now
+                    content_chunks += 1
+                    parts.append(delta)
+                    if on_delta:
+                        on_delta(delta)
+        finally:
+            response.close()
+
+        end_time = time.time()
+        result = parse_chat_response({"choices": [{"message": {"content": "".join(parts)}}], "usage": usage}, end_time - start_time)
+        if not usage:
+            # Token counts are unknown (None): chunks are not tokens, so neither they nor a
+            # throughput are made up, and scoring skips the token and throughput tiers
+            logger.warning(f"Stream for model {model_id} reported no token usage")
+            result["prompt_tokens"] = result["completion_tokens"] = result["total_tokens"] = None
+
+        generation_time = end_time - first_token_time if first_token_time else 0
+        result["time_to_first_token"] = first_token_time - start_time if first_token_time else None
+        result["inter_token_latency"] = sum(gaps) / len(gaps) if gaps else None
+        result["tokens_per_second"] = (result["completion_tokens"] / generation_time
+                                       if usage and generation_time > 0 else None)
+        print(f"Stream finished for model {model_id}: {content_chunks} chunks, TTFT {result['time_to_first_token']}", flush=True)
+        return result
+
     def evaluate_response(self, response_text, expected_answer):
         """
         Evaluate if the response contains the expected_answer.
-        Searches for the expected_answer as a whole word, case-insensitively.
-        """
-        # Ensure response_text is a string
-        if not isinstance(response_text, str):
-            print(f"Warning: evaluate_response received non-string input: {type(response_text)}")
-            return False, None
-
-        if not isinstance(expected_answer, str):
-            logger.warning(f"evaluate_response received non-string expected_answer: {type(expected_answer)}")
-            return False, None
-
-        # Ensure expected_answer is treated as a string for re.escape
-        expected_answer_str = str(expected_answer)
-        logger.debug(f"Evaluating response. Expected answer: '{expected_answer_str}'. Response text (first 100 chars): '{response_text[:100]}'")
-
-        # Escape the expected_answer for use in regex and ensure it's treated as a whole word
-        # \b matches word boundaries
-        # re.escape handles any special characters in expected_answer
-        pattern = r'\b' + re.escape(expected_answer_str) + r'\b'
-
-        match = re.search(pattern, response_text, re.IGNORECASE)
-
-        if match:
-            logger.info(f"Found expected answer '{expected_answer_str}' in response: '{match.group(0)}'")
-            return True, match.group(0)
-        else:
-            # The previous secondary check for numeric was a pass-through, keeping it that way.
-            # If more sophisticated numeric matching is needed, it would go here.
-            logger.info(f"Expected answer '{expected_answer_str}' not found in response.")
-            return False, None
+        Numeric answers are compared by value, others matched as a whole word.
+        """
+        return evaluate_response(response_text, expected_answer)
 
 def test_openrouter_client():
     """Test function for the OpenRouter client"""
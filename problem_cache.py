@@ -0,0 +1,93 @@
+"""
+Process-local cache of the global problem.
+
+Every worker process serves the problem from memory, so request handlers never
+query the database for it. A background thread follows the storage backend's
+change feed (LISTEN/NOTIFY on PostgreSQL, version polling on SQLite) and
+reloads the problem when another worker saves a newer version.
+"""
+
+import threading
+from collections import namedtuple
+
+import database
+
+Problem = namedtuple("Problem", ["text", "correct_answer", "version"])
+
+
+class ProblemCache:
+    """Versioned in-memory copy of the global problem with push invalidation."""
+
+    def __init__(self, default_text, default_answer, load=None, save=None, watch=None):
+        """
+        Args:
+            default_text (str): Problem saved when the database has none yet.
+            default_answer (str): Correct answer of the default problem.
+            load (callable): Returns the stored problem dictionary or None
+                (default database.get_global_problem).
+            save (callable): Saves (text, answer) and returns the new version
+                (default database.save_global_problem).
+            watch (callable): watch(on_change, stop) change feed
+                (default database.watch_global_problem).
+        """
+        self.default = (default_text, default_answer)
+        self.load = load or database.get_global_problem
+        self.save = save or database.save_global_problem
+        self.watch = watch or database.watch_global_problem
+        self.problem = Problem(default_text, default_answer, 0)
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.thread = None
+        self.reloads = 0
+
+    def start(self):
+        """Load the stored problem (saving the default if there is none) and follow changes."""
+        if not self.reload():
+            print("No global problem found in database, saving default problem.")
+            self.set(*self.default)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._watch, name="problem-cache", daemon=True)
+            self.thread.start()
+        return self
+
+    def get(self):
+        """Return the current Problem (text, correct_answer, version) without touching the database."""
+        return self.problem
+
+    def set(self, text, correct_answer):
+        """Save a new global problem and make it current in this process immediately."""
+        version = self.save(text, correct_answer)
+        with self.lock:
+            if version is None:
+                # Not saved; keep serving it here, the next stored version replaces it
+                self.problem = Problem(text, correct_answer, self.problem.version)
+            elif version > self.problem.version:
+                self.problem = Problem(text, correct_answer, version)
+        return self.problem
+
+    def reload(self):
+        """Re-read the stored problem. Returns False if the database has none."""
+        data = self.load()
+        if not data:
+            return False
+        with self.lock:
+            # A concurrent set() may already have installed a newer version
+            if data["version"] >= self.problem.version:
+                self.problem = Problem(data["problem_text"], data["correct_answer"], data["version"])
+                self.reloads += 1
+        return True
+
+    def close(self):
+        self.stop.set()
+
+    def _on_change(self, version):
+        if version is None or version > self.problem.version:
+            self.reload()
+
+    def _watch(self):
+        while not self.stop.is_set():
+            try:
+                self.watch(self._on_change, self.stop)
+            except Exception as e:
+                print(f"Global problem watch failed, retrying: {e}")
+                self.stop.wait(database.PROBLEM_LISTEN_RETRY)
@@ -0,0 +1,278 @@
+"""
+Client-side rate limiting for OpenRouter requests.
+
+Free models are heavily rate-limited, both per API key and per upstream model.
+RateLimiter keeps a token bucket per API key and per model, honours Retry-After
+and X-RateLimit-* response headers, and adapts the number of concurrent requests
+per key with AIMD (additive increase on success, multiplicative decrease on 429)
+so sweeps run at the highest rate the upstream accepts.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the environment.
+DEFAULT_KEY_RATE = float(os.environ.get("OPENROUTER_KEY_RATE", "5"))          # requests/sec per API key
+DEFAULT_KEY_BURST = float(os.environ.get("OPENROUTER_KEY_BURST", "10"))
+DEFAULT_MODEL_RATE = float(os.environ.get("OPENROUTER_MODEL_RATE", "1"))      # requests/sec per model
+DEFAULT_MODEL_BURST = float(os.environ.get("OPENROUTER_MODEL_BURST", "2"))
+DEFAULT_INITIAL_CONCURRENCY = int(os.environ.get("OPENROUTER_INITIAL_CONCURRENCY", "4"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("OPENROUTER_MAX_CONCURRENCY", "32"))
+DEFAULT_MAX_WAIT = float(os.environ.get("OPENROUTER_RATE_LIMIT_MAX_WAIT", "30"))  # seconds
+DEFAULT_BACKOFF = 5.0  # seconds to back off after a 429 without any rate-limit headers
+
+
+def parse_retry_after(value, now=None):
+    """
+    Parse a Retry-After header into a number of seconds to wait.
+
+    Accepts both forms allowed by RFC 9110: delta-seconds ("120") and an HTTP-date.
+    Returns None if the value is missing or cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+def parse_reset(value, now=None):
+    """
+    Parse an X-RateLimit-Reset header into a number of seconds to wait.
+
+    OpenRouter sends a Unix timestamp in milliseconds; Unix timestamps in seconds and
+    plain delta-seconds are accepted as well.
+    """
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    now = now if now is not None else time.time()
+    if reset > 1e12:   # epoch milliseconds
+        return max(0.0, reset / 1000.0 - now)
+    if reset > 1e9:    # epoch seconds
+        return max(0.0, reset - now)
+    return max(0.0, reset)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that can also be blocked until a point in time."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self):
+        """Return 0 and take a token if one is available, otherwise the seconds to wait."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.rate <= 0:
+                return 0.0  # Unlimited unless blocked
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def block_for(self, seconds):
+        """Refuse all tokens for the next `seconds` seconds."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+    def seconds_blocked(self):
+        with self.lock:
+            return max(0.0, self.blocked_until - time.monotonic())
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on the number of concurrent requests.
+
+    Each success raises the limit by 1/limit (about +1 per round of requests), each
+    throttled response halves it.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_CONCURRENCY, minimum=1, maximum=DEFAULT_MAX_CONCURRENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Wait for a free slot. Returns False if `timeout` seconds pass first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled=False, success=True):
+        """Free a slot and adjust the limit for the outcome of the request."""
+        with self.condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled:
+                self.limit = max(float(self.minimum), self.limit / 2)
+            elif success:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class RateLimiter:
+    """
+    Per-key and per-model rate limiting in front of /chat/completions.
+
+    Usage:
+        if limiter.acquire(api_key, model_id):
+            try:
+                response = ...
+            finally:
+                limiter.release(api_key, model_id, response.status_code, response.headers)
+    """
+
+    def __init__(self, key_rate=DEFAULT_KEY_RATE, key_burst=DEFAULT_KEY_BURST,
+                 model_rate=DEFAULT_MODEL_RATE, model_burst=DEFAULT_MODEL_BURST,
+                 initial_concurrency=DEFAULT_INITIAL_CONCURRENCY, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_wait=DEFAULT_MAX_WAIT):
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.model_rate = model_rate
+        self.model_burst = model_burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.key_buckets = {}
+        self.model_buckets = {}
+        self.concurrency = {}
+        self.throttled_count = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key_id(api_key):
+        """Short fingerprint of an API key, safe to use in logs and stats."""
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+    def _key_bucket(self, key_id):
+        with self.lock:
+            if key_id not in self.key_buckets:
+                self.key_buckets[key_id] = TokenBucket(self.key_rate, self.key_burst)
+                self.concurrency[key_id] = AdaptiveConcurrencyLimiter(self.initial_concurrency, 1, self.max_concurrency)
+            return self.key_buckets[key_id], self.concurrency[key_id]
+
+    def _model_bucket(self, model_id):
+        with self.lock:
+            if model_id not in self.model_buckets:
+                self.model_buckets[model_id] = TokenBucket(self.model_rate, self.model_burst)
+            return self.model_buckets[model_id]
+
+    def acquire(self, api_key, model_id, max_wait=None):
+        """
+        Block until a request for `model_id` may be sent with `api_key`.
+
+        Waits for a token from the key and the model bucket and for a concurrency slot.
+        Returns False without taking a slot if that would take longer than `max_wait`
+        seconds (default: the limiter's max_wait), e.g. while a Retry-After is pending.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        key_bucket, concurrency = self._key_bucket(self.key_id(api_key))
+        model_bucket = self._model_bucket(model_id)
+
+        for bucket in (key_bucket, model_bucket):
+            while True:
+                wait = bucket.time_until_available()
+                if wait <= 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    logger.info(f"Rate limit wait of {wait:.1f}s for {model_id} exceeds {max_wait}s, giving up")
+                    return False
+                time.sleep(wait)
+
+        return concurrency.acquire(timeout=max(0.0, deadline - time.monotonic()))
+
+    def release(self, api_key, model_id, status_code=None, headers=None):
+        """
+        Record the outcome of a request started with acquire().
+
+        A 429 halves the key's concurrency limit and blocks the bucket the limit applies
+        to: the key bucket when X-RateLimit-* headers are present (account limits),
+        otherwise the model bucket (upstream provider limits). X-RateLimit-Remaining of
+        0 blocks the key bucket until X-RateLimit-Reset even on successful responses.
+        """
+        key_id = self.key_id(api_key)
+        key_bucket, concurrency = self._key_bucket(key_id)
+        headers = headers or {}
+        throttled = status_code == 429
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_in = parse_reset(headers.get("X-RateLimit-Reset"))
+        if remaining is not None and reset_in:
+            try:
+                if float(remaining) <= 0:
+                    key_bucket.block_for(reset_in)
+            except ValueError:
+                pass
+
+        if throttled:
+            with self.lock:
+                self.throttled_count += 1
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if remaining is not None:
+                key_bucket.block_for(retry_after if retry_after is not None else (reset_in or DEFAULT_BACKOFF))
+            else:
+                self._model_bucket(model_id).block_for(retry_after if retry_after is not None else DEFAULT_BACKOFF)
+
+        concurrency.release(throttled=throttled, success=status_code is not None and status_code < 400)
+
+    def stats(self):
+        """Return current limits and back-off state for monitoring."""
+        with self.lock:
+            keys = {
+                key_id: {
+                    "concurrency_limit": int(self.concurrency[key_id].limit),
+                    "in_flight": self.concurrency[key_id].in_flight,
+                    "blocked_seconds": round(bucket.seconds_blocked(), 2)
+                }
+                for key_id, bucket in self.key_buckets.items()
+            }
+            blocked_models = {
+                model_id: round(bucket.seconds_blocked(), 2)
+                for model_id, bucket in self.model_buckets.items()
+                if bucket.seconds_blocked() > 0
+            }
+            return {"keys": keys, "blocked_models": blocked_models, "throttled_responses": self.throttled_count}
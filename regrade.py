@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Offline re-grading of stored results.
+
+Re-runs answer evaluation and scoring over the response texts already in the
+database, so a corrected expected answer or changed scoring rules can be
+applied to the whole history without calling any model:
+
+    python regrade.py --dry-run                      # print what would change
+    python regrade.py                                # re-grade every result
+    python regrade.py --problem-id 3 --expected 13   # correct problem 3's answer
+
+Results are streamed from the database in chunks, graded in a process pool and
+written back in batches; the leaderboard is rebuilt at the end. Results already
+rolled up by the retention job have no response text left and are not touched.
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import database
+from answer_matcher import evaluate_many
+from scoring import calculate_score
+
+# Defaults, overridable through the environment.
+REGRADE_CHUNK_SIZE = int(os.environ.get("REGRADE_CHUNK_SIZE", "2000"))
+REGRADE_WORKERS = int(os.environ.get("REGRADE_WORKERS", str(os.cpu_count() or 1)))
+# Seconds between progress reports
+REGRADE_PROGRESS_INTERVAL = float(os.environ.get("REGRADE_PROGRESS_INTERVAL", "2"))
+
+GRADE_COLUMNS = ("is_correct", "answer_found", "score", "problem_id")
+
+
+def _total_tokens(row):
+    """
+    Return a stored result's total tokens, or None if its usage was unknown.
+
+    Unknown usage (a stream without a usage report) is stored as 0; every
+    streamed response with reported usage has tokens, so 0 on a streamed row
+    means unknown. Error rows also store 0 but were not streamed.
+    """
+    if not row["total_tokens"] and row.get("time_to_first_token") is not None:
+        return None
+    return row["total_tokens"]
+
+
+def grade_chunk(rows, expected_answer=None, problem_id=None):
+    """
+    Re-grade a chunk of results and return the grades that changed.
+
+    Runs in the worker processes, so it only takes and returns plain data.
+
+    Args:
+        rows (list): Result dictionaries with their response_text.
+        expected_answer (str): Grade against this answer instead of each result's own.
+        problem_id (int): Move the results to this problem (with expected_answer).
+
+    Returns:
+        list: {"id", "timestamp", "model_id", "before", "after"} per changed result;
+            before and after hold GRADE_COLUMNS.
+    """
+    expected = expected_answer if expected_answer is not None else [row["expected_answer"] for row in rows]
+    changes = []
+    for row, (is_correct, found_answer) in zip(rows, evaluate_many([row["response_text"] for row in rows], expected)):
+        after = {
+            "is_correct": is_correct,
+            "answer_found": found_answer if is_correct else "Incorrect",
+            "score": calculate_score(is_correct, row["response_time"], _total_tokens(row),
+                                     time_to_first_token=row.get("time_to_first_token"),
+                                     tokens_per_second=row.get("tokens_per_second")),
+            "problem_id": problem_id if problem_id is not None else row["problem_id"]
+        }
+        before = {column: row[column] for column in GRADE_COLUMNS}
+        if after != before:
+            changes.append({"id": row["id"], "timestamp": row["timestamp"], "model_id": row["model_id"],
+                            "before": before, "after": after})
+    return changes
+
+
+def regrade(model_id=None, since=None, until=None, problem_id=None, expected_answer=None, dry_run=False,
+            workers=REGRADE_WORKERS, chunk_size=REGRADE_CHUNK_SIZE, on_change=None, on_progress=None):
+    """
+    Re-grade stored results and write the changed grades back.
+
+    Args:
+        model_id, since, until: Only results matching these filters (as for /api/results).
+        problem_id (int): Only results of this problem.
+        expected_answer (str): Corrected expected answer for `problem_id`; the
+            results are re-graded against it and moved to the corrected problem.
+        dry_run (bool): Compute the changes without writing them.
+        workers (int): Grading processes; 1 grades in this process.
+        chunk_size (int): Results read, graded and written per batch.
+        on_change (callable): Called with each change (see grade_chunk()).
+        on_progress (callable): Called with the running summary every
+            REGRADE_PROGRESS_INTERVAL seconds.
+
+    Returns:
+        dict: scanned, changed, became_correct, became_incorrect, written and
+            elapsed_seconds.
+
+    Raises:
+        ValueError: If expected_answer is given without problem_id, or the
+            problem has no stored results.
+    """
+    started = last_report = time.monotonic()
+    target_problem = None
+    if expected_answer is not None:
+        if problem_id is None:
+            raise ValueError("a corrected expected answer needs the problem id it applies to")
+        target_problem = _corrected_problem(problem_id, expected_answer, create=not dry_run)
+
+    summary = {"scanned": 0, "changed": 0, "became_correct": 0, "became_incorrect": 0, "written": 0}
+    grade = functools.partial(grade_chunk, expected_answer=expected_answer, problem_id=target_problem)
+    chunks = database.iter_results(model_id=model_id, since=since, until=until, include_response=True,
+                                   chunk_size=chunk_size, problem_id=problem_id)
+    for scanned, changes in _grade_all(chunks, grade, workers):
+        summary["scanned"] += scanned
+        summary["changed"] += len(changes)
+        for change in changes:
+            was, now = change["before"]["is_correct"], change["after"]["is_correct"]
+            summary["became_correct"] += bool(now and not was)
+            summary["became_incorrect"] += bool(was and not now)
+            if on_change:
+                on_change(change)
+        if changes and not dry_run:
+            database.update_grades([dict(change["after"], id=change["id"], timestamp=change["timestamp"])
+                                    for change in changes])
+            summary["written"] += len(changes)
+        if on_progress and time.monotonic() - last_report >= REGRADE_PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            on_progress(dict(summary, elapsed_seconds=_elapsed(started)))
+
+    if summary["written"]:
+        database.rebuild_leaderboard()
+    summary["elapsed_seconds"] = _elapsed(started)
+    return summary
+
+
+def _corrected_problem(problem_id, expected_answer, create=True):
+    """The id of problem `problem_id`'s prompt with the corrected answer; None in a dry run, which stores nothing."""
+    results = database.iter_results(problem_id=problem_id, chunk_size=1)
+    try:
+        first = next(results, None)
+    finally:
+        results.close()
+    if not first:
+        raise ValueError(f"no stored results for problem {problem_id}")
+    return database.problem_id(first[0]["prompt"], expected_answer) if create else None
+
+
+def _grade_all(chunks, grade, workers):
+    """
+    Yield (rows scanned, changes) for each chunk, in order.
+
+    With several workers, chunks are graded in a process pool with at most two
+    per worker in flight, so reading, grading and writing overlap while memory
+    stays bounded.
+    """
+    if workers <= 1:
+        for rows in chunks:
+            yield len(rows), grade(rows)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for rows in chunks:
+            in_flight.append((len(rows), executor.submit(grade, rows)))
+            if len(in_flight) >= 2 * workers:
+                scanned, future = in_flight.popleft()
+                yield scanned, future.result()
+        while in_flight:
+            scanned, future = in_flight.popleft()
+            yield scanned, future.result()
+
+
+def _elapsed(started):
+    return round(time.monotonic() - started, 2)
+
+
+def _change_line(change):
+    return json.dumps({"id": change["id"], "model_id": change["model_id"],
+                       "before": change["before"], "after": change["after"]})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-grade stored results without calling any model.")
+    parser.add_argument("--model-id", help="Only results of this model")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only results at or after this time (ISO 8601)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Only results before this time (ISO 8601)")
+    parser.add_argument("--problem-id", type=int, help="Only results of this problem")
+    parser.add_argument("--expected", help="Corrected expected answer for --problem-id")
+    parser.add_argument("--dry-run", action="store_true", help="Print the changes as JSON lines without writing them")
+    parser.add_argument("--workers", type=int, default=REGRADE_WORKERS, help="Grading processes")
+    parser.add_argument("--chunk-size", type=int, default=REGRADE_CHUNK_SIZE, help="Results per batch")
+    args = parser.parse_args(argv)
+    if args.expected is not None and args.problem_id is None:
+        parser.error("--expected needs --problem-id")
+
+    database.init_db()
+    summary = regrade(model_id=args.model_id, since=args.since, until=args.until, problem_id=args.problem_id,
+                      expected_answer=args.expected, dry_run=args.dry_run, workers=args.workers,
+                      chunk_size=args.chunk_size,
+                      on_change=(lambda change: print(_change_line(change), flush=True)) if args.dry_run else None,
+                      on_progress=lambda progress: print(
+                          f"Re-graded {progress['scanned']} results, {progress['changed']} changed "
+                          f"({progress['elapsed_seconds']}s)", file=sys.stderr, flush=True))
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+"""
+Content-addressed cache for model test responses.
+
+Entries are keyed by a hash of (model_id, system prompt, problem text, request
+params), so re-testing a model on an unchanged problem is answered locally
+instead of spending free-tier quota. Recently used entries are kept in an
+in-memory LRU; all entries are persisted to a small SQLite file so the cache
+survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the environment.
+DEFAULT_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", "response_cache.db")
+DEFAULT_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+DEFAULT_MEMORY_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MEMORY_ENTRIES", "1000"))
+DEFAULT_DISK_ENTRIES = int(os.environ.get("RESPONSE_CACHE_DISK_ENTRIES", "20000"))
+# Hits whose access times are buffered before they are written to disk in one go
+DEFAULT_ACCESS_BATCH = int(os.environ.get("RESPONSE_CACHE_ACCESS_BATCH", "100"))
+
+
+def make_cache_key(model_id, system_prompt, problem_text, params=None):
+    """Return the SHA-256 hex digest identifying a (model, prompt, problem, params) request."""
+    canonical = json.dumps({
+        "model": model_id,
+        "system": system_prompt,
+        "problem": problem_text,
+        "params": params or {}
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) response cache with TTL and size-based eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS,
+                 max_memory_entries=DEFAULT_MEMORY_ENTRIES, max_disk_entries=DEFAULT_DISK_ENTRIES,
+                 access_batch=DEFAULT_ACCESS_BATCH):
+        """
+        Args:
+            path (str): SQLite file for the persistent tier, or None for memory only.
+            ttl (float): Seconds an entry stays valid.
+            max_memory_entries (int): Size of the in-memory LRU.
+            max_disk_entries (int): Entries kept on disk; least recently used go first.
+            access_batch (int): Hits buffered before their access times are written
+                to disk; they are also written before every disk eviction.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.access_batch = access_batch
+        self.memory = OrderedDict()
+        # {key: last access time} of hits not yet written to disk
+        self.pending_access = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk = None
+        if path:
+            try:
+                self.disk = sqlite3.connect(path, check_same_thread=False)
+                self.disk.execute('''CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )''')
+                self.disk.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_last_access ON response_cache (last_access)")
+                self.disk.commit()
+            except sqlite3.Error as e:
+                print(f"Error opening response cache at {path}, using memory only: {e}")
+                self.disk = None
+
+    def get(self, key):
+        """Return the cached value for `key`, or None if missing or expired."""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None and self.disk is not None:
+                row = self.disk.execute("SELECT value, stored_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = (row[1], json.loads(row[0]))
+                    self._remember(key, entry)
+
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    self._delete(key)
+                self.misses += 1
+                return None
+
+            self.memory.move_to_end(key)
+            if self.disk is not None:
+                # Hits stay off the disk: access times only order disk eviction, so
+                # they are written in batches instead of one commit per hit
+                self.pending_access[key] = now
+                if len(self.pending_access) >= self.access_batch:
+                    self._flush_access()
+                    self.disk.commit()
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, key, value):
+        """Store `value` (a JSON-serializable dict) under `key`."""
+        now = time.time()
+        with self.lock:
+            self._remember(key, (now, dict(value)))
+            if self.disk is not None:
+                self.disk.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, stored_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now))
+                self.pending_access.pop(key, None)
+                self._flush_access()
+                self._evict_disk()
+                self.disk.commit()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _flush_access(self):
+        """Write the buffered access times (the caller commits)."""
+        if self.pending_access:
+            self.disk.executemany("UPDATE response_cache SET last_access = ? WHERE key = ?",
+                                  [(accessed, key) for key, accessed in self.pending_access.items()])
+            self.pending_access.clear()
+
+    def _delete(self, key):
+        self.memory.pop(key, None)
+        self.pending_access.pop(key, None)
+        if self.disk is not None:
+            self.disk.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self.disk.commit()
+
+    def _evict_disk(self):
+        """Drop expired entries and the least recently used ones beyond max_disk_entries."""
+        self.disk.execute("DELETE FROM response_cache WHERE stored_at < ?", (time.time() - self.ttl,))
+        count = self.disk.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        if count > self.max_disk_entries:
+            self.disk.execute('''DELETE FROM response_cache WHERE key IN (
+                SELECT key FROM response_cache ORDER BY last_access ASC LIMIT ?)''', (count - self.max_disk_entries,))
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self.lock:
+            self.memory.clear()
+            self.pending_access.clear()
+            if self.disk is not None:
+                self.disk.execute("DELETE FROM response_cache")
+                self.disk.commit()
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes."""
+        with self.lock:
+            disk_entries = None
+            if self.disk is not None:
+                disk_entries = self.disk.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self.memory),
+                "disk_entries": disk_entries
+            }
@@ -0,0 +1,207 @@
+"""
+Write-behind queue for test results.
+
+Sweeps hand results to a ResultWriter instead of inserting them one by one; a
+background thread drains the bounded queue and saves them in batches, flushing
+when a batch is full or `flush_interval` seconds after its first result. Failed
+batches are retried and then reported through stats() and the
+result_writes_total metric instead of being printed and forgotten.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from metrics import REGISTRY
+
+# Defaults, overridable through the environment.
+DEFAULT_QUEUE_SIZE = int(os.environ.get("RESULT_WRITER_QUEUE_SIZE", "10000"))
+DEFAULT_BATCH_SIZE = int(os.environ.get("RESULT_WRITER_BATCH_SIZE", "100"))
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get("RESULT_WRITER_FLUSH_INTERVAL", "0.5"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("RESULT_WRITER_MAX_RETRIES", "3"))
+# How long submit() may block on a full queue before the result is dropped
+DEFAULT_SUBMIT_TIMEOUT = float(os.environ.get("RESULT_WRITER_SUBMIT_TIMEOUT", "5"))
+
+RESULT_WRITES = REGISTRY.counter(
+    "result_writes_total", "Results handled by the write-behind queue, by outcome (written, failed, dropped).",
+    ("outcome",))
+RESULT_WRITE_BATCH_SIZE = REGISTRY.histogram(
+    "result_write_batch_size", "Results per batch insert.", buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+
+_STOP = object()
+
+
+class ResultWriter:
+    """Background writer that saves queued results in batches."""
+
+    def __init__(self, save_batch, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_retries=DEFAULT_MAX_RETRIES,
+                 submit_timeout=DEFAULT_SUBMIT_TIMEOUT):
+        """
+        Args:
+            save_batch (callable): Saves a list of result dictionaries; raises on failure.
+            queue_size (int): Maximum number of results waiting to be written.
+            batch_size (int): Maximum results per save_batch call.
+            flush_interval (float): Seconds a result may wait for its batch to fill.
+            max_retries (int): Retries of a failed batch before it is reported as failed.
+            submit_timeout (float): Seconds submit() blocks on a full queue.
+        """
+        self.save_batch = save_batch
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.submit_timeout = submit_timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.pending = 0  # Submitted but not yet written or failed
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_error = None
+        self.last_error_time = None
+        self.thread = None
+        self.closed = False
+
+    def start(self):
+        """Start the background thread (idempotent)."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+                self.thread.start()
+        return self
+
+    def submit(self, result):
+        """
+        Queue a result for writing and return immediately.
+
+        Blocks only while the queue is full, for at most `submit_timeout` seconds;
+        the result is then dropped and counted in stats()["dropped"].
+
+        Returns:
+            bool: True if the result was queued.
+        """
+        if self.closed:
+            raise RuntimeError("ResultWriter is closed")
+        self.start()
+        with self.lock:
+            self.pending += 1
+        try:
+            self.queue.put(result, timeout=self.submit_timeout)
+            return True
+        except queue.Full:
+            self._report_error(f"queue full, dropped result for {result.get('model_id')}")
+            RESULT_WRITES.inc(outcome="dropped")
+            with self.lock:
+                self.dropped += 1
+                self._done(1)
+            return False
+
+    def flush(self, timeout=None):
+        """
+        Wait until every submitted result has been written (or has failed).
+
+        Returns:
+            bool: False if `timeout` seconds passed first.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.lock:
+            while self.pending:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.idle.wait(remaining)
+        return True
+
+    def close(self, timeout=30):
+        """Write everything still queued and stop the background thread."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            thread = self.thread
+        if thread is not None:
+            self.queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self):
+        """Return queue depth and write/failure counters."""
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "pending": self.pending,
+                "written": self.written,
+                "batches": self.batches,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "last_error": self.last_error,
+                "last_error_time": self.last_error_time
+            }
+
+    def _done(self, count):
+        # Caller holds self.lock
+        self.pending -= count
+        if self.pending <= 0:
+            self.idle.notify_all()
+
+    def _report_error(self, message):
+        print(f"Result writer error: {message}", flush=True)
+        with self.lock:
+            self.last_error = message
+            self.last_error_time = time.time()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True  # Write what we have, then exit
+                    break
+                batch.append(item)
+            self._write(batch)
+        # Anything submitted after the stop marker (racing close()) is still written
+        leftover = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            self._write(leftover[start:start + self.batch_size])
+
+    def _write(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.save_batch(batch)
+            except Exception as e:
+                error = f"saving {len(batch)} results failed (attempt {attempt + 1}): {e}"
+                if attempt < self.max_retries:
+                    print(f"Result writer: {error}; retrying", flush=True)
+                    time.sleep(min(2 ** attempt * 0.5, 5))
+                    continue
+                self._report_error(error)
+                RESULT_WRITES.inc(len(batch), outcome="failed")
+                with self.lock:
+                    self.failed += len(batch)
+                    self._done(len(batch))
+                return
+            RESULT_WRITES.inc(len(batch), outcome="written")
+            RESULT_WRITE_BATCH_SIZE.observe(len(batch))
+            with self.lock:
+                self.written += len(batch)
+                self.batches += 1
+                self._done(len(batch))
+            return
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Retention job for stored results.
+
+Retention is opt-in: with RESULTS_RETENTION_DAYS set, raw results (with
+their response texts) older than that many days are rolled up into daily
+per-model aggregates and removed, so storage and query cost stay flat as
+history grows. The job deletes data, so the web app never runs it; run it from
+cron or as one dedicated process:
+
+    python retention.py --days 30                  # one run
+    python retention.py --days 30 --every 3600     # run every hour until stopped
+
+A lock file keeps a second run on the same host from starting while one is
+still going.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, schedule a single process
+    fcntl = None
+
+import database
+
+# Defaults, overridable through the environment. 0 days keeps every raw result.
+RESULTS_RETENTION_DAYS = int(os.environ.get("RESULTS_RETENTION_DAYS", "0"))
+RESULTS_RETENTION_INTERVAL = float(os.environ.get("RESULTS_RETENTION_INTERVAL", "3600"))
+RESULTS_RETENTION_LOCK_FILE = os.environ.get(
+    "RESULTS_RETENTION_LOCK_FILE", os.path.join(tempfile.gettempdir(), "openrouter-results-retention.lock"))
+
+
+class RetentionJob:
+    """Background thread applying the retention policy periodically."""
+
+    def __init__(self, days=RESULTS_RETENTION_DAYS, interval=RESULTS_RETENTION_INTERVAL, apply=None):
+        """
+        Args:
+            days (int): Days of raw results to keep.
+            interval (float): Seconds between runs.
+            apply (callable): apply(days) performing one run (default database.apply_retention).
+        """
+        self.days = days
+        self.interval = interval
+        self.apply = apply or database.apply_retention
+        self.stop = threading.Event()
+        self.thread = None
+        self.runs = 0
+        self.last_run = None
+        self.last_summary = None
+        self.last_error = None
+
+    def start(self):
+        """Run once now and then every `interval` seconds (idempotent)."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="results-retention", daemon=True)
+            self.thread.start()
+        return self
+
+    def run_once(self):
+        """Apply the retention policy and return the summary, or None if it failed."""
+        try:
+            summary = self.apply(self.days)
+        except Exception as e:
+            print(f"Retention run failed: {e}")
+            self.last_error = str(e)
+            return None
+        self.runs += 1
+        self.last_run = time.time()
+        self.last_summary = summary
+        if summary["rolled_up"] or summary["pruned_blobs"]:
+            print(f"Retention: rolled up {summary['rolled_up']} results older than {self.days} days, "
+                  f"dropped {len(summary['dropped_partitions'])} partitions, "
+                  f"pruned {summary['pruned_blobs']} response texts")
+        return summary
+
+    def close(self):
+        self.stop.set()
+
+    def _run(self):
+        while not self.stop.is_set():
+            self.run_once()
+            self.stop.wait(self.interval)
+
+
+def acquire_lock(path=RESULTS_RETENTION_LOCK_FILE):
+    """
+    Take the host-wide retention lock without waiting.
+
+    Returns:
+        The open lock file (keep it open to hold the lock), or None if another
+        process holds it.
+    """
+    lock = open(path, "a")
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll up and remove results past the retention window.")
+    parser.add_argument("--days", type=int, default=RESULTS_RETENTION_DAYS, help="Days of raw results to keep")
+    parser.add_argument("--every", type=float, default=0,
+                        help="Keep running, once every this many seconds (default: run once)")
+    args = parser.parse_args(argv)
+    if args.days <= 0:
+        parser.error("--days must be positive (or set RESULTS_RETENTION_DAYS)")
+
+    lock = acquire_lock()
+    if lock is None:
+        print("Another retention run is in progress; exiting")
+        return 0
+    with lock:
+        database.init_db()
+        job = RetentionJob(days=args.days, interval=args.every)
+        if args.every > 0:
+            try:
+                job._run()
+            except KeyboardInterrupt:
+                return 0
+        summary = job.run_once()
+    print(json.dumps(summary, indent=2))
+    return 0 if summary is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
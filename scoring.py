@@ -0,0 +1,82 @@
+"""
+Scoring of model test results.
+
+A result earns up to 70 points for correctness, 20 for speed and 10 for token
+efficiency. Kept free of Flask and database imports so it can be benchmarked
+and reused (regrading, reports) without starting the app.
+"""
+
+# Streamed-run speed scoring: the points of each component and the thresholds for
+# each tier, from best to worst. A tier awards points * fraction.
+SCORE_TTFT_POINTS = 10
+SCORE_THROUGHPUT_POINTS = 10
+TTFT_TIERS = [(0.5, 1.0), (1, 0.8), (2, 0.6), (3, 0.4), (5, 0.2)]          # seconds to first token
+THROUGHPUT_TIERS = [(100, 1.0), (50, 0.8), (30, 0.6), (15, 0.4), (5, 0.2)]  # output tokens/sec
+
+
+def calculate_score(is_correct, response_time, total_tokens, time_to_first_token=None, tokens_per_second=None):
+    """
+    Calculate the score for a model based on correctness, response time, and token usage.
+
+    For streamed runs (time_to_first_token and tokens_per_second both known) the 20
+    speed points are split between latency to the first token and generation speed,
+    weighted by SCORE_TTFT_POINTS and SCORE_THROUGHPUT_POINTS.
+    
+    When the token usage is unknown (total_tokens None: a stream whose provider
+    reported no usage) the token efficiency tier is skipped and the other 90
+    points are scaled up to 100.
+
+    Args:
+        is_correct (bool): Whether the model provided the correct answer.
+        response_time (float): The response time in seconds.
+        total_tokens (int): The total number of tokens used, or None if unknown.
+        time_to_first_token (float): Seconds until the first streamed token, if streamed.
+        tokens_per_second (float): Output tokens per second, if streamed.
+    
+    Returns:
+        int: The calculated score (0-100).
+    """
+    # Correctness score (70 points)
+    correctness_score = 70 if is_correct else 0
+    
+    # Response time score (20 points)
+    if time_to_first_token is not None and tokens_per_second is not None:
+        time_score = _tiered_score(time_to_first_token, TTFT_TIERS, SCORE_TTFT_POINTS, lower_is_better=True) \
+            + _tiered_score(tokens_per_second, THROUGHPUT_TIERS, SCORE_THROUGHPUT_POINTS, lower_is_better=False)
+    elif response_time <= 1:
+        time_score = 20
+    elif response_time <= 2:
+        time_score = 15
+    elif response_time <= 3:
+        time_score = 10
+    elif response_time <= 4:
+        time_score = 5
+    else:
+        time_score = 0
+    
+    # Token efficiency score (10 points)
+    if total_tokens is None:
+        return round((correctness_score + time_score) * 100 / 90)
+    if total_tokens <= 100:
+        token_score = 10
+    elif total_tokens <= 200:
+        token_score = 8
+    elif total_tokens <= 300:
+        token_score = 6
+    elif total_tokens <= 400:
+        token_score = 4
+    elif total_tokens <= 500:
+        token_score = 2
+    else:
+        token_score = 0
+    
+    # Total score
+    return correctness_score + time_score + token_score
+
+
+def _tiered_score(value, tiers, points, lower_is_better):
+    """Award points for the first tier whose threshold `value` meets."""
+    for threshold, fraction in tiers:
+        if (value <= threshold) if lower_is_better else (value >= threshold):
+            return round(points * fraction)
+    return 0
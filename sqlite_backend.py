@@ -0,0 +1,644 @@
+"""
+SQLite storage backend, selected with DB_BACKEND=sqlite.
+
+Keeps results, leaderboard aggregates and the global problem in a single local
+file, so the app runs without a PostgreSQL server. The database is opened in
+WAL mode, so readers never block the writer or each other. All writes go
+through one writer thread that owns the only writable connection, which avoids
+SQLITE_BUSY contention between request threads; reads use one connection per
+thread. Statements are built once per shape and reused through each
+connection's prepared-statement cache.
+
+Timestamps are stored as UTC text ('YYYY-MM-DD HH:MM:SS.fff'), which sorts
+chronologically, and returned as datetime objects like the PostgreSQL backend.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+from concurrent.futures import Future
+from datetime import datetime
+
+from database import (
+    FULL_RESULT_FROM, FULL_RESULT_SELECT_COLUMNS, LEADERBOARD_COLUMNS, LEADERBOARD_REBUILD_SQL, LEADERBOARD_SUMS,
+    LEGACY_RESULT_COLUMNS, RAW_RUN_SUMS, RESULT_COLUMNS, RESULT_FROM, RESULT_SELECT_COLUMNS, ROLLUP_COLUMNS,
+    STREAMING_METRIC_COLUMNS, SUITE_LIST_SQL, SUITE_PROBLEMS_SQL, _daily_entries, _day_bounds, _full_result, _leaderboard_deltas, _leaderboard_entries,
+    _result_filters, _result_problems, _result_rows, _suite_rows, _where, problem_key, response_blob
+)
+
+# Defaults, overridable through the environment.
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "results.db")
+# NORMAL is durable across application crashes in WAL mode; only a power loss can
+# lose the last commits. Use FULL to fsync on every commit.
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "10"))
+# Prepared statements kept per connection
+SQLITE_CACHED_STATEMENTS = int(os.environ.get("SQLITE_CACHED_STATEMENTS", "256"))
+# Seconds between checks for a changed global problem
+SQLITE_POLL_INTERVAL = float(os.environ.get("SQLITE_POLL_INTERVAL", "0.05"))
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Current time in the stored timestamp format
+NOW_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+INSERT_RESULT_SQL = f'''INSERT INTO results ({", ".join(RESULT_COLUMNS)}, timestamp)
+    VALUES ({", ".join(["?"] * len(RESULT_COLUMNS))}, {NOW_SQL})'''
+
+LEADERBOARD_UPSERT_SQL = f'''INSERT INTO model_leaderboard ({", ".join(LEADERBOARD_COLUMNS)})
+    VALUES ({", ".join(["?"] * (len(LEADERBOARD_COLUMNS) - 1))}, {NOW_SQL})
+    ON CONFLICT (model_id, problem_key) DO UPDATE SET
+        model_name = excluded.model_name,
+        runs = runs + excluded.runs,
+        correct_runs = correct_runs + excluded.correct_runs,
+        total_response_time = total_response_time + excluded.total_response_time,
+        min_response_time = MIN(min_response_time, excluded.min_response_time),
+        max_response_time = MAX(max_response_time, excluded.max_response_time),
+        total_tokens = total_tokens + excluded.total_tokens,
+        best_score = MAX(best_score, excluded.best_score),
+        total_score = total_score + excluded.total_score,
+        last_tested = MAX(last_tested, excluded.last_tested)'''
+
+# Results past the retention window are rolled up into results_daily, the
+# SQLite counterpart of dropping PostgreSQL's daily partitions
+ROLLUP_UPSERT_SQL = f'''INSERT INTO results_daily (day, model_id, problem_id, {", ".join(ROLLUP_COLUMNS)})
+    SELECT substr(timestamp, 1, 10), model_id, problem_id, {RAW_RUN_SUMS}
+    FROM results WHERE timestamp < ?
+    GROUP BY substr(timestamp, 1, 10), model_id, problem_id
+    ON CONFLICT (day, model_id, problem_id) DO UPDATE SET
+        model_name = excluded.model_name,
+        runs = runs + excluded.runs,
+        correct_runs = correct_runs + excluded.correct_runs,
+        total_response_time = total_response_time + excluded.total_response_time,
+        min_response_time = MIN(min_response_time, excluded.min_response_time),
+        max_response_time = MAX(max_response_time, excluded.max_response_time),
+        total_tokens = total_tokens + excluded.total_tokens,
+        best_score = MAX(best_score, excluded.best_score),
+        total_score = total_score + excluded.total_score,
+        last_tested = MAX(last_tested, excluded.last_tested)'''
+
+# Boolean columns come back from SQLite as 0/1
+BOOLEAN_COLUMNS = ("is_correct", "cached")
+
+_STOP = object()
+
+
+def format_timestamp(value):
+    """Render a datetime in the stored timestamp format (millisecond precision)."""
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class _Reader:
+    """Holder of one thread's reader connection, kept in the backend's thread-local."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+class SQLiteBackend:
+    """Results storage in a local SQLite database with a single writer thread."""
+
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH, synchronous=SQLITE_SYNCHRONOUS, busy_timeout=SQLITE_BUSY_TIMEOUT,
+                 cached_statements=SQLITE_CACHED_STATEMENTS, poll_interval=SQLITE_POLL_INTERVAL):
+        """
+        Args:
+            path (str): Database file.
+            synchronous (str): PRAGMA synchronous level (OFF, NORMAL, FULL or EXTRA).
+            busy_timeout (float): Seconds a connection waits on a locked database.
+            cached_statements (int): Prepared statements cached per connection.
+            poll_interval (float): Seconds between checks for a changed global problem.
+        """
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown SQLITE_SYNCHRONOUS level: {synchronous!r}")
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.poll_interval = poll_interval
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.readers = []
+        self.writes = queue.Queue()
+        self.writer = None
+        self.write_count = 0
+        self.closed = False
+        # problem_key -> problems.id, only for committed problems
+        self.problem_ids = {}
+
+    # --- Connections ---
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _reader(self):
+        reader = getattr(self.local, "reader", None)
+        if reader is None:
+            if self.closed:
+                raise RuntimeError("SQLiteBackend is closed")
+            conn = self._connect()
+            reader = self.local.reader = _Reader(conn)
+            with self.lock:
+                self.readers.append(conn)
+            # The thread-local (and with it the _Reader) goes away when its thread
+            # exits, e.g. after each request under the threaded development server
+            weakref.finalize(reader, self._release_reader, conn)
+        return reader.conn
+
+    def _release_reader(self, conn):
+        with self.lock:
+            if conn in self.readers:
+                self.readers.remove(conn)
+        conn.close()
+
+    def _write(self, func, *args):
+        """Run func(conn, *args) in a transaction on the writer thread and return its result."""
+        if self.closed:
+            raise RuntimeError("SQLiteBackend is closed")
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._run_writer, name="sqlite-writer", daemon=True)
+                self.writer.start()
+        future = Future()
+        self.writes.put((future, func, args))
+        return future.result()
+
+    def _run_writer(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self.writes.get()
+                if item is _STOP:
+                    break
+                future, func, args = item
+                try:
+                    with conn:  # Commits, or rolls back if func raises
+                        result = func(conn, *args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    with self.lock:
+                        self.write_count += 1
+                    future.set_result(result)
+        finally:
+            conn.close()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            writer, readers, self.readers = self.writer, self.readers, []
+        if writer is not None:
+            self.writes.put(_STOP)
+            writer.join()
+        for conn in readers:
+            conn.close()
+
+    def pool_stats(self):
+        with self.lock:
+            return {
+                "backend": self.name,
+                "readers": len(self.readers),
+                "queued_writes": self.writes.qsize(),
+                "writes": self.write_count
+            }
+
+    # --- Schema ---
+
+    def init_db(self):
+        try:
+            if self._write(self._init_schema):
+                # Reclaim the space of the dropped legacy columns (outside a transaction)
+                self._write(lambda conn: conn.execute("VACUUM"))
+        except sqlite3.Error as e:
+            print(f"Error initializing database: {e}")
+
+    def _init_schema(self, conn):
+        """Create or migrate the schema. Returns True if legacy results were migrated."""
+        conn.execute('''CREATE TABLE IF NOT EXISTS problems (
+            id INTEGER PRIMARY KEY,
+            problem_key TEXT NOT NULL UNIQUE,
+            prompt TEXT NOT NULL,
+            expected_answer TEXT
+        )''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS response_blobs (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            length INTEGER NOT NULL
+        )''')
+
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_id TEXT NOT NULL,
+            model_name TEXT NOT NULL,
+            problem_id INTEGER NOT NULL REFERENCES problems (id),
+            response_hash TEXT NOT NULL REFERENCES response_blobs (hash),
+            is_correct BOOLEAN NOT NULL,
+            answer_found TEXT,
+            response_time REAL NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            total_tokens INTEGER NOT NULL,
+            score INTEGER NOT NULL,
+            timestamp TEXT DEFAULT ({NOW_SQL}),
+            time_to_first_token REAL,
+            inter_token_latency REAL,
+            tokens_per_second REAL,
+            cached BOOLEAN DEFAULT 0,
+            trial_group_id TEXT
+        )''')
+
+        # Databases created by earlier versions of the app lack the later columns,
+        # keep prompts and responses inline and stored second-precision timestamps
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+        added = {"cached": "BOOLEAN DEFAULT 0", "problem_id": "INTEGER REFERENCES problems (id)",
+                 "response_hash": "TEXT REFERENCES response_blobs (hash)", "trial_group_id": "TEXT"}
+        added.update((column, "REAL") for column in STREAMING_METRIC_COLUMNS)
+        for column, column_type in added.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE results ADD COLUMN {column} {column_type}")
+        legacy_columns = [column for column in LEGACY_RESULT_COLUMNS if column in existing]
+        if legacy_columns:
+            self._migrate_legacy_results(conn, legacy_columns)
+        conn.execute("UPDATE results SET timestamp = strftime('%Y-%m-%d %H:%M:%f', timestamp) "
+                     "WHERE length(timestamp) = 19")
+
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp DESC, id DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_model_timestamp "
+                     "ON results (model_id, timestamp DESC, id DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_problem ON results (problem_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_trial_group ON results (trial_group_id) "
+                     "WHERE trial_group_id IS NOT NULL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_response_hash ON results (response_hash)")
+
+        conn.execute('''CREATE TABLE IF NOT EXISTS results_daily (
+            day TEXT NOT NULL,
+            model_id TEXT NOT NULL,
+            problem_id INTEGER NOT NULL REFERENCES problems (id),
+            model_name TEXT NOT NULL,
+            runs INTEGER NOT NULL,
+            correct_runs INTEGER NOT NULL,
+            total_response_time REAL NOT NULL,
+            min_response_time REAL NOT NULL,
+            max_response_time REAL NOT NULL,
+            total_tokens INTEGER NOT NULL,
+            best_score INTEGER NOT NULL,
+            total_score INTEGER NOT NULL,
+            last_tested TEXT NOT NULL,
+            PRIMARY KEY (day, model_id, problem_id)
+        )''')
+
+        conn.execute('''CREATE TABLE IF NOT EXISTS model_leaderboard (
+            model_id TEXT NOT NULL,
+            problem_key TEXT NOT NULL,
+            model_name TEXT NOT NULL,
+            runs INTEGER NOT NULL,
+            correct_runs INTEGER NOT NULL,
+            total_response_time REAL NOT NULL,
+            min_response_time REAL NOT NULL,
+            max_response_time REAL NOT NULL,
+            total_tokens INTEGER NOT NULL,
+            best_score INTEGER NOT NULL,
+            total_score INTEGER NOT NULL,
+            last_tested TEXT NOT NULL,
+            PRIMARY KEY (model_id, problem_key)
+        )''')
+        if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM model_leaderboard)").fetchone()[0]:
+            self._rebuild_leaderboard(conn)
+
+        conn.execute('''CREATE TABLE IF NOT EXISTS global_problem (
+            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            problem_text TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            last_updated TEXT,
+            version INTEGER NOT NULL DEFAULT 1
+        )''')
+        if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(global_problem)")}:
+            conn.execute("ALTER TABLE global_problem ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+        conn.execute('''CREATE TABLE IF NOT EXISTS problem_suites (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            updated_at TEXT NOT NULL
+        )''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS suite_problems (
+            suite_id INTEGER NOT NULL REFERENCES problem_suites (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            problem_id INTEGER NOT NULL REFERENCES problems (id),
+            PRIMARY KEY (suite_id, position)
+        )''')
+        return bool(legacy_columns)
+
+    def _migrate_legacy_results(self, conn, legacy_columns, batch_size=1000):
+        """Move prompts into problems and response texts into response_blobs, then drop the old columns."""
+        expected = "expected_answer" if "expected_answer" in legacy_columns else "NULL"
+        while True:
+            rows = conn.execute(f'''SELECT id, prompt, {expected}, response_text FROM results
+                WHERE problem_id IS NULL ORDER BY id LIMIT ?''', (batch_size,)).fetchall()
+            if not rows:
+                break
+            problem_ids = self._problem_ids(conn, {(prompt, answer) for _, prompt, answer, _ in rows})
+            blobs = {}
+            updates = []
+            for result_id, prompt, answer, text in rows:
+                blob = response_blob(text)
+                blobs[blob[0]] = blob
+                updates.append((problem_ids[problem_key(prompt, answer)], blob[0], result_id))
+            self._store_blobs(conn, blobs.values())
+            conn.executemany("UPDATE results SET problem_id = ?, response_hash = ? WHERE id = ?", updates)
+        conn.execute("DROP INDEX IF EXISTS idx_results_expected_answer")
+        for column in legacy_columns:
+            conn.execute(f"ALTER TABLE results DROP COLUMN {column}")
+
+    # --- Writes ---
+
+    def _rebuild_leaderboard(self, conn):
+        conn.execute("DELETE FROM model_leaderboard")
+        conn.execute(LEADERBOARD_REBUILD_SQL)
+
+    def rebuild_leaderboard(self):
+        self._write(self._rebuild_leaderboard)
+
+    def _problem_ids(self, conn, problems):
+        """Return {problem_key: id} for (prompt, expected_answer) pairs, inserting new problems."""
+        wanted = {problem_key(prompt, answer): (prompt, answer) for prompt, answer in problems}
+        ids = {key: self.problem_ids[key] for key in wanted if key in self.problem_ids}
+        missing = [(key,) + wanted[key] for key in wanted if key not in ids]
+        if missing:
+            conn.executemany("INSERT INTO problems (problem_key, prompt, expected_answer) VALUES (?, ?, ?) "
+                             "ON CONFLICT (problem_key) DO NOTHING", missing)
+            keys = [m[0] for m in missing]
+            ids.update(conn.execute(f"SELECT problem_key, id FROM problems WHERE problem_key IN "
+                                    f"({', '.join(['?'] * len(keys))})", keys))
+        return ids
+
+    def _store_blobs(self, conn, blobs):
+        conn.executemany("INSERT INTO response_blobs (hash, body, length) VALUES (?, ?, ?) "
+                         "ON CONFLICT (hash) DO NOTHING", blobs)
+
+    def _insert_results(self, conn, results):
+        problem_ids = self._problem_ids(conn, _result_problems(results))
+        rows, blobs = _result_rows(results, problem_ids)
+        self._store_blobs(conn, blobs)
+        conn.executemany(INSERT_RESULT_SQL, rows)
+        conn.executemany(LEADERBOARD_UPSERT_SQL, _leaderboard_deltas(results))
+        return problem_ids
+
+    def save_result(self, result):
+        try:
+            self.problem_ids.update(self._write(self._insert_results, [result]))
+        except sqlite3.Error as e:
+            print(f"Error saving result: {e}")
+
+    def save_results_batch(self, results, page_size=500):
+        # One transaction on the writer thread; page_size only matters for PostgreSQL
+        if results:
+            self.problem_ids.update(self._write(self._insert_results, results))
+
+    def delete_results(self, model_id_prefix):
+        def _delete(conn):
+            deleted = conn.execute("DELETE FROM results WHERE substr(model_id, 1, ?) = ?",
+                                   (len(model_id_prefix), model_id_prefix)).rowcount
+            conn.execute("DELETE FROM results_daily WHERE substr(model_id, 1, ?) = ?",
+                         (len(model_id_prefix), model_id_prefix))
+            self._prune_blobs(conn)
+            self._rebuild_leaderboard(conn)
+            return deleted
+        return self._write(_delete)
+
+    def update_grades(self, grades):
+        self._write(lambda conn: conn.executemany(
+            "UPDATE results SET is_correct = ?, answer_found = ?, score = ?, problem_id = ? WHERE id = ?",
+            [(g["is_correct"], g["answer_found"], g["score"], g["problem_id"], g["id"]) for g in grades]))
+
+    def problem_id(self, prompt, expected_answer):
+        problem_ids = self._write(self._problem_ids, [(prompt, expected_answer)])
+        self.problem_ids.update(problem_ids)
+        return problem_ids[problem_key(prompt, expected_answer)]
+
+    def _prune_blobs(self, conn):
+        return conn.execute("DELETE FROM response_blobs WHERE NOT EXISTS "
+                            "(SELECT 1 FROM results r WHERE r.response_hash = response_blobs.hash)").rowcount
+
+    def maintain_partitions(self):
+        # SQLite tables are not partitioned
+        return []
+
+    def apply_retention(self, days):
+        def _expire(conn):
+            cutoff = conn.execute("SELECT date('now', ?)", (f"-{int(days)} days",)).fetchone()[0]
+            conn.execute(ROLLUP_UPSERT_SQL, (cutoff,))
+            deleted = conn.execute("DELETE FROM results WHERE timestamp < ?", (cutoff,)).rowcount
+            return {"rolled_up": deleted, "deleted": deleted, "dropped_partitions": [],
+                    "pruned_blobs": self._prune_blobs(conn)}
+        return self._write(_expire)
+
+    def save_global_problem(self, problem_text, correct_answer):
+        try:
+            version = self._write(lambda conn: conn.execute(f'''INSERT INTO global_problem (id, problem_text, correct_answer, last_updated)
+                VALUES (1, ?, ?, {NOW_SQL})
+                ON CONFLICT (id) DO UPDATE
+                SET problem_text = excluded.problem_text,
+                    correct_answer = excluded.correct_answer,
+                    last_updated = excluded.last_updated,
+                    version = global_problem.version + 1
+                RETURNING version''', (problem_text, correct_answer)).fetchone()[0])
+            print(f"Global problem saved: {problem_text[:50]}... Answer: {correct_answer}")
+            return version
+        except sqlite3.Error as e:
+            print(f"Error saving global problem: {e}")
+            return None
+
+    def save_suite(self, name, problems):
+        def _save(conn):
+            problem_ids = self._problem_ids(conn, problems)
+            suite_id = conn.execute(f'''INSERT INTO problem_suites (name, updated_at) VALUES (?, {NOW_SQL})
+                ON CONFLICT (name) DO UPDATE SET updated_at = excluded.updated_at
+                RETURNING id''', (name,)).fetchone()[0]
+            conn.execute("DELETE FROM suite_problems WHERE suite_id = ?", (suite_id,))
+            conn.executemany("INSERT INTO suite_problems (suite_id, position, problem_id) VALUES (?, ?, ?)",
+                             _suite_rows(suite_id, problems, problem_ids))
+            return problem_ids
+        self.problem_ids.update(self._write(_save))
+
+    # --- Reads ---
+
+    def _select(self, sql, params=()):
+        cursor = self._reader().execute(sql, params)
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _result_dicts(self, rows):
+        for row in rows:
+            row["timestamp"] = _parse_timestamp(row["timestamp"])
+            for column in BOOLEAN_COLUMNS:
+                if row[column] is not None:
+                    row[column] = bool(row[column])
+        return rows
+
+    def get_all_results(self):
+        try:
+            rows = self._select(f'''SELECT {", ".join(FULL_RESULT_SELECT_COLUMNS)}
+                FROM {FULL_RESULT_FROM} ORDER BY r.timestamp DESC''')
+            return [_full_result(row) for row in self._result_dicts(rows)]
+        except sqlite3.Error as e:
+            print(f"Error fetching results: {e}")
+            return []
+
+    def get_result(self, result_id):
+        try:
+            rows = self._select(f'''SELECT {", ".join(FULL_RESULT_SELECT_COLUMNS)}
+                FROM {FULL_RESULT_FROM} WHERE r.id = ?''', (result_id,))
+        except sqlite3.Error as e:
+            print(f"Error fetching result {result_id}: {e}")
+            return None
+        return _full_result(self._result_dicts(rows)[0]) if rows else None
+
+    def get_results_page(self, limit, cursor_position, model_id, since, until, correct_only, trial_group_id=None):
+        try:
+            return self._result_dicts(self._select_page(
+                RESULT_SELECT_COLUMNS, RESULT_FROM, limit, cursor_position, model_id, since, until, correct_only,
+                trial_group_id=trial_group_id))
+        except sqlite3.Error as e:
+            print(f"Error fetching results page: {e}")
+            return []
+
+    def iter_results(self, model_id, since, until, correct_only, include_response, chunk_size, problem_id=None,
+                     trial_group_id=None):
+        # SQLite has no server-side cursors; successive keyset pages keep each read
+        # short instead of pinning one snapshot for the whole export
+        columns = FULL_RESULT_SELECT_COLUMNS if include_response else RESULT_SELECT_COLUMNS
+        source = FULL_RESULT_FROM if include_response else RESULT_FROM
+        position = None
+        while True:
+            chunk = self._select_page(columns, source, chunk_size, position, model_id, since, until, correct_only,
+                                      problem_id=problem_id, trial_group_id=trial_group_id)
+            if not chunk:
+                return
+            last = chunk[-1]
+            position = (last["timestamp"], last["id"])
+            chunk = self._result_dicts(chunk)
+            yield [_full_result(row) for row in chunk] if include_response else chunk
+
+    def _select_page(self, columns, source, limit, cursor_position, model_id, since, until, correct_only,
+                     problem_id=None, trial_group_id=None):
+        conditions, params = _result_filters(model_id, since, until, correct_only, placeholder="?",
+                                             timestamp=format_timestamp, problem_id=problem_id,
+                                             trial_group_id=trial_group_id)
+        if cursor_position:
+            timestamp, result_id = cursor_position
+            conditions.append("(r.timestamp, r.id) < (?, ?)")
+            params.extend((timestamp if isinstance(timestamp, str) else format_timestamp(timestamp), result_id))
+        return self._select(f'''SELECT {", ".join(columns)}
+            FROM {source} {_where(conditions)}
+            ORDER BY r.timestamp DESC, r.id DESC
+            LIMIT ?''', params + [limit])
+
+    def get_leaderboard(self, problem_key=None):
+        where = "WHERE problem_key = ?" if problem_key else ""
+        try:
+            rows = self._select(f'''SELECT model_id, MAX(model_name) AS model_name, {LEADERBOARD_SUMS}
+                FROM model_leaderboard {where}
+                GROUP BY model_id''', [problem_key] if problem_key else [])
+        except sqlite3.Error as e:
+            print(f"Error fetching leaderboard: {e}")
+            return []
+        for row in rows:
+            row["last_tested"] = _parse_timestamp(row["last_tested"])
+        return _leaderboard_entries(rows)
+
+    def get_daily_results(self, since, until, model_id):
+        raw_conditions, daily_conditions, raw_params, daily_params = [], [], [], []
+        first_day, last_day = _day_bounds(since, until)
+        if since:
+            raw_conditions.append("timestamp >= ?")
+            raw_params.append(format_timestamp(since))
+            daily_conditions.append("day >= ?")
+            daily_params.append(first_day.isoformat())
+        if until:
+            raw_conditions.append("timestamp < ?")
+            raw_params.append(format_timestamp(until))
+            daily_conditions.append("day < ?")
+            daily_params.append(last_day.isoformat())
+        if model_id:
+            raw_conditions.append("model_id = ?")
+            raw_params.append(model_id)
+            daily_conditions.append("model_id = ?")
+            daily_params.append(model_id)
+        raw_where = f"WHERE {' AND '.join(raw_conditions)}" if raw_conditions else ""
+        daily_where = f"WHERE {' AND '.join(daily_conditions)}" if daily_conditions else ""
+        try:
+            rows = self._select(f'''SELECT day, model_id, MAX(model_name) AS model_name, {LEADERBOARD_SUMS}
+                FROM (
+                    SELECT substr(timestamp, 1, 10) AS day, model_id, {RAW_RUN_SUMS}
+                    FROM results {raw_where} GROUP BY substr(timestamp, 1, 10), model_id
+                    UNION ALL
+                    SELECT day, model_id, {", ".join(ROLLUP_COLUMNS)} FROM results_daily {daily_where}
+                ) AS daily
+                GROUP BY day, model_id
+                ORDER BY day DESC, model_id''', raw_params + daily_params)
+        except sqlite3.Error as e:
+            print(f"Error fetching daily results: {e}")
+            return []
+        for row in rows:
+            row["last_tested"] = _parse_timestamp(row["last_tested"])
+        return _daily_entries(rows)
+
+    def count_results(self):
+        return self._reader().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get_suite(self, name):
+        row = self._reader().execute("SELECT id FROM problem_suites WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        return self._select(SUITE_PROBLEMS_SQL.format(placeholder="?"), (row[0],))
+
+    def list_suites(self):
+        suites = self._select(SUITE_LIST_SQL)
+        for suite in suites:
+            suite["updated_at"] = _parse_timestamp(suite["updated_at"])
+        return suites
+
+    def get_global_problem(self):
+        problem_data = None
+        try:
+            row = self._reader().execute(
+                "SELECT problem_text, correct_answer, version FROM global_problem WHERE id = 1").fetchone()
+            if row:
+                problem_data = {
+                    "problem_text": row[0],
+                    "correct_answer": row[1],
+                    "version": row[2]
+                }
+                print(f"Global problem retrieved: {problem_data['problem_text'][:50]}...")
+        except sqlite3.Error as e:
+            print(f"Error fetching global problem: {e}")
+        return problem_data
+
+    def watch_global_problem(self, on_change, stop):
+        # SQLite has no change notifications; reading one row of a local file is cheap
+        # enough to poll for them
+        last_version = None
+        while not stop.wait(self.poll_interval) and not self.closed:
+            try:
+                row = self._reader().execute("SELECT version FROM global_problem WHERE id = 1").fetchone()
+            except sqlite3.Error as e:
+                print(f"Error polling global problem version: {e}")
+                continue
+            version = row[0] if row else None
+            if row and version != last_version:
+                on_change(version)
+            last_version = version
@@ -0,0 +1,10 @@
+"""
+Server-sent event serialization shared by the streaming routes.
+"""
+
+import json
+
+
+def sse_event(event_type, data):
+    """Serialize one server-sent event in the {"type", "data"} envelope used by /api/test-all."""
+    return f"data: {json.dumps({'type': event_type, 'data': data})}\n\n"
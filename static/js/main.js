@@ -31,6 +31,11 @@ document.addEventListener('DOMContentLoaded', function() {
 
     let sortState = { column: 'score', direction: 'desc' }; // Initial sort state
 
+    // Paging through saved results
+    const RESULTS_PAGE_SIZE = 100;
+    const loadMoreResultsBtn = document.getElementById('load-more-results');
+    let resultsCursor = null; // next_cursor from the last page, null when all are loaded
+
     // Load models when the page loads
     loadModels();
     loadInitialResults(); // Load existing results
@@ -48,19 +53,46 @@ document.addEventListener('DOMContentLoaded', function() {
     testSingleModelBtn.addEventListener('click', testSelectedModel);
     testAllModelsBtn.addEventListener('click', testAllModels);
     clearResultsBtn.addEventListener('click', clearResults);
+    loadMoreResultsBtn.addEventListener('click', loadResultsPage);
     closeButton.addEventListener('click', closeModal);
     window.addEventListener('click', outsideModalClick); // Close modal if clicked outside
 
     // Function to load models
+    // The last list and its ETag are kept in localStorage; the server answers
+    // 304 Not Modified when the list is unchanged and the cached copy is reused.
     function loadModels() {
         showLoading();
 
-        fetch('/api/models')
+        let cachedModels = null;
+        try {
+            cachedModels = JSON.parse(localStorage.getItem('modelsCache'));
+        } catch (e) {
+            cachedModels = null;
+        }
+        const headers = {};
+        if (cachedModels && cachedModels.etag) {
+            headers['If-None-Match'] = cachedModels.etag;
+        }
+
+        fetch('/api/models', { headers: headers, cache: 'no-store' })
             .then(response => {
+                if (response.status === 304 && cachedModels) {
+                    return cachedModels.data;
+                }
                 if (!response.ok) {
                     throw new Error('Failed to fetch models');
                 }
-                return response.json();
+                const etag = response.headers.get('ETag');
+                return response.json().then(data => {
+                    if (etag) {
+                        try {
+                            localStorage.setItem('modelsCache', JSON.stringify({ etag: etag, data: data }));
+                        } catch (e) {
+                            console.warn('Could not cache models list:', e);
+                        }
+                    }
+                    return data;
+                });
             })
             .then(data => {
                 // Clear existing options
@@ -182,8 +214,10 @@ document.addEventListener('DOMContentLoaded', function() {
         testAllModelsBtn.disabled = true;
 
         // Use EventSource for server-sent events
-        const eventSource = new EventSource('/api/test-all');
+        // stream=1 measures time-to-first-token/tokens-per-second and relays partial output
+        const eventSource = new EventSource('/api/test-all?stream=1');
         let totalModelsToTest = 0; // Variable to store total models
+        const partialOutput = {}; // Streamed text received so far, by model ID
 
         eventSource.onmessage = function(event) {
             const parsedData = JSON.parse(event.data);
@@ -199,9 +233,24 @@ document.addEventListener('DOMContentLoaded', function() {
                 const percent = (progressData.current_model_count / progressData.total_models) * 100;
                 progressBar.style.width = percent + '%';
                 progressText.textContent = `Testing models: ${progressData.current_model_count}/${progressData.total_models}`;
-                currentModelText.textContent = `Currently testing: ${progressData.testing_model_name}`;
+                // Parallel sweeps report progress as models finish, in completion order
+                currentModelText.textContent = progressData.completed_model_name
+                    ? `Last completed: ${progressData.completed_model_name}`
+                    : `Currently testing: ${progressData.testing_model_name}`;
+
+            } else if (parsedData.type === 'partial') {
+                // Show the tail of the text a model is currently generating
+                const partialData = parsedData.data;
+                partialOutput[partialData.model_id] = (partialOutput[partialData.model_id] || '') + partialData.text;
+                const tail = partialOutput[partialData.model_id].slice(-80).replace(/\s+/g, ' ');
+                currentModelText.textContent = `${partialData.model_name}: …${tail}`;
+
+            } else if (parsedData.type === 'skipped') {
+                // Model skipped because its circuit breaker is open
+                console.info('Skipped model:', parsedData.data.model_name, parsedData.data.reason);
 
             } else if (parsedData.type === 'result') {
+                delete partialOutput[parsedData.data.model_id];
                 addResultToTable(parsedData.data);
                 noResultsMessage.style.display = 'none';
 
@@ -345,16 +394,32 @@ document.addEventListener('DOMContentLoaded', function() {
             viewBtn.addEventListener('click', (event) => {
                 event.stopPropagation(); // Prevent triggering other clicks
                 console.log("View button clicked for model:", result?.model_name); // Log click
-                const responseText = result?.response_text ?? 'No response text available.';
-                console.log("Opening modal with text:", responseText.substring(0, 100) + "..."); // Log text being sent to modal
-                const modalText = responseText.trim() ? responseText : 'No response text available.';
-                openModal(modalText);
+                showResponse(result);
             });
         } else {
             console.error("Could not find view button for row:", row); // Log if button isn't found
         }
     }
 
+    async function showResponse(result) {
+        // Saved results are listed without their response text; fetch it on first view
+        if (result.response_text === undefined && result.id !== undefined) {
+            try {
+                const response = await fetch(`/api/results/${result.id}`);
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                result.response_text = (await response.json()).response_text;
+            } catch (error) {
+                console.error('Error loading response text:', error);
+            }
+        }
+        const responseText = result?.response_text ?? 'No response text available.';
+        console.log("Opening modal with text:", responseText.substring(0, 100) + "..."); // Log text being sent to modal
+        const modalText = responseText.trim() ? responseText : 'No response text available.';
+        openModal(modalText);
+    }
+
     function updateSortIndicators() {
         document.querySelectorAll('#results-table th.sortable-header').forEach(th => {
             th.classList.remove('sort-asc', 'sort-desc');
@@ -438,19 +503,33 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Function to load initial results from the database
+    // Results are fetched a page at a time (newest first); "Load More Results"
+    // follows the server's next_cursor through the older history.
     async function loadInitialResults() {
+        resultsCursor = null;
+        await loadResultsPage();
+    }
+
+    async function loadResultsPage() {
         showLoading();
+        loadMoreResultsBtn.disabled = true;
         try {
-            const response = await fetch('/api/results');
+            const params = new URLSearchParams({ limit: RESULTS_PAGE_SIZE });
+            if (resultsCursor) {
+                params.set('cursor', resultsCursor);
+            }
+            const response = await fetch(`/api/results?${params}`);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            const results = await response.json();
+            const page = await response.json();
+            const results = page.results;
 
             if (results && results.length > 0) {
                 results.forEach(result => {
                     // Transform the result object to match what addResultToTable expects
                     const transformedResult = {
+                        id: result.id,
                         model_name: result.model_name,
                         correct: result.is_correct, // Map is_correct from DB to correct
                         response_time: result.response_time,
@@ -460,22 +539,26 @@ document.addEventListener('DOMContentLoaded', function() {
                         },
                         answer: result.answer_found, // Map answer_found from DB to answer
                         score: result.score,
-                        response_text: result.response_text,
                         timestamp: result.timestamp // Pass timestamp if available
                     };
                     addResultToTable(transformedResult);
                 });
                 noResultsMessage.style.display = 'none';
-                sortTable('score', 'number', 'desc'); // Default sort after loading initial results
-            } else {
+                sortTable(sortState.column, sortState.column === 'model_name' ? 'string' : 'number', sortState.direction); // Keep the current sort
+            } else if (!resultsCursor) {
                 noResultsMessage.style.display = 'block'; // Ensure it's visible if no results
             }
+            resultsCursor = page.next_cursor;
+            loadMoreResultsBtn.classList.toggle('hidden', !resultsCursor);
         } catch (error) {
             console.error('Error loading initial results:', error);
             // Optionally, display a user-friendly error message on the page
             // For example: document.getElementById('error-message-area').textContent = 'Could not load previous results.';
-            noResultsMessage.style.display = 'block'; // Ensure it's visible on error
+            if (!resultsBody.children.length) {
+                noResultsMessage.style.display = 'block'; // Ensure it's visible on error
+            }
         } finally {
+            loadMoreResultsBtn.disabled = false;
             hideLoading();
         }
     }
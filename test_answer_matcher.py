@@ -0,0 +1,75 @@
+import pytest
+
+from answer_matcher import evaluate, evaluate_many, matcher_for, parse_number
+from benchmark import long_response
+
+
+@pytest.mark.parametrize("response, expected, found", [
+    ("The answer is 12.", "12", "12"),
+    ("So xy = 12.0", "12", "12.0"),
+    ("Final answer: \\boxed{12}", "12", "12"),
+    ("The height is 12 cm", "12", "12"),
+    ("xy = 24/2", "12", "24/2"),
+    ("Das Ergebnis ist 2,4", "2.4", "2,4"),
+    ("It comes to 2.40", "2.4", "2.40"),
+    ("$\\frac{12}{5}$", "2.4", "12/5"),
+    ("About 1,200 people", "1200", "1,200"),
+    ("About 1200 people", "1,200", "1200"),
+    ("x = 0.5", "1/2", "0.5"),
+    ("x = \\dfrac{1}{2}", "1/2", "1/2"),
+    ("It is 12.", "12 cm", "12"),
+    ("x = −3", "-3", "-3"),
+    ("Values 13, 21 and 112", "21", "21"),
+    ("values 4,12 and 7", "12", "12"),
+    ("x = 3,12", "12", "12"),
+    ("So f(x) = 2x+3.", "2x+3", "2x+3"),
+    ("The area is 9 m^2", "9 m^2", "9"),
+    ("The capital is Paris.", "paris", "Paris"),
+])
+def test_matches(response, expected, found):
+    assert evaluate(response, expected) == (True, found)
+
+
+@pytest.mark.parametrize("response, expected", [
+    ("Note 1.2 and 112", "12"),
+    ("It is 12.5", "12"),
+    ("It is -12", "12"),
+    ("It is 12,000", "12"),
+    ("x2 + y2", "2"),
+    ("12/5", "12"),
+    ("Parisian", "paris"),
+    ("About 1,200 people", "200"),
+    ("f(x) = 2x + 5", "2x+3"),
+    ("The derivative is 3x^3", "3x^2"),
+    ("2^3 = 8", "2^4"),
+])
+def test_rejects(response, expected):
+    assert evaluate(response, expected) == (False, None)
+
+
+def test_parse_number():
+    assert parse_number("12") == 12
+    assert parse_number("\\boxed{7}") == 7
+    assert parse_number("3.14") * 100 == 314
+    assert parse_number("45°") == 45
+    assert parse_number("12 and 13") is None
+    assert parse_number("x = 3") is None
+    assert parse_number("50%") == 50 and parse_number("12 cm^2") == 12
+    for algebraic in ("2x+3", "3x^2", "2^3", "1e3", "2x"):
+        assert parse_number(algebraic) is None
+
+
+def test_matchers_are_cached():
+    assert matcher_for("12") is matcher_for("12")
+    assert matcher_for("12").numeric and not matcher_for("Paris").numeric
+
+
+def test_non_string_input():
+    assert evaluate(None, "12") == (False, None)
+    assert evaluate("12", None) == (False, None)
+
+
+def test_evaluate_many():
+    responses = [long_response("12"), long_response("10"), "\\boxed{12}", None]
+    assert evaluate_many(responses, "12") == [(True, "12"), (False, None), (True, "12"), (False, None)]
+    assert evaluate_many(["2,4", "Paris"], ["2.4", "paris"]) == [(True, "2,4"), (True, "Paris")]
@@ -0,0 +1,91 @@
+import asyncio
+
+from aiohttp import web
+
+from async_openrouter_client import AsyncOpenRouterClient
+from circuit_breaker import is_failure
+
+
+def test_test_many_bounds_concurrency():
+    """test_many never has more than `concurrency` requests in flight and yields every model"""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def models(request):
+        return web.json_response({"data": [
+            {"id": "a/free", "pricing": {"prompt": "0", "completion": "0"}},
+            {"id": "b/paid", "pricing": {"prompt": "0.001", "completion": "0.002"}},
+        ]})
+
+    async def completions(request):
+        body = await request.json()
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        # Later models answer faster, so completion order differs from request order
+        await asyncio.sleep(0.05 / (1 + int(body["model"].split("-")[1])))
+        state["in_flight"] -= 1
+        return web.json_response({
+            "choices": [{"message": {"content": "So xy = 12."}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        })
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/models", models)
+        app.router.add_post("/chat/completions", completions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        async with AsyncOpenRouterClient("test-key") as client:
+            client.base_url = f"http://127.0.0.1:{port}"
+            free_models = await client.get_free_models()
+            model_ids = [f"model-{i}" for i in range(10)]
+            results = [r async for r in client.test_many(model_ids, "What is xy?", concurrency=3, expected_answer="12")]
+
+        await runner.cleanup()
+        return free_models, results
+
+    free_models, results = asyncio.run(scenario())
+
+    assert [m["id"] for m in free_models] == ["a/free"]
+    assert sorted(r["model_id"] for r in results) == sorted(f"model-{i}" for i in range(10))
+    assert all(r["is_correct"] and r["total_tokens"] == 15 for r in results)
+    assert state["peak"] <= 3
+
+
+def test_error_results_match_the_sync_client():
+    """HTTP errors carry error_type and status_code, so they feed circuit breakers like sync results"""
+    async def completions(request):
+        body = await request.json()
+        status = int(body["model"].split("-")[1])
+        return web.json_response({"error": {"code": status}}, status=status)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/chat/completions", completions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        async with AsyncOpenRouterClient("test-key") as client:
+            client.base_url = f"http://127.0.0.1:{port}"
+            results = {model_id: await client.send_math_problem(model_id, "What is xy?")
+                       for model_id in ("status-502", "status-401", "status-429")}
+            client.base_url = "http://127.0.0.1:1"
+            results["unreachable"] = await client.send_math_problem("unreachable", "What is xy?")
+
+        await runner.cleanup()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results["status-502"]["error_type"] == "http_error" and results["status-502"]["status_code"] == 502
+    assert results["status-401"]["error_type"] == "http_error" and results["status-401"]["status_code"] == 401
+    assert results["status-429"]["error_type"] == "rate_limited"
+    assert results["unreachable"]["error_type"] == "network_error"
+    assert is_failure(results["status-502"]) and is_failure(results["unreachable"])
+    assert not is_failure(results["status-401"]) and not is_failure(results["status-429"])
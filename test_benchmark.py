@@ -0,0 +1,29 @@
+import benchmark
+from scoring import calculate_score
+
+
+def test_compare_flags_regressions_and_improvements():
+    baseline = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}, "c": {"median": 1.0}, "old": {"median": 1.0}}}
+    current = {"results": {"a": {"median": 1.5}, "b": {"median": 0.5}, "c": {"median": 1.05}, "new": {"median": 1.0}}}
+    rows = {name: verdict for name, _, _, _, verdict in benchmark.compare(baseline, current, threshold=0.1)}
+    assert rows == {"a": "slower", "b": "faster", "c": "same"}
+
+
+def test_measure_and_core_benchmarks_run():
+    stats = benchmark.measure(lambda: None, repeat=2, min_time=0.01)
+    assert stats["repeat"] == 2 and stats["min"] <= stats["median"] <= stats["max"]
+    benchmarks = benchmark.core_benchmarks()
+    assert benchmarks["evaluate_response/long_correct"]() == (True, "12")
+    assert benchmarks["evaluate_response/long_incorrect"]()[0] is False
+    assert sum(correct for correct, _ in benchmarks["evaluate_many/1000_long"]()) == 500
+    assert benchmarks["sse_event/result"]().startswith('data: {"type": "result"')
+    assert len(benchmarks["get_free_models/new_catalog"]()) == 134
+
+
+def test_calculate_score_tiers():
+    assert calculate_score(True, 0.5, 50) == 100
+    assert calculate_score(False, 10, 1000) == 0
+    assert calculate_score(True, 10, 150, time_to_first_token=0.8, tokens_per_second=60) == 70 + 8 + 8 + 8
+    # Unknown token usage skips the token tier; zero tokens (error rows) still score it
+    assert calculate_score(True, 2, None) == round((70 + 15) * 100 / 90)
+    assert calculate_score(False, 10, 0) == 10
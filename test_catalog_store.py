@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from catalog_store import load_snapshot
+from openrouter_client import OpenRouterClient
+
+
+def test_catalog_snapshot_is_served_stale_and_revalidated(tmp_path):
+    server = Flask("catalog_openrouter")
+    seen_validators = []
+
+    @server.get("/models")
+    def models():
+        seen_validators.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return "", 304
+        return jsonify({"data": [{"id": "a/free"}]}), 200, {"ETag": '"v1"'}
+
+    http_server = make_server("127.0.0.1", 0, server, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    path = str(tmp_path / "catalog.json")
+    base_url = f"http://127.0.0.1:{http_server.server_port}"
+    try:
+        # Cold start: nothing on disk, so the first call downloads and persists the catalog
+        client = OpenRouterClient("key", catalog_path=path)
+        client.base_url = base_url
+        assert [m["id"] for m in client.get_models()] == ["a/free"]
+        assert load_snapshot(path)["etag"] == '"v1"'
+
+        # A new process loads the snapshot without any request
+        restarted = OpenRouterClient("key", catalog_path=path)
+        restarted.base_url = base_url
+        assert restarted.models_cache == [{"id": "a/free"}]
+
+        # Once expired it is still served immediately and revalidated in the background
+        restarted.models_cache_time = datetime.now() - timedelta(hours=1)
+        assert [m["id"] for m in restarted.get_models()] == ["a/free"]
+        for _ in range(50):
+            if len(seen_validators) == 2 and not restarted._refresh_lock.locked():
+                break
+            time.sleep(0.02)
+    finally:
+        http_server.shutdown()
+
+    assert seen_validators == [None, '"v1"']
+    assert datetime.now() - restarted.models_cache_time < timedelta(minutes=1)
+    assert os.path.exists(path)
@@ -0,0 +1,73 @@
+import time
+
+import app as app_module
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakerRegistry
+from model_catalog import CatalogIndex
+
+TIMEOUT = {"error": "timeout", "error_type": "timeout"}
+OK = {"response_text": "12"}
+
+
+def test_breaker_opens_probes_and_recovers():
+    registry = CircuitBreakerRegistry(failure_threshold=2, recovery_seconds=0.1)
+    registry.record("m", TIMEOUT)
+    assert registry.state("m") == CLOSED
+    registry.record("m", TIMEOUT)
+    assert registry.state("m") == OPEN
+    assert not registry.get("m").allow_request()
+
+    time.sleep(0.15)
+    breaker = registry.get("m")
+    assert breaker.allow_request()          # the single probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()      # no second probe while the first is in flight
+
+    registry.record("m", OK)
+    assert registry.state("m") == CLOSED
+    assert registry.snapshot() == {}
+
+
+def test_failed_probe_doubles_cool_down_and_client_errors_do_not_count():
+    registry = CircuitBreakerRegistry(failure_threshold=1, recovery_seconds=0.1)
+    registry.record("m", TIMEOUT)
+    time.sleep(0.15)
+    assert registry.get("m").allow_request()
+    registry.record("m", {"error": "HTTP 502", "error_type": "http_error", "status_code": 502})
+    assert registry.state("m") == OPEN
+    assert registry.get("m").recovery_seconds == 0.2
+
+    for result in ({"error_type": "rate_limited"}, {"error_type": "http_error", "status_code": 401}):
+        registry.record("other", result)
+    assert registry.state("other") == CLOSED
+
+    # A client error neither closes an open circuit nor resets its failure count
+    time.sleep(0.25)
+    breaker = registry.get("m")
+    assert breaker.allow_request()
+    registry.record("m", {"error": "HTTP 401", "error_type": "http_error", "status_code": 401})
+    assert registry.state("m") == HALF_OPEN and breaker.consecutive_failures > 0
+    assert not breaker.probe_in_flight
+
+
+def test_half_open_transition_changes_the_models_etag(monkeypatch):
+    registry = CircuitBreakerRegistry(failure_threshold=1, recovery_seconds=0.1)
+    monkeypatch.setattr(app_module.client, "circuit_breakers", registry)
+    monkeypatch.setattr(app_module.client, "get_catalog_index", lambda: CatalogIndex(
+        [{"id": "a/m:free", "name": "M", "pricing": {"prompt": "0", "completion": "0"}}]))
+    http = app_module.app.test_client()
+
+    registry.record("a/m:free", TIMEOUT)
+    opened = http.get("/api/models")
+    assert opened.get_json()["models"][0]["circuit_state"] == OPEN
+
+    time.sleep(0.15)
+    version = registry.version
+    assert registry.allow_request("a/m:free")
+    assert registry.version == version + 1
+    revalidated = http.get("/api/models", headers={"If-None-Match": opened.headers["ETag"]})
+    assert revalidated.status_code == 200
+    assert revalidated.get_json()["models"][0]["circuit_state"] == HALF_OPEN
+
+    # Refusing a second probe changes nothing
+    assert not registry.allow_request("a/m:free")
+    assert registry.version == version + 1
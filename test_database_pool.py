@@ -0,0 +1,117 @@
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import pytest
+
+import database
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.executed.append(sql)
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection; the pool only needs these attributes."""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+        self.rollbacks = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    @property
+    def info(self):
+        return self
+
+    @property
+    def transaction_status(self):
+        return self.status
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(dsn):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(database.psycopg2, "connect", connect)
+    return opened
+
+
+def test_connections_are_reused_and_rolled_back(connections):
+    pool = database.ConnectionPool("dsn", minconn=1, maxconn=2, ping_after=60)
+    with pool.connection() as conn:
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    with pool.connection() as again:
+        assert again is conn
+    assert len(connections) == 1
+    assert conn.rollbacks == 1
+    stats = pool.stats()
+    assert stats["checkouts"] == 2 and stats["size"] == 1 and stats["idle"] == 1 and stats["in_use"] == 0
+
+
+def test_waits_for_a_free_connection_and_times_out(connections):
+    pool = database.ConnectionPool("dsn", minconn=0, maxconn=1, timeout=0.1)
+    with pool.connection():
+        with pytest.raises(psycopg2.pool.PoolError):
+            with pool.connection():
+                pass
+    assert pool.stats()["timeouts"] == 1
+
+    pool.timeout = 2
+    release = threading.Event()
+
+    def _hold():
+        with pool.connection():
+            release.wait()
+
+    holder = threading.Thread(target=_hold)
+    holder.start()
+    time.sleep(0.05)
+    threading.Timer(0.1, release.set).start()
+    with pool.connection():
+        pass
+    holder.join()
+    stats = pool.stats()
+    assert stats["waits"] == 2 and stats["wait_seconds"] > 0.05 and stats["size"] == 1
+
+
+def test_stale_connections_are_replaced(connections):
+    pool = database.ConnectionPool("dsn", minconn=1, maxconn=2, ping_after=0)
+    with pool.connection() as first:
+        pass
+    first.broken = True
+    with pool.connection() as second:
+        assert second is not first
+    assert first.closed
+    assert pool.stats()["health_check_failures"] == 1
+    assert pool.stats()["size"] == 1
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from export import check_format, export_columns, stream_export
+
+
+def make_row(i):
+    return {
+        "id": i, "model_id": "test/model", "model_name": "Test Model", "problem_id": 1,
+        "prompt": "What is xy?", "expected_answer": "12", "is_correct": i % 2 == 0,
+        "answer_found": "12", "response_time": 1.5, "prompt_tokens": 10, "completion_tokens": 20,
+        "total_tokens": 30, "score": 80, "timestamp": datetime(2025, 1, 2, 3, 4, 5),
+        "time_to_first_token": None, "inter_token_latency": None, "tokens_per_second": None,
+        "cached": False, "response_text": f"answer {i}"
+    }
+
+
+CHUNKS = [[make_row(3), make_row(2)], [make_row(1)]]
+
+
+def test_check_format():
+    check_format("csv")
+    with pytest.raises(ValueError):
+        check_format("xlsx")
+
+
+def test_csv_streams_one_piece_per_chunk():
+    pieces = list(stream_export(iter(CHUNKS), "csv"))
+    assert len(pieces) == 2
+    rows = list(csv.DictReader(io.StringIO(b"".join(pieces).decode("utf-8"))))
+    assert [row["id"] for row in rows] == ["3", "2", "1"]
+    assert rows[0]["timestamp"] == "2025-01-02T03:04:05" and rows[0]["time_to_first_token"] == ""
+    assert "response_text" not in rows[0]
+
+
+def test_empty_csv_has_header():
+    assert b"".join(stream_export(iter([]), "csv")).decode("utf-8").strip() == ",".join(
+        name for name, _ in export_columns())
+
+
+def test_jsonl_with_response_text():
+    lines = b"".join(stream_export(iter(CHUNKS), "jsonl", include_response=True)).decode("utf-8").splitlines()
+    assert [json.loads(line)["response_text"] for line in lines] == ["answer 3", "answer 2", "answer 1"]
+    assert json.loads(lines[0])["is_correct"] is False
+
+
+def test_parquet_and_arrow_round_trip():
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(pa.BufferReader(b"".join(stream_export(iter(CHUNKS), "parquet"))))
+    assert table.num_rows == 3 and table.column("id").to_pylist() == [3, 2, 1]
+    assert table.schema.field("timestamp").type == pa.timestamp("ms")
+
+    reader = pa.ipc.open_stream(b"".join(stream_export(iter(CHUNKS), "arrow", include_response=True)))
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [2, 1]
+    assert batches[1].column("response_text").to_pylist() == ["answer 1"]
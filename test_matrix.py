@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from collections import Counter
+
+import app as app_module
+import database
+from matrix import MatrixScheduler, interleave, run_matrix
+
+MODELS = [("a", "A"), ("b", "B"), ("c", "C")]
+PROBLEMS = [{"prompt": f"p{i}", "expected_answer": str(i)} for i in range(4)]
+
+
+def test_interleave_rotates_models():
+    cells = interleave(MODELS, PROBLEMS)
+    assert len(cells) == 12
+    assert [c.model_id for c in cells[:6]] == ["a", "b", "c", "b", "c", "a"]
+    assert Counter(c.model_id for c in cells) == {"a": 4, "b": 4, "c": 4}
+    # Consecutive cells never hit the same model twice in a row
+    assert all(x.model_id != y.model_id for x, y in zip(cells, cells[1:]))
+
+
+def test_scheduler_caps_calls_per_model():
+    scheduler = MatrixScheduler(interleave([("a", "A"), ("b", "B")], PROBLEMS), per_model=1)
+    first, second = scheduler.take(), scheduler.take()
+    assert {first.model_id, second.model_id} == {"a", "b"}
+    taken = []
+    thread = threading.Thread(target=lambda: taken.append(scheduler.take()))
+    thread.start()
+    thread.join(0.05)
+    assert thread.is_alive()  # Both models are saturated
+    scheduler.done(first)
+    thread.join(1)
+    assert taken[0].model_id == first.model_id
+    scheduler.cancel()
+    assert scheduler.take() is None
+
+
+def test_run_matrix_streams_cells_and_rollups():
+    in_flight = Counter()
+    peak = Counter()
+    lock = threading.Lock()
+
+    def run_cell(cell):
+        with lock:
+            in_flight[cell.model_id] += 1
+            peak[cell.model_id] = max(peak[cell.model_id], in_flight[cell.model_id])
+        time.sleep(0.02)
+        with lock:
+            in_flight[cell.model_id] -= 1
+        if cell.model_id == "c" and cell.problem_index == 0:
+            raise RuntimeError("timeout")
+        return "result", {"correct": cell.problem_index % 2 == 0, "response_time": 1.0, "score": 50}
+
+    started = time.monotonic()
+    events = list(run_matrix(MODELS, PROBLEMS, run_cell, workers=6, per_model=2))
+    # 12 cells of 20ms on 6 workers, not one after another
+    assert time.monotonic() - started < 0.2
+    assert max(peak.values()) <= 2
+
+    kinds = Counter(kind for kind, _ in events)
+    assert kinds == {"cell": 12, "model": 3, "complete": 1}
+    assert events[-1][0] == "complete"
+    summary = {entry["model_id"]: entry for entry in events[-1][1]["models"]}
+    assert summary["a"]["correct"] == 2 and summary["a"]["accuracy"] == 0.5
+    assert summary["c"]["errors"] == 1 and summary["c"]["accuracy"] == round(1 / 3, 4)
+    errors = [data for kind, data in events if kind == "cell" and data["status"] == "error"]
+    assert errors == [{"model_id": "c", "model_name": "C", "problem_index": 0, "status": "error",
+                       "message": "timeout", "completed_cells": errors[0]["completed_cells"], "total_cells": 12}]
+
+
+def test_matrix_endpoint(monkeypatch):
+    monkeypatch.setattr(database, "get_suite", lambda name: PROBLEMS[:2] if name == "basics" else None)
+    monkeypatch.setattr(app_module.client, "get_model", lambda model_id: {"name": model_id.upper()})
+    monkeypatch.setattr(app_module, "run_model_test", lambda model_id, model_name, prompt, answer, **kwargs: (
+        {"model_id": model_id, "correct": True, "response_time": 0.5, "score": 90}, {}))
+    client = app_module.app.test_client()
+
+    assert client.get("/api/matrix?suite=missing").status_code == 404
+    response = client.get("/api/matrix?suite=basics&models=x,y&no_cache=1")
+    events = [json.loads(line[len("data: "):]) for line in response.get_data(as_text=True).splitlines()
+              if line.startswith("data: ")]
+    assert events[0] == {"type": "total", "data": {"suite": "basics", "total_models": 2, "total_problems": 2,
+                                                   "total_cells": 4}}
+    assert Counter(event["type"] for event in events) == {"total": 1, "cell": 4, "model": 2, "complete": 1}
+    assert [entry["model_name"] for entry in events[-1]["data"]["models"]] == ["X", "Y"]
@@ -0,0 +1,33 @@
+from metrics import Registry, percentile
+
+
+def test_render_uses_prometheus_text_format():
+    registry = Registry()
+    requests_total = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("model",), buckets=(0.1, 1))
+    in_flight = registry.gauge("in_flight", "In flight.")
+
+    requests_total.inc(route='/api/"test"')
+    requests_total.inc(2, route='/api/"test"')
+    latency.observe(0.05, model="a")
+    latency.observe(0.5, model="a")
+    latency.observe(5, model="a")
+    with in_flight.track_in_progress():
+        assert "in_flight 1" in registry.render()
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/api/\\"test\\""} 3' in text
+    assert 'latency_seconds_bucket{model="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{model="a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{model="a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{model="a"} 3' in text
+    assert 'latency_seconds_sum{model="a"} 5.55' in text
+    assert "in_flight 0" in text
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([0, 10], 95) == 9.5
+    assert percentile([5], 99) == 5
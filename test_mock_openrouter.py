@@ -0,0 +1,281 @@
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import requests
+from werkzeug.serving import make_server
+
+import app as app_module
+import database
+import loadtest
+from mock_openrouter import DEFAULT_ANSWER, MockConfig, create_mock_app
+from openrouter_client import OpenRouterClient
+from rate_limiter import RateLimiter
+from sqlite_backend import SQLiteBackend
+
+
+@contextmanager
+def serve(app):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def make_client(base_url, tmp_path):
+    client = OpenRouterClient("mock-key", response_cache=None, catalog_path=str(tmp_path / "catalog.json"),
+                              rate_limiter=RateLimiter(key_rate=1000, key_burst=1000, model_rate=1000, model_burst=1000))
+    client.base_url = f"{base_url}/api/v1"
+    return client
+
+
+def test_client_against_mock(tmp_path):
+    config = MockConfig(models=3, dead_models=1, latency="fixed:0.01", correct_rate=1.0, chunk_delay=0, seed=1)
+    with serve(create_mock_app(config)) as base_url:
+        client = make_client(base_url, tmp_path)
+        free_ids = [model["id"] for model in client.get_free_models()]
+        assert free_ids == ["mock/model-0:free", "mock/model-1:free", "mock/model-2:free", "mock/dead-0:free"]
+
+        result = client.send_math_problem("mock/model-0:free", "x?", use_cache=False)
+        assert "error" not in result
+        assert client.evaluate_response(result["response_text"], "12")[0]
+
+        deltas = []
+        streamed = client.send_math_problem("mock/model-1:free", "x?", stream=True, on_delta=deltas.append,
+                                            use_cache=False)
+        assert "".join(deltas) == streamed["response_text"] == result["response_text"]
+        assert streamed["time_to_first_token"] is not None
+        assert streamed["completion_tokens"] > 0
+
+        # Without usage in the stream, token counts and throughput stay unknown
+        requests_post = client.session.post
+        client.session.post = lambda url, json, **kwargs: requests_post(
+            url, json={k: v for k, v in json.items() if k != "stream_options"}, **kwargs)
+        no_usage = client.send_math_problem("mock/model-2:free", "x?", stream=True, use_cache=False)
+        client.session.post = requests_post
+        assert no_usage["total_tokens"] is None and no_usage["tokens_per_second"] is None
+        assert no_usage["time_to_first_token"] is not None
+
+        dead = client.send_math_problem("mock/dead-0:free", "x?", use_cache=False)
+        assert dead["error_type"] == "http_error" and dead["status_code"] == 502
+        client.close()
+
+
+def test_streams_hold_their_concurrency_slot_until_read(tmp_path):
+    config = MockConfig(models=1, dead_models=1, latency="fixed:0", chunk_delay=0, seed=1)
+    with serve(create_mock_app(config)) as base_url:
+        client = make_client(base_url, tmp_path)
+
+        def in_flight():
+            return sum(key["in_flight"] for key in client.rate_limiter.stats()["keys"].values())
+
+        during = []
+        client.send_math_problem("mock/model-0:free", "x?", stream=True, on_delta=lambda _: during.append(in_flight()),
+                                 use_cache=False)
+        assert during and set(during) == {1}
+        assert in_flight() == 0
+        client.send_math_problem("mock/dead-0:free", "x?", stream=True, use_cache=False)
+        assert in_flight() == 0
+        client.close()
+
+
+def test_warm_up_connections_are_reused(tmp_path):
+    with serve(create_mock_app(MockConfig(models=1, latency="fixed:0", chunk_delay=0))) as base_url:
+        client = make_client(base_url, tmp_path)
+        assert client.warm_up(2) == 2
+        warmed = client.connection_stats()
+        assert warmed["connections_opened"] == 2 and warmed["requests"] == 2
+        assert warmed["pool_maxsize"] == client.pool_maxsize
+
+        result = client.send_math_problem("mock/model-0:free", "x?", use_cache=False)
+        assert "error" not in result
+        stats = client.connection_stats()
+        assert stats["connections_opened"] == 2
+        assert stats["requests"] == 3 and stats["connections_reused"] == 1
+        client.close()
+
+
+def test_rate_limit_injection(tmp_path):
+    config = MockConfig(models=1, latency="fixed:0", rate_limit_rate=1.0, retry_after=0)
+    with serve(create_mock_app(config)) as base_url:
+        client = make_client(base_url, tmp_path)
+        client.max_rate_limit_retries = 1
+        result = client.send_math_problem("mock/model-0:free", "x?", use_cache=False)
+        assert result["error_type"] == "rate_limited"
+        client.close()
+
+
+def test_sample_math_problem_uses_n_and_falls_back(tmp_path):
+    config = MockConfig(models=1, latency="fixed:0", correct_rate=0.5, seed=3)
+    with serve(create_mock_app(config)) as base_url:
+        client = make_client(base_url, tmp_path)
+        samples = client.sample_math_problem("mock/model-0:free", "x?", 8)
+        assert len(samples) == 8
+        assert len({sample["response_text"] for sample in samples}) == 2  # Independent answers
+        assert len({sample["response_time_seconds"] for sample in samples}) == 1
+        assert all(sample["total_tokens"] == sample["prompt_tokens"] + sample["completion_tokens"]
+                   for sample in samples)
+        assert "mock/model-0:free" not in client.single_sample_models
+
+        config.multi_sample = False
+        assert len(client.sample_math_problem("mock/model-0:free", "x?", 8)) == 1
+        assert "mock/model-0:free" in client.single_sample_models
+        client.close()
+
+
+def test_models_etag():
+    with serve(create_mock_app(MockConfig(models=2))) as base_url:
+        first = requests.get(f"{base_url}/api/v1/models")
+        assert len(first.json()["data"]) == 3
+        second = requests.get(f"{base_url}/api/v1/models", headers={"If-None-Match": first.headers["ETag"]})
+        assert second.status_code == 304
+
+
+def test_loadtest_against_the_app(monkeypatch, tmp_path):
+    """Runs the real loadtest scenarios against the Flask app (SQLite backend) backed by the mock."""
+    backend = database.set_backend(SQLiteBackend(str(tmp_path / "results.db")))
+    database.init_db()
+    config = MockConfig(models=3, latency="fixed:0.01", correct_rate=1.0, chunk_delay=0, seed=1)
+    try:
+        with serve(create_mock_app(config)) as mock_url, serve(app_module.app) as app_url:
+            client = make_client(mock_url, tmp_path)
+            monkeypatch.setattr(app_module, "client", client)
+            monkeypatch.setattr(app_module, "result_writer", None)
+            args = loadtest.build_parser().parse_args(["--limit", "2", "--workers", "2"])
+            test = loadtest.run_scenario("test", app_url, concurrency=4, total_requests=20, args=args)
+            sweep = loadtest.run_scenario("test-all", app_url, concurrency=2, total_requests=2, args=args)
+            results = loadtest.run_scenario("results", app_url, concurrency=4, total_requests=20, args=args)
+            client.close()
+        saved, _ = database.get_results_page(limit=100)
+    finally:
+        backend.close()
+        database.set_backend(None)
+
+    for summary, count in ((test, 20), (sweep, 2), (results, 20)):
+        assert summary["requests"] == count
+        assert summary["error_rate"] == 0
+        assert summary["statuses"] == {"200": count}
+        assert summary["p50_seconds"] <= summary["p99_seconds"]
+    # Every /api/test call and both models of each sweep were saved
+    assert len(saved) == 24 and all(result["is_correct"] for result in saved)
+
+
+def sweep_client(monkeypatch, base_url, tmp_path):
+    """Point the app at the mock and count the completions it sends; results are collected, not saved."""
+    client = make_client(base_url, tmp_path)
+    monkeypatch.setattr(app_module, "client", client)
+    monkeypatch.setattr(app_module, "result_writer", None)
+    saved = []
+    monkeypatch.setattr(app_module.database, "save_result", saved.append)
+    state = {"calls": 0, "in_flight": 0, "peak": 0}
+    lock = threading.Lock()
+    send_math_problem = client.send_math_problem
+
+    def counting_send(*args, **kwargs):
+        with lock:
+            state["calls"] += 1
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            return send_math_problem(*args, **kwargs)
+        finally:
+            with lock:
+                state["in_flight"] -= 1
+
+    client.send_math_problem = counting_send
+    return client, state, saved
+
+
+def sse_events(chunks):
+    events = []
+    for line in b"".join(chunks).decode("utf-8").splitlines():
+        if line.startswith("data: "):
+            events.append(json.loads(line[len("data: "):]))
+    return events
+
+
+def test_test_all_streams_results_in_completion_order(monkeypatch, tmp_path):
+    latencies = {"mock/model-0:free": "fixed:0.6", "mock/model-1:free": "fixed:0.05",
+                 "mock/model-2:free": "fixed:0.4", "mock/model-3:free": "fixed:0.2"}
+    config = MockConfig(models=4, dead_models=1, latency="fixed:0", model_latency=latencies, correct_rate=1.0,
+                        chunk_delay=0, seed=1)
+    with serve(create_mock_app(config)) as base_url:
+        client, state, saved = sweep_client(monkeypatch, base_url, tmp_path)
+        response = app_module.app.test_client().get("/api/test-all?workers=5&no_cache=1")
+        events = sse_events([response.get_data()])
+        client.close()
+
+    assert events[0] == {"type": "total", "data": {"total_models": 5}}
+    assert events[-1]["type"] == "complete"
+    # Fastest first, not in catalog order
+    finished = [event["data"]["model_id"] for event in events if event["type"] == "result"]
+    assert finished == ["mock/model-1:free", "mock/model-3:free", "mock/model-2:free", "mock/model-0:free"]
+    errors = [event["data"] for event in events if event["type"] == "error"]
+    assert [error["model_name"] for error in errors] == ["Mock Dead Model 0"]
+    progress = [event["data"] for event in events if event["type"] == "progress"]
+    assert [data["current_model_count"] for data in progress] == [1, 2, 3, 4, 5]
+    assert all(data["total_models"] == 5 for data in progress)
+    # Each model's progress event comes right before its result
+    for i, event in enumerate(events):
+        if event["type"] == "result":
+            assert events[i - 1]["data"]["completed_model_name"] == event["data"]["model_name"]
+    assert all(event["data"]["correct"] for event in events if event["type"] == "result")
+    assert state["peak"] == 5 and len(saved) == 4
+
+
+def test_test_all_caps_workers(monkeypatch, tmp_path):
+    config = MockConfig(models=6, latency="fixed:0.1", chunk_delay=0, seed=1)
+    with serve(create_mock_app(config)) as base_url:
+        client, state, saved = sweep_client(monkeypatch, base_url, tmp_path)
+        response = app_module.app.test_client().get("/api/test-all?workers=2&no_cache=1")
+        events = sse_events([response.get_data()])
+        client.close()
+
+    assert Counter(event["type"] for event in events) == {"total": 1, "progress": 6, "result": 6, "complete": 1}
+    assert state["calls"] == 6 and state["peak"] == 2
+
+
+def test_test_all_merges_partial_text(monkeypatch, tmp_path):
+    config = MockConfig(models=3, latency="fixed:0", correct_rate=1.0, chunk_delay=0.01, seed=1)
+    with serve(create_mock_app(config)) as base_url:
+        client, _, _ = sweep_client(monkeypatch, base_url, tmp_path)
+        response = app_module.app.test_client().get("/api/test-all?workers=3&stream=1&no_cache=1")
+        events = sse_events([response.get_data()])
+        client.close()
+
+    text = {}
+    for event in events:
+        data = event["data"]
+        if event["type"] == "partial":
+            assert data["model_id"] not in [e["data"]["model_id"] for e in events[:events.index(event)]
+                                            if e["type"] == "result"]
+            text[data["model_id"]] = text.get(data["model_id"], "") + data["text"]
+        elif event["type"] == "result":
+            assert data["time_to_first_token"] is not None
+    assert text == {f"mock/model-{i}:free": DEFAULT_ANSWER for i in range(3)}
+
+
+def test_test_all_cancels_queued_models_on_disconnect(monkeypatch, tmp_path):
+    config = MockConfig(models=8, latency="fixed:0.2", chunk_delay=0, seed=1)
+    with serve(create_mock_app(config)) as base_url:
+        client, state, saved = sweep_client(monkeypatch, base_url, tmp_path)
+        response = app_module.app.test_client().get("/api/test-all?workers=2&no_cache=1", buffered=False)
+        chunks = []
+        for chunk in response.response:
+            chunks.append(chunk)
+            if any(event["type"] == "result" for event in sse_events(chunks)):
+                break
+        response.close()
+        # Long enough for the whole sweep (8 models, 2 at a time) had it kept going
+        time.sleep(1.0)
+        client.close()
+
+    # The two models running at the first result, plus the one that took the free worker
+    assert state["calls"] <= 4 and len(saved) == state["calls"]
+    assert state["in_flight"] == 0
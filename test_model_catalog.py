@@ -0,0 +1,28 @@
+from model_catalog import CatalogIndex
+
+FREE = {"prompt": "0", "completion": "0"}
+PAID = {"prompt": "0.000001", "completion": "0.000002"}
+
+MODELS = [
+    {"id": "google/gemma-7b-it:free", "name": "Gemma", "context_length": 8192, "pricing": FREE},
+    {"id": "openai/gpt-4o", "name": "GPT-4o", "context_length": 128000, "pricing": PAID},
+    {"id": "meta-llama/llama-3-8b:free", "name": "Llama", "context_length": 8192, "pricing": FREE},
+    {"id": "google/gemini-flash:free", "name": "Gemini", "context_length": 1000000, "pricing": FREE},
+]
+
+
+def test_index_lookups_and_filters_keep_catalog_order():
+    index = CatalogIndex(MODELS)
+
+    assert index.get("openai/gpt-4o")["name"] == "GPT-4o"
+    assert index.get("missing") is None
+    assert [m["name"] for m in index.free_models] == ["Gemma", "Llama", "Gemini"]
+    assert [m["name"] for m in index.query(provider="Google")] == ["Gemma", "Gemini"]
+    assert [m["name"] for m in index.query(min_context=100000)] == ["Gemini"]
+    assert [m["name"] for m in index.query(min_context=100000, free_only=False)] == ["GPT-4o", "Gemini"]
+    assert [m["name"] for m in index.query(limit=2)] == ["Gemma", "Llama"]
+
+
+def test_etag_changes_only_with_catalog_content():
+    assert CatalogIndex(MODELS).etag == CatalogIndex([dict(m) for m in MODELS]).etag
+    assert CatalogIndex(MODELS).etag != CatalogIndex(MODELS[:3]).etag
@@ -0,0 +1,71 @@
+import time
+
+from problem_cache import ProblemCache
+from sqlite_backend import SQLiteBackend
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def make_cache(backend, loads=None):
+    def load():
+        if loads is not None:
+            loads.append(1)
+        return backend.get_global_problem()
+    return ProblemCache("default?", "1", load=load, save=backend.save_global_problem,
+                        watch=backend.watch_global_problem)
+
+
+def test_update_reaches_other_workers(tmp_path):
+    # Two backends on one file stand in for two worker processes
+    path = str(tmp_path / "results.db")
+    first, second = SQLiteBackend(path, poll_interval=0.01), SQLiteBackend(path, poll_interval=0.01)
+    first.init_db()
+    loads = []
+    writer_cache = make_cache(first).start()
+    reader_cache = make_cache(second, loads).start()
+    try:
+        assert writer_cache.get() == ("default?", "1", 1) == reader_cache.get()
+
+        problem = writer_cache.set("2 + 2?", "4")
+        assert problem == ("2 + 2?", "4", 2) == writer_cache.get()
+        assert wait_for(lambda: reader_cache.get() == ("2 + 2?", "4", 2))
+
+        # Serving the problem never touches the database
+        loads.clear()
+        for _ in range(1000):
+            reader_cache.get()
+        assert loads == []
+    finally:
+        writer_cache.close()
+        reader_cache.close()
+        first.close()
+        second.close()
+
+
+def test_stale_and_missed_notifications():
+    stored = {"problem_text": "p1", "correct_answer": "a1", "version": 3}
+    loads = []
+
+    def load():
+        loads.append(1)
+        return dict(stored)
+
+    cache = ProblemCache("default?", "1", load=load, save=lambda text, answer: None,
+                         watch=lambda on_change, stop: stop.wait())
+    assert cache.reload() and cache.get() == ("p1", "a1", 3)
+
+    cache._on_change(3)  # Already current: no reload
+    assert len(loads) == 1
+    stored.update(problem_text="p2", version=4)
+    cache._on_change(None)  # Possibly missed changes: reload
+    assert cache.get() == ("p2", "a1", 4)
+
+    # A failed save is still served locally
+    assert cache.set("p3", "a3") == ("p3", "a3", 4)
@@ -0,0 +1,76 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+from openrouter_client import OpenRouterClient
+from rate_limiter import AdaptiveConcurrencyLimiter, RateLimiter, parse_reset, parse_retry_after
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(format_datetime(now + timedelta(seconds=30), usegmt=True), now=now) == 30.0
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after(None) is None
+
+
+def test_parse_reset_accepts_epoch_millis_seconds_and_delta():
+    assert parse_reset(str((1700000000 + 12) * 1000), now=1700000000) == 12
+    assert parse_reset("2000000000", now=1999999990) == 10
+    assert parse_reset("4") == 4
+
+
+def test_aimd_halves_on_throttle_and_grows_on_success():
+    limiter = AdaptiveConcurrencyLimiter(initial=8, maximum=16)
+    assert limiter.acquire(timeout=0)
+    limiter.release(throttled=True)
+    assert int(limiter.limit) == 4
+    for _ in range(20):
+        limiter.acquire(timeout=0)
+        limiter.release(success=True)
+    assert 4 < limiter.limit <= 16
+
+
+def test_429_blocks_model_and_gives_up_past_max_wait():
+    limiter = RateLimiter(model_rate=0, key_rate=0, max_wait=0.5)
+    assert limiter.acquire("key", "model-a")
+    limiter.release("key", "model-a", 429, {"Retry-After": "5"})
+    # model-a is blocked for 5 s, other models are unaffected
+    assert not limiter.acquire("key", "model-a")
+    assert limiter.acquire("key", "model-b")
+    limiter.release("key", "model-b", 200, {})
+    assert "model-a" in limiter.stats()["blocked_models"]
+
+
+def test_client_retries_after_retry_after():
+    server = Flask("rate_limited_openrouter")
+    calls = []
+
+    @server.post("/chat/completions")
+    def completions():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return jsonify({"error": {"message": "Rate limit exceeded"}}), 429, {"Retry-After": "1"}
+        return jsonify({
+            "choices": [{"message": {"content": "xy = 12"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 4, "total_tokens": 7}
+        })
+
+    http_server = make_server("127.0.0.1", 0, server, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    try:
+        client = OpenRouterClient("key", rate_limiter=RateLimiter(model_rate=0, key_rate=0, max_wait=5))
+        client.base_url = f"http://127.0.0.1:{http_server.server_port}"
+        result = client.send_math_problem("model-a", "What is xy?")
+    finally:
+        http_server.shutdown()
+
+    assert "error" not in result
+    assert result["total_tokens"] == 7
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.9
+    # The Retry-After wait is not counted as model latency
+    assert result["response_time_seconds"] < 0.9
@@ -0,0 +1,90 @@
+import pytest
+
+import database
+import regrade
+from scoring import calculate_score
+from sqlite_backend import SQLiteBackend
+
+
+def make_result(i, text, expected="12", correct=False):
+    return {
+        "model_id": f"test/model-{i % 2}",
+        "model_name": f"Model {i % 2}",
+        "prompt": "What is xy?",
+        "response_text": text,
+        "is_correct": correct,
+        "answer_found": "12" if correct else "Incorrect",
+        "response_time": 2.0,
+        "prompt_tokens": 10,
+        "completion_tokens": 20,
+        "total_tokens": 30,
+        "score": calculate_score(correct, 2.0, 30),
+        "expected_answer": expected
+    }
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = database.set_backend(SQLiteBackend(str(tmp_path / "results.db")))
+    database.init_db()
+    # Graded by the old whole-word matcher: "12.0" and "\boxed{12}" were missed, "12.5" counted
+    database.save_results_batch([
+        make_result(0, "xy = 12.0"),
+        make_result(1, "\\boxed{12}"),
+        make_result(2, "xy = 12.5", correct=True),
+        make_result(3, "xy = 13")
+    ])
+    yield backend
+    database.set_backend(None)
+
+
+def grades():
+    return {r["id"]: (r["is_correct"], r["answer_found"], r["score"])
+            for r in database.get_all_results()}
+
+
+def test_dry_run_reports_without_writing(backend):
+    before = grades()
+    changes = []
+    summary = regrade.regrade(dry_run=True, workers=1, chunk_size=2, on_change=changes.append)
+    assert summary["scanned"] == 4 and summary["changed"] == 3 and summary["written"] == 0
+    assert summary["became_correct"] == 2 and summary["became_incorrect"] == 1
+    assert {c["after"]["answer_found"] for c in changes} == {"12.0", "12", "Incorrect"}
+    assert grades() == before
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_regrade_writes_changes_and_rebuilds_leaderboard(backend, workers):
+    summary = regrade.regrade(workers=workers, chunk_size=3)
+    assert summary["written"] == 3
+    by_text = {r["response_text"]: r for r in database.get_all_results()}
+    assert by_text["xy = 12.0"]["is_correct"] and by_text["xy = 12.0"]["score"] > 70
+    assert not by_text["xy = 12.5"]["is_correct"] and by_text["xy = 12.5"]["answer_found"] == "Incorrect"
+    assert sum(m["correct_runs"] for m in database.get_leaderboard()) == 2
+    # A second pass finds nothing left to fix
+    assert regrade.regrade(workers=1)["changed"] == 0
+
+
+def test_expected_answer_correction(backend):
+    problem_id = database.get_results_page()[0][0]["problem_id"]
+    summary = regrade.regrade(problem_id=problem_id, expected_answer="13", workers=1)
+    assert summary["scanned"] == 4 and summary["written"] == 4
+    results = database.get_all_results()
+    assert {r["expected_answer"] for r in results} == {"13"}
+    assert [r["response_text"] for r in results if r["is_correct"]] == ["xy = 13"]
+    key = database.problem_key("What is xy?", "13")
+    assert sum(m["runs"] for m in database.get_leaderboard(problem_key=key)) == 4
+
+    with pytest.raises(ValueError):
+        regrade.regrade(expected_answer="13")
+    with pytest.raises(ValueError):
+        regrade.regrade(problem_id=999, expected_answer="13")
+
+
+def test_grade_chunk_keeps_unknown_stream_usage_unknown():
+    error = dict(make_result(0, "Request timed out", correct=False), id=1, timestamp=None, problem_id=1,
+                 total_tokens=0, score=calculate_score(False, 2.0, 0))
+    stream = dict(make_result(1, "xy = 12", correct=True), id=2, timestamp=None, problem_id=1, total_tokens=0,
+                  time_to_first_token=0.5, tokens_per_second=None, score=calculate_score(True, 2.0, None))
+    # Neither grade changes: the error row keeps its token tier, the stream stays rescaled
+    assert regrade.grade_chunk([error, stream]) == []
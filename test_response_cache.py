@@ -0,0 +1,60 @@
+import time
+
+from response_cache import ResponseCache, make_cache_key
+
+
+def test_key_depends_on_every_request_field():
+    base = make_cache_key("model-a", "system", "problem", {"stream": False})
+    assert base == make_cache_key("model-a", "system", "problem", {"stream": False})
+    assert base != make_cache_key("model-b", "system", "problem", {"stream": False})
+    assert base != make_cache_key("model-a", "system", "other problem", {"stream": False})
+    assert base != make_cache_key("model-a", "system", "problem", {"stream": True})
+
+
+def test_entries_persist_to_disk_and_expire(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path=path, ttl=0.5)
+    cache.set("k", {"response_text": "xy = 12", "total_tokens": 7})
+
+    # A fresh instance (e.g. after a restart) reads the entry back from disk
+    reopened = ResponseCache(path=path, ttl=0.5)
+    assert reopened.get("k") == {"response_text": "xy = 12", "total_tokens": 7}
+
+    time.sleep(0.6)
+    assert reopened.get("k") is None
+    assert reopened.stats()["misses"] == 1
+
+
+def test_lru_and_disk_size_limits(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.db"), max_memory_entries=2, max_disk_entries=3)
+    for i in range(5):
+        cache.set(f"k{i}", {"i": i})
+        time.sleep(0.01)
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2
+    assert stats["disk_entries"] == 3
+    assert cache.get("k0") is None
+    assert cache.get("k4") == {"i": 4}
+
+
+def test_hits_batch_their_disk_writes(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.db"), max_disk_entries=2, access_batch=2)
+    cache.set("k0", {"i": 0})
+    time.sleep(0.01)
+    cache.set("k1", {"i": 1})
+    time.sleep(0.01)
+
+    writes = cache.disk.total_changes
+    assert cache.get("k0") == {"i": 0}
+    assert cache.get("k0") == {"i": 0}
+    assert cache.disk.total_changes == writes
+    assert cache.get("k1") == {"i": 1}
+    assert cache.disk.total_changes == writes + 2
+
+    # Buffered hits still count for eviction: k0 was used after k1 was stored
+    cache.get("k0")
+    cache.set("k2", {"i": 2})
+    reopened = ResponseCache(path=cache.path)
+    assert reopened.get("k0") == {"i": 0}
+    assert reopened.get("k1") is None
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from result_writer import ResultWriter
+
+
+class Recorder:
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            if self.fail_times:
+                self.fail_times -= 1
+                raise RuntimeError("database is down")
+            self.batches.append(list(batch))
+
+
+def test_batches_by_size_and_flushes():
+    recorder = Recorder()
+    writer = ResultWriter(recorder, batch_size=10, flush_interval=5).start()
+    for i in range(25):
+        writer.submit({"model_id": i})
+    # Two full batches go out at once; the last five wait for the interval or close()
+    time.sleep(0.2)
+    assert [len(batch) for batch in recorder.batches] == [10, 10]
+    writer.close()
+    assert [len(batch) for batch in recorder.batches] == [10, 10, 5]
+    assert [result["model_id"] for batch in recorder.batches for result in batch] == list(range(25))
+    assert writer.stats()["written"] == 25 and writer.stats()["batches"] == 3
+
+
+def test_partial_batch_written_after_interval():
+    recorder = Recorder()
+    writer = ResultWriter(recorder, batch_size=100, flush_interval=0.05)
+    writer.submit({"model_id": "a"})
+    writer.submit({"model_id": "b"})
+    assert writer.flush(timeout=2)
+    assert recorder.batches == [[{"model_id": "a"}, {"model_id": "b"}]]
+    writer.close()
+
+
+def test_failures_are_retried_then_reported():
+    recorder = Recorder(fail_times=1)
+    writer = ResultWriter(recorder, batch_size=5, flush_interval=0.01, max_retries=1)
+    writer.submit({"model_id": "a"})
+    assert writer.flush(timeout=5)
+    assert writer.stats()["written"] == 1 and writer.stats()["failed"] == 0
+
+    recorder.fail_times = 2
+    writer.submit({"model_id": "b"})
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert stats["failed"] == 1
+    assert "database is down" in stats["last_error"]
+    writer.close()
+
+
+def test_full_queue_drops_after_timeout():
+    release = threading.Event()
+    writer = ResultWriter(lambda batch: release.wait(), queue_size=1, batch_size=1, flush_interval=0,
+                          submit_timeout=0.05)
+    writer.submit({"model_id": "in-flight"})
+    time.sleep(0.05)
+    assert writer.submit({"model_id": "queued"})
+    assert not writer.submit({"model_id": "dropped"})
+    assert writer.stats()["dropped"] == 1
+    release.set()
+    writer.close()
+    assert writer.stats()["written"] == 2
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from app import app
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    calls = []
+
+    def get_results_page(**kwargs):
+        calls.append(kwargs)
+        if kwargs["cursor"] == "bad":
+            raise ValueError("invalid cursor: 'bad'")
+        return [{"id": 2, "model_id": "m"}], database.encode_cursor(datetime(2025, 1, 2), 2)
+
+    monkeypatch.setattr(database, "get_results_page", get_results_page)
+    return calls
+
+
+def test_results_are_paginated(pages):
+    client = app.test_client()
+    response = client.get("/api/results?limit=5000&model_id=m&since=2025-01-01T00:00:00&correct=1&granularity=raw")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["granularity"] == "raw"
+    assert body["results"] == [{"id": 2, "model_id": "m"}]
+    assert database.decode_cursor(body["next_cursor"]) == (datetime(2025, 1, 2), 2)
+    assert pages[0] == {"limit": 1000, "cursor": None, "model_id": "m", "since": datetime(2025, 1, 1),
+                        "until": None, "correct_only": True, "trial_group_id": None}
+
+
+def test_bad_parameters_are_rejected(pages):
+    client = app.test_client()
+    assert client.get("/api/results?since=yesterday").status_code == 400
+    assert client.get("/api/results?cursor=bad").status_code == 400
+    assert client.get("/api/results?granularity=week").status_code == 400
+
+
+def test_long_ranges_read_daily_rollups(pages, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "RESULTS_RETENTION_DAYS", 30)
+    calls = []
+    monkeypatch.setattr(database, "get_daily_results",
+                        lambda **kwargs: calls.append(kwargs) or [{"day": "2025-01-01", "model_id": "m"}])
+    client = app.test_client()
+    recent = (datetime.now() - timedelta(days=1)).isoformat()
+    assert client.get(f"/api/results?since={recent}").get_json()["granularity"] == "raw"
+    body = client.get("/api/results?since=2020-01-01&model_id=m").get_json()
+    assert body == {"granularity": "day", "results": [{"day": "2025-01-01", "model_id": "m"}], "next_cursor": None}
+    assert calls == [{"since": datetime(2020, 1, 1), "until": None, "model_id": "m"}]
+
+
+def test_timestamps_with_offsets_become_naive_utc(pages, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "RESULTS_RETENTION_DAYS", 30)
+    monkeypatch.setattr(database, "get_daily_results", lambda **kwargs: [])
+    client = app.test_client()
+    response = client.get("/api/results?since=2020-01-01T00:00:00Z")
+    assert response.status_code == 200 and response.get_json()["granularity"] == "day"
+    client.get("/api/results?since=2025-01-01T02:00:00%2B02:00&granularity=raw")
+    assert pages[-1]["since"] == datetime(2025, 1, 1)
+
+
+def test_cursor_round_trip():
+    cursor = database.encode_cursor(datetime(2025, 3, 4, 5, 6, 7, 890), 17)
+    assert database.decode_cursor(cursor) == (datetime(2025, 3, 4, 5, 6, 7, 890), 17)
+    with pytest.raises(ValueError):
+        database.decode_cursor("not-a-cursor")
+
+
+def test_leaderboard_deltas_fold_results_per_model_and_problem():
+    def result(model_id, prompt, correct, response_time, tokens, score):
+        return {"model_id": model_id, "model_name": model_id.upper(), "prompt": prompt, "expected_answer": "12",
+                "is_correct": correct, "response_time": response_time, "total_tokens": tokens, "score": score}
+
+    rows = database._leaderboard_deltas([
+        result("a", "p1", True, 1.0, 100, 90),
+        result("a", "p1", False, 3.0, 300, 10),
+        result("a", "p2", True, 2.0, 200, 80),
+    ])
+    key1 = database.problem_key("p1", "12")
+    assert sorted(rows) == sorted([
+        ("a", key1, "A", 2, 1, 4.0, 1.0, 3.0, 400, 90, 100),
+        ("a", database.problem_key("p2", "12"), "A", 1, 1, 2.0, 2.0, 2.0, 200, 80, 80),
+    ])
+
+
+def test_leaderboard_endpoint_scopes_to_current_problem(monkeypatch):
+    import app as app_module
+    calls = []
+    monkeypatch.setattr(database, "get_leaderboard", lambda problem_key=None: calls.append(problem_key) or [])
+    client = app.test_client()
+    body = client.get("/api/leaderboard").get_json()
+    assert body["problem_key"] == database.problem_key(*app_module.problem_cache.get()[:2])
+    assert client.get("/api/leaderboard?problem=all").get_json()["problem_key"] is None
+    assert calls == [body["problem_key"], None]
+    assert client.get("/api/leaderboard?problem=x").status_code == 400
+
+
+def test_single_result_includes_response_text(monkeypatch):
+    monkeypatch.setattr(database, "get_result",
+                        lambda result_id: {"id": 7, "response_text": "xy = 12"} if result_id == 7 else None)
+    client = app.test_client()
+    assert client.get("/api/results/7").get_json() == {"id": 7, "response_text": "xy = 12"}
+    assert client.get("/api/results/8").status_code == 404
+
+
+def test_export_streams_chunks(monkeypatch):
+    calls = []
+
+    def iter_results(**kwargs):
+        calls.append(kwargs)
+        yield [{"id": 2, "model_id": "m", "timestamp": datetime(2025, 1, 2)}]
+        yield [{"id": 1, "model_id": "m", "timestamp": datetime(2025, 1, 1)}]
+
+    monkeypatch.setattr(database, "iter_results", iter_results)
+    client = app.test_client()
+    response = client.get("/api/results/export?format=jsonl&model_id=m&since=2025-01-01&correct=1")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"].startswith('attachment; filename="results-')
+    assert [line.split(",")[0] for line in response.get_data(as_text=True).splitlines()] == ['{"id": 2', '{"id": 1']
+    assert calls[0]["model_id"] == "m" and calls[0]["correct_only"] and not calls[0]["include_response"]
+    assert calls[0]["since"] == datetime(2025, 1, 1)
+    assert client.get("/api/results/export?format=xlsx").status_code == 400
+
+
+def test_response_blobs_round_trip():
+    digest, body, length = database.response_blob("x² = 25")
+    assert database.response_blob("x² = 25")[0] == digest
+    assert database.decompress_response(memoryview(body)) == "x² = 25"
+    assert length == len("x² = 25".encode("utf-8"))
@@ -0,0 +1,32 @@
+import retention
+
+
+def test_run_once_records_summary():
+    calls = []
+
+    def apply(days):
+        calls.append(days)
+        return {"rolled_up": 3, "deleted": 3, "dropped_partitions": [], "pruned_blobs": 1}
+
+    job = retention.RetentionJob(days=7, interval=3600, apply=apply)
+    assert job.run_once()["rolled_up"] == 3
+    assert calls == [7] and job.runs == 1 and job.last_summary["pruned_blobs"] == 1
+
+
+def test_failed_run_is_reported():
+    def apply(days):
+        raise RuntimeError("database unavailable")
+
+    job = retention.RetentionJob(days=7, apply=apply)
+    assert job.run_once() is None
+    assert job.last_error == "database unavailable" and job.runs == 0
+
+
+def test_lock_admits_one_run(tmp_path):
+    path = str(tmp_path / "retention.lock")
+    first = retention.acquire_lock(path)
+    assert first is not None
+    if retention.fcntl is not None:
+        assert retention.acquire_lock(path) is None
+    first.close()
+    retention.acquire_lock(path).close()
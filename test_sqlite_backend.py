@@ -0,0 +1,215 @@
+import gc
+import shutil
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from sqlite_backend import SQLiteBackend
+
+
+def make_result(i, model_id="test/model-a", correct=True, expected="12"):
+    return {
+        "model_id": model_id,
+        "model_name": model_id.upper(),
+        "prompt": "What is xy?",
+        "response_text": f"answer {i}",
+        "is_correct": correct,
+        "answer_found": "12" if correct else "Incorrect",
+        "response_time": 1.0 + i,
+        "prompt_tokens": 10,
+        "completion_tokens": 20,
+        "total_tokens": 30,
+        "score": 80 if correct else 10,
+        "expected_answer": expected
+    }
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = database.set_backend(SQLiteBackend(str(tmp_path / "results.db")))
+    database.init_db()
+    yield backend
+    database.set_backend(None)
+
+
+def test_wal_and_synchronous(backend):
+    conn = backend._reader()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+
+def test_reader_connections_close_with_their_threads(backend):
+    threads = [threading.Thread(target=database.count_results) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    gc.collect()
+    assert backend.pool_stats()["readers"] <= 1
+
+
+def test_save_and_page_results(backend):
+    database.save_result(make_result(0))
+    database.save_results_batch([make_result(i, correct=i % 2 == 0) for i in range(1, 6)])
+    assert database.count_results() == 6
+
+    first, cursor = database.get_results_page(limit=4)
+    assert [r["response_time"] for r in first] == [6.0, 5.0, 4.0, 3.0]
+    assert "response_text" not in first[0] and first[0]["prompt"] == "What is xy?"
+    assert isinstance(first[0]["timestamp"], datetime)
+    assert first[0]["is_correct"] is False and first[1]["cached"] is False
+    rest, cursor = database.get_results_page(limit=4, cursor=cursor)
+    assert [r["response_time"] for r in rest] == [2.0, 1.0]
+    assert cursor is None
+
+    correct, _ = database.get_results_page(correct_only=True)
+    assert len(correct) == 3
+    later, _ = database.get_results_page(since=datetime.utcnow() + timedelta(minutes=1))
+    assert later == []
+    assert sorted(r["response_text"] for r in database.get_all_results()) == [f"answer {i}" for i in range(6)]
+
+    full = database.get_result(first[0]["id"])
+    assert full["response_text"] == "answer 5" and full["expected_answer"] == "12"
+    assert database.get_result(10 ** 6) is None
+
+
+def test_iter_results_in_chunks(backend):
+    database.save_results_batch([make_result(i, correct=i % 2 == 0) for i in range(7)])
+    chunks = list(database.iter_results(chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [r["response_time"] for chunk in chunks for r in chunk] == [7.0, 6.0, 5.0, 4.0, 3.0, 2.0, 1.0]
+    assert "response_text" not in chunks[0][0] and isinstance(chunks[0][0]["timestamp"], datetime)
+
+    correct = [r for chunk in database.iter_results(correct_only=True, include_response=True, chunk_size=2)
+               for r in chunk]
+    assert [r["response_text"] for r in correct] == ["answer 6", "answer 4", "answer 2", "answer 0"]
+    assert list(database.iter_results(model_id="test/other")) == []
+
+
+def test_trial_group_filter(backend):
+    database.save_results_batch([dict(make_result(i), trial_group_id="g1" if i < 3 else None) for i in range(5)])
+    page, _ = database.get_results_page(trial_group_id="g1")
+    assert [r["trial_group_id"] for r in page] == ["g1"] * 3
+    assert sum(len(chunk) for chunk in database.iter_results(trial_group_id="g1")) == 3
+    assert database.get_results_page()[0][0]["trial_group_id"] is None
+
+
+def test_problems_and_responses_are_deduplicated(backend):
+    repeated = [make_result(0) for _ in range(3)] + [make_result(0, expected="7")]
+    database.save_results_batch(repeated)
+    database.save_result(make_result(0))
+    conn = backend._reader()
+    assert conn.execute("SELECT COUNT(*) FROM problems").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM response_blobs").fetchone()[0] == 1
+    body, length = conn.execute("SELECT body, length FROM response_blobs").fetchone()
+    assert database.decompress_response(body) == "answer 0" and length == 8
+
+
+def test_leaderboard_and_delete(backend):
+    database.save_results_batch([make_result(0), make_result(1, correct=False),
+                                 make_result(2, model_id="bench/x")])
+    database.save_result(make_result(3, expected="7"))
+    leaderboard = database.get_leaderboard()
+    entry = next(e for e in leaderboard if e["model_id"] == "test/model-a")
+    assert (entry["runs"], entry["correct_runs"]) == (3, 2)
+    assert entry["min_response_time"] == 1.0 and entry["max_response_time"] == 4.0
+    assert isinstance(entry["last_tested"], datetime)
+
+    key = database.problem_key("What is xy?", "12")
+    entry = next(e for e in database.get_leaderboard(problem_key=key) if e["model_id"] == "test/model-a")
+    assert entry["runs"] == 2
+
+    assert database.delete_results("bench/") == 1
+    assert [e["model_id"] for e in database.get_leaderboard()] == ["test/model-a"]
+    # The deleted result's response was its only reference
+    assert backend._reader().execute("SELECT COUNT(*) FROM response_blobs").fetchone()[0] == 3
+
+
+def test_problem_suites(backend):
+    database.save_result(make_result(0))
+    database.save_suite("basics", [("What is xy?", "12"), ("What is 2+2?", "4")])
+    assert [p["prompt"] for p in database.get_suite("basics")] == ["What is xy?", "What is 2+2?"]
+    # Problems are shared with results
+    assert database.get_suite("basics")[0]["problem_id"] == database.get_results_page()[0][0]["problem_id"]
+
+    database.save_suite("basics", [("What is 3+3?", "6")])
+    assert database.get_suite("basics") == [{"problem_id": 3, "prompt": "What is 3+3?", "expected_answer": "6"}]
+    assert database.get_suite("missing") is None
+    assert [(s["name"], s["problems"]) for s in database.list_suites()] == [("basics", 1)]
+    with pytest.raises(ValueError):
+        database.save_suite("empty", [])
+
+
+def test_global_problem(backend):
+    assert database.get_global_problem() is None
+    assert database.save_global_problem("first", "1") == 1
+    assert database.save_global_problem("second", "2") == 2
+    assert database.get_global_problem() == {"problem_text": "second", "correct_answer": "2", "version": 2}
+
+
+def test_batch_failure_rolls_back(backend):
+    bad = make_result(1)
+    del bad["score"]
+    with pytest.raises(KeyError):
+        database.save_results_batch([make_result(0), bad])
+    broken = make_result(2)
+    broken["model_name"] = None  # NOT NULL
+    with pytest.raises(sqlite3.IntegrityError):
+        database.save_results_batch([make_result(0), broken])
+    assert database.count_results() == 0
+    assert database.get_leaderboard() == []
+
+
+def test_migrates_original_results_db(tmp_path):
+    # results.db in the repository predates the expected answer, streaming and cache columns
+    path = tmp_path / "legacy.db"
+    shutil.copy("results.db", path)
+    legacy = sqlite3.connect(path)
+    legacy_rows = legacy.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    legacy_text = legacy.execute("SELECT response_text FROM results WHERE id = 1").fetchone()[0]
+    legacy.close()
+
+    backend = SQLiteBackend(str(path))
+    try:
+        backend.init_db()
+        results = backend.get_all_results()
+        assert len(results) == legacy_rows
+        assert results[0]["expected_answer"] is None and results[0]["cached"] is False
+        assert isinstance(results[0]["timestamp"], datetime)
+        assert sum(entry["runs"] for entry in backend.get_leaderboard()) == legacy_rows
+        assert backend.get_result(1)["response_text"] == legacy_text
+        columns = {row[1] for row in backend._reader().execute("PRAGMA table_info(results)")}
+        assert not columns & {"prompt", "response_text", "expected_answer"}
+        # Running again is a no-op
+        backend.init_db()
+        assert backend.count_results() == legacy_rows
+    finally:
+        backend.close()
+
+
+def test_retention_rolls_up_expired_results(backend):
+    database.save_results_batch([make_result(0), make_result(1, correct=False), make_result(2),
+                                 make_result(3, model_id="test/model-b")])
+    old = datetime.utcnow() - timedelta(days=40)
+    backend._write(lambda conn: conn.execute("UPDATE results SET timestamp = ? WHERE id IN (1, 2)",
+                                             (old.strftime("%Y-%m-%d %H:%M:%S.000"),)))
+    before = database.get_leaderboard()
+
+    summary = database.apply_retention(30)
+    assert (summary["rolled_up"], summary["deleted"], summary["pruned_blobs"]) == (2, 2, 2)
+    assert database.count_results() == 2
+    assert database.apply_retention(30)["rolled_up"] == 0
+    assert database.maintain_partitions() == []  # Nothing to partition on SQLite
+
+    # The rollups keep the history in the leaderboard, even when rebuilt
+    assert database.get_leaderboard() == before
+    database.rebuild_leaderboard()
+    assert [(e["model_id"], e["runs"]) for e in database.get_leaderboard()] == [(e["model_id"], e["runs"]) for e in before]
+
+    daily = database.get_daily_results(since=datetime.utcnow() - timedelta(days=60), model_id="test/model-a")
+    assert [(d["day"], d["runs"], d["correct_runs"]) for d in daily] == [
+        (datetime.utcnow().date().isoformat(), 1, 1), (old.date().isoformat(), 2, 1)]
+    assert daily[1]["min_response_time"] == 1.0 and daily[1]["max_response_time"] == 2.0
+    assert database.get_daily_results(until=old + timedelta(days=1))[0]["day"] == old.date().isoformat()
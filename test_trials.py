@@ -0,0 +1,111 @@
+import json
+import random
+from collections import Counter
+
+import pytest
+
+import app as app_module
+from trials import TrialStats, rank, run_trials, wilson_interval
+
+
+def sampler(rates, multi_sample=True, seed=1):
+    """A sample() callback answering correctly with each model's rate; None rates fail."""
+    rng = random.Random(seed)
+    calls = Counter()
+
+    def sample(model_id, model_name, n):
+        calls[model_id] += 1
+        if rates[model_id] is None:
+            raise RuntimeError("timeout")
+        count = n if multi_sample else 1
+        return [{"correct": rng.random() < rates[model_id], "response_time": 0.5} for _ in range(count)]
+
+    return sample, calls
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(5, 10)
+    assert low == pytest.approx(0.2366, abs=1e-4) and high == pytest.approx(0.7634, abs=1e-4)
+    low, high = wilson_interval(10, 10)
+    assert high == 1.0 and low == pytest.approx(0.7225, abs=1e-4)
+
+
+def test_clearly_separated_models_stop_after_one_request():
+    sample, calls = sampler({"good": 1.0, "bad": 0.0})
+    events = list(run_trials([("good", "Good"), ("bad", "Bad")], sample, min_samples=5, max_samples=30))
+    kinds = Counter(kind for kind, _ in events)
+    assert kinds == {"round": 1, "settled": 2, "complete": 1}
+    summary = events[-1][1]
+    assert summary["requests"] == 2 and summary["samples"] == 10
+    assert [entry["model_id"] for entry in summary["models"]] == ["good", "bad"]
+    assert {entry["stopped"] for entry in summary["models"]} == {"separated"}
+    assert calls == {"good": 1, "bad": 1}
+
+
+def test_single_sample_providers_are_called_once_per_sample():
+    sample, calls = sampler({"good": 1.0, "bad": 0.0}, multi_sample=False)
+    summary = list(run_trials([("good", "Good"), ("bad", "Bad")], sample, min_samples=5))[-1][1]
+    assert calls == {"good": 5, "bad": 5}
+    good = summary["models"][0]
+    assert good["samples"] == good["requests"] == 5
+    assert good["p50_latency"] == good["p95_latency"] == good["mean_latency"] == 0.5
+
+
+def test_close_models_are_sampled_until_the_cap():
+    sample, _ = sampler({"a": 0.6, "b": 0.55})
+    events = list(run_trials([("a", "A"), ("b", "B")], sample, min_samples=5, max_samples=20, batch=5,
+                             precision=0.05))
+    summary = events[-1][1]
+    assert summary["rounds"] == 4
+    assert all(entry["samples"] == 20 and entry["stopped"] == "max_samples" for entry in summary["models"])
+    for entry in summary["models"]:
+        low, high = entry["accuracy_ci"]
+        assert low <= entry["accuracy"] <= high
+
+
+def test_failing_models_stop_after_max_errors():
+    sample, calls = sampler({"ok": 0.9, "dead": None})
+    summary = list(run_trials([("ok", "OK"), ("dead", "Dead")], sample, max_samples=10, max_errors=3))[-1][1]
+    dead = {entry["model_id"]: entry for entry in summary["models"]}["dead"]
+    assert dead["stopped"] == "errors" and dead["errors"] == 3 and dead["accuracy"] is None
+    assert calls["dead"] == 3
+    assert summary["models"][-1]["model_id"] == "dead"
+
+
+def test_precise_models_stop_early():
+    stats = TrialStats("m", "M")
+    stats.add([{"correct": True, "response_time": 1.0}] * 40)
+    assert stats.stop_reason([], min_samples=5, max_samples=100, precision=0.05) == "precise"
+    assert stats.stop_reason([], min_samples=5, max_samples=100, precision=0.01) is None
+
+
+def test_rank_orders_by_accuracy_then_latency():
+    entries = [{"model_id": "slow", "accuracy": 0.9, "mean_latency": 2.0},
+               {"model_id": "none", "accuracy": None, "mean_latency": None},
+               {"model_id": "fast", "accuracy": 0.9, "mean_latency": 1.0},
+               {"model_id": "best", "accuracy": 1.0, "mean_latency": 3.0}]
+    assert [entry["model_id"] for entry in rank(entries)] == ["best", "fast", "slow", "none"]
+
+
+def test_trials_endpoint(monkeypatch):
+    saved = []
+    monkeypatch.setattr(app_module, "result_writer", None)
+    monkeypatch.setattr(app_module.database, "save_result", saved.append)
+    monkeypatch.setattr(app_module.client, "get_model", lambda model_id: {"name": model_id.upper()})
+    answers = {"x": "xy = 12", "y": "xy = 10"}
+    monkeypatch.setattr(app_module.client, "sample_math_problem", lambda model_id, text, n: [
+        {"response_text": answers[model_id], "response_time_seconds": 0.3, "prompt_tokens": 10,
+         "completion_tokens": 5, "total_tokens": 15, "cached": False} for _ in range(n)])
+    client = app_module.app.test_client()
+
+    assert client.get("/api/trials?min_samples=10&max_samples=5").status_code == 400
+    response = client.get("/api/trials?models=x,y&min_samples=4")
+    events = [json.loads(line[len("data: "):]) for line in response.get_data(as_text=True).splitlines()
+              if line.startswith("data: ")]
+    assert Counter(event["type"] for event in events) == {"total": 1, "round": 1, "settled": 2, "complete": 1}
+    group = events[0]["data"]["trial_group_id"]
+    complete = events[-1]["data"]
+    assert complete["trial_group_id"] == group
+    assert [entry["model_name"] for entry in complete["models"]] == ["X", "Y"]
+    assert len(saved) == 8 and {result["trial_group_id"] for result in saved} == {group}
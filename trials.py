@@ -0,0 +1,234 @@
+"""
+Repeated-trial benchmarking with sequential early stopping.
+
+One call per model is too noisy to rank models by. A trial run samples every
+model repeatedly on the same problem, in rounds, and after each round puts a
+Wilson score interval around each model's accuracy. A model is no longer
+sampled once its place in the ranking is settled:
+
+- "separated": its interval overlaps no other model's, so more samples would
+  not change its rank;
+- "precise": its interval is within ±`precision`, so any model it still
+  overlaps with is tied with it at the precision asked for;
+- "max_samples": it has had `max_samples` samples;
+- "errors": `max_errors` of its requests failed.
+
+Models that are clearly better or worse than the rest stop after a round or
+two, and the remaining calls go to the models whose order is still open.
+Checking after every round makes the real error rate somewhat higher than the
+nominal one for `z`; raise TRIALS_CONFIDENCE_Z for stricter rankings.
+"""
+
+import math
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import percentile
+
+# Defaults, overridable through the environment.
+TRIALS_MIN_SAMPLES = int(os.environ.get("TRIALS_MIN_SAMPLES", "5"))
+TRIALS_MAX_SAMPLES = int(os.environ.get("TRIALS_MAX_SAMPLES", "30"))
+# Samples requested per model and round after the first
+TRIALS_BATCH = int(os.environ.get("TRIALS_BATCH", "5"))
+# Half-width of the accuracy interval at which a model counts as measured
+TRIALS_PRECISION = float(os.environ.get("TRIALS_PRECISION", "0.1"))
+# Normal quantile of the confidence intervals (1.96 = 95%)
+TRIALS_CONFIDENCE_Z = float(os.environ.get("TRIALS_CONFIDENCE_Z", "1.96"))
+TRIALS_MAX_ERRORS = int(os.environ.get("TRIALS_MAX_ERRORS", "3"))
+TRIALS_WORKERS = int(os.environ.get("TRIALS_WORKERS", "8"))
+
+
+def wilson_interval(successes, trials, z=TRIALS_CONFIDENCE_Z):
+    """
+    Return the Wilson score interval (low, high) for a success rate.
+
+    Unlike the normal approximation it stays inside [0, 1] and is not
+    zero-width at 0 or 100%, which matters for the small sample counts of a
+    trial run. (0.0, 1.0) when there are no trials.
+    """
+    if not trials:
+        return 0.0, 1.0
+    rate = successes / trials
+    denominator = 1 + z * z / trials
+    center = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class TrialStats:
+    """Running samples of one model in a trial run."""
+
+    def __init__(self, model_id, model_name):
+        self.model_id = model_id
+        self.model_name = model_name
+        # One latency per request: the samples of a multi-sample request share it
+        self.latencies = []
+        self.samples = 0
+        self.correct = 0
+        self.requests = 0
+        self.errors = 0
+        self.stopped = None
+
+    def add(self, samples):
+        """Record the graded samples ({"correct", "response_time"}) returned by one request."""
+        self.requests += 1
+        self.latencies.append(samples[0]["response_time"])
+        self.samples += len(samples)
+        self.correct += sum(bool(sample["correct"]) for sample in samples)
+
+    def add_error(self):
+        self.requests += 1
+        self.errors += 1
+
+    def interval(self, z=TRIALS_CONFIDENCE_Z):
+        return wilson_interval(self.correct, self.samples, z)
+
+    def stop_reason(self, others, min_samples=TRIALS_MIN_SAMPLES, max_samples=TRIALS_MAX_SAMPLES,
+                    precision=TRIALS_PRECISION, z=TRIALS_CONFIDENCE_Z, max_errors=TRIALS_MAX_ERRORS):
+        """
+        Return why sampling this model can stop (see the module docstring), or
+        None to keep sampling.
+
+        Args:
+            others (list): The TrialStats of the other models in the run.
+        """
+        if self.errors >= max_errors:
+            return "errors"
+        if self.samples >= max_samples:
+            return "max_samples"
+        if self.samples < min_samples:
+            return None
+        low, high = self.interval(z)
+        if (high - low) / 2 <= precision:
+            return "precise"
+        intervals = [other.interval(z) for other in others if other.samples]
+        if intervals and all(high < other_low or low > other_high for other_low, other_high in intervals):
+            return "separated"
+        return None
+
+    def entry(self, z=TRIALS_CONFIDENCE_Z):
+        low, high = self.interval(z)
+        mean_latency = statistics.fmean(self.latencies) if self.latencies else None
+        latency_interval = None
+        if len(self.latencies) > 1:
+            margin = z * statistics.stdev(self.latencies) / math.sqrt(len(self.latencies))
+            latency_interval = [_round(max(0.0, mean_latency - margin), 3), _round(mean_latency + margin, 3)]
+        return {
+            "model_id": self.model_id,
+            "model_name": self.model_name,
+            "samples": self.samples,
+            "correct": self.correct,
+            "requests": self.requests,
+            "errors": self.errors,
+            "accuracy": round(self.correct / self.samples, 4) if self.samples else None,
+            "accuracy_ci": [round(low, 4), round(high, 4)] if self.samples else None,
+            "mean_latency": _round(mean_latency, 3),
+            "latency_ci": latency_interval,
+            "p50_latency": _round(percentile(self.latencies, 50), 3),
+            "p95_latency": _round(percentile(self.latencies, 95), 3),
+            "stopped": self.stopped
+        }
+
+
+def _round(value, digits):
+    return round(value, digits) if value is not None else None
+
+
+def rank(entries):
+    """Order trial entries by accuracy (best first), then by mean latency (fastest first)."""
+    return sorted(entries, key=lambda entry: (
+        -entry["accuracy"] if entry["accuracy"] is not None else 1,
+        entry["mean_latency"] if entry["mean_latency"] is not None else math.inf))
+
+
+def _draw(sample, stats, wanted):
+    """
+    Request samples of one model until `wanted` have arrived or a request fails.
+
+    Runs in the worker threads, so it only collects outcomes: a list of samples
+    per successful request, or the exception of the failed one.
+    """
+    outcomes = []
+    received = 0
+    while received < wanted:
+        try:
+            samples = sample(stats.model_id, stats.model_name, wanted - received)
+        except Exception as e:
+            outcomes.append(e)
+            break
+        outcomes.append(samples)
+        received += len(samples)
+        if not samples:
+            break
+    return outcomes
+
+
+def _wanted(stats, min_samples, max_samples, batch):
+    """Samples to request in the next round: up to `min_samples` at first, then `batch` more."""
+    wanted = max(min_samples - stats.samples, batch if stats.requests else 0)
+    return min(wanted, max_samples - stats.samples)
+
+
+def run_trials(models, sample, min_samples=TRIALS_MIN_SAMPLES, max_samples=TRIALS_MAX_SAMPLES, batch=TRIALS_BATCH,
+               precision=TRIALS_PRECISION, z=TRIALS_CONFIDENCE_Z, max_errors=TRIALS_MAX_ERRORS,
+               workers=TRIALS_WORKERS):
+    """
+    Sample models in rounds until every model's ranking is settled, yielding events.
+
+    The first round takes `min_samples` samples of every model and each later
+    round `batch` more of every model still being sampled, the models
+    concurrently. The stopping rules are applied once the round is complete.
+
+    Args:
+        models (list): (model_id, model_name) pairs.
+        sample (callable): sample(model_id, model_name, n) sends one request
+            asking for up to `n` samples and returns them graded, as a list of
+            {"correct", "response_time"}. It may return fewer than asked for (a
+            provider without multi-sample support); exceptions count as failed
+            requests.
+        min_samples, max_samples, batch, precision, z, max_errors: See the
+            module docstring and the TRIALS_* defaults.
+        workers (int): Models sampled concurrently.
+
+    Yields:
+        tuple: ("round", data) after each round with the entries of the models
+            sampled in it, ("settled", entry) for each model that stops, and a
+            final ("complete", summary) with every model's entry, ranked.
+    """
+    stats = [TrialStats(model_id, model_name) for model_id, model_name in models]
+    started = time.monotonic()
+    active = list(stats)
+    rounds = 0
+    workers = max(1, min(workers, len(stats) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trials") as executor:
+        while active:
+            rounds += 1
+            futures = [(model, executor.submit(_draw, sample, model, _wanted(model, min_samples, max_samples, batch)))
+                       for model in active]
+            for model, future in futures:
+                for outcome in future.result():
+                    if isinstance(outcome, Exception) or not outcome:
+                        model.add_error()
+                    else:
+                        model.add(outcome)
+            yield "round", {"round": rounds, "models": [model.entry(z) for model in active]}
+
+            # Decided on the state after the whole round, so the order of models does not matter
+            for model in active:
+                model.stopped = model.stop_reason([other for other in stats if other is not model],
+                                                  min_samples=min_samples, max_samples=max_samples,
+                                                  precision=precision, z=z, max_errors=max_errors)
+            for model in active:
+                if model.stopped:
+                    yield "settled", model.entry(z)
+            active = [model for model in active if not model.stopped]
+
+    yield "complete", {
+        "models": rank(model.entry(z) for model in stats),
+        "rounds": rounds,
+        "requests": sum(model.requests for model in stats),
+        "samples": sum(model.samples for model in stats),
+        "elapsed_seconds": round(time.monotonic() - started, 2)
+    }